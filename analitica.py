@@ -0,0 +1,158 @@
+"""Resúmenes de ventas mantenidos de forma incremental.
+
+Cada tabla ventas_por_* acumula ingreso (en céntimos, con descuento e
+impuesto, igual que facturas.total_centimos), cantidad y líneas por (periodo,
+clave), donde periodo es "AAAA-MM" según facturas.emitida_en ("sin fecha" para
+facturas viejas) y además hay una fila con periodo "*" que acumula todo el
+histórico. registrar_factura suma cada factura nueva dentro de su misma
+transacción, así que los reportes nunca recorren factura_productos.
+
+El segmento y la categoría se guardan como estaban al momento de la venta.
+Para recalcular todo (después de una importación masiva, p. ej.) está
+`reconstruir_agregados`.
+"""
+
+from metricas import metricas
+from precios import TOTAL_LINEA_SQL
+
+PERIODO_TOTAL = "*"
+SIN_FECHA = "sin fecha"
+
+# dimensión -> (tabla, expresión de la clave sobre el join de una línea)
+DIMENSIONES = {
+    "segmento": ("ventas_por_segmento", "c.segmento_negocio"),
+    "categoria": ("ventas_por_categoria", "p.categoria"),
+    "producto": ("ventas_por_producto", "fp.producto_id"),
+    "cliente": ("ventas_por_cliente", "f.cliente_id"),
+}
+
+# Dimensiones cuya clave es un ID y la tabla donde está su nombre
+TABLAS_NOMBRE = {"producto": "productos", "cliente": "clientes"}
+
+_EXPRESION_PERIODO = f"COALESCE(substr(f.emitida_en, 1, 7), '{SIN_FECHA}')"
+
+
+def _sumar(conn, condicion, parametros):
+    # Suma al resumen las líneas que cumplen `condicion`, en su periodo y en "*"
+    for tabla, clave in DIMENSIONES.values():
+        for periodo in (_EXPRESION_PERIODO, f"'{PERIODO_TOTAL}'"):
+            conn.execute(
+                f"""
+                INSERT INTO {tabla} (periodo, clave, ingreso_centimos, cantidad, lineas)
+                SELECT {periodo}, {clave}, SUM({TOTAL_LINEA_SQL}),
+                       SUM(fp.cantidad), COUNT(*)
+                FROM factura_productos fp
+                JOIN facturas f ON f.id = fp.factura_id
+                JOIN clientes c ON c.id = f.cliente_id
+                JOIN productos p ON p.id = fp.producto_id
+                WHERE {condicion}
+                GROUP BY 1, 2
+                ON CONFLICT (periodo, clave) DO UPDATE SET
+                    ingreso_centimos = ingreso_centimos + excluded.ingreso_centimos,
+                    cantidad = cantidad + excluded.cantidad,
+                    lineas = lineas + excluded.lineas
+                """,
+                parametros,
+            )
+
+
+def actualizar_agregados(conn, factura_id):
+    """Suma al resumen las líneas de una factura recién registrada.
+
+    Debe llamarse dentro de la misma transacción que insertó la factura.
+    """
+    _sumar(conn, "fp.factura_id = ?", (factura_id,))
+
+
+def ultima_linea(conn):
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM factura_productos").fetchone()[0]
+
+
+def sumar_lineas_desde(conn, linea_id):
+    # Para cargas masivas: suma todas las líneas con ID mayor a `linea_id`
+    # (tomado con ultima_linea antes de insertar), en la misma transacción
+    _sumar(conn, "fp.id > ?", (linea_id,))
+
+
+def reconstruir_en(conn):
+    for tabla, _ in DIMENSIONES.values():
+        conn.execute(f"DELETE FROM {tabla}")
+    _sumar(conn, "1", ())
+
+
+
+def reconstruir_agregados(pool):
+    # Refresco completo, como una vista materializada. Solo recorre la base
+    # activa: los años ya archivados (particiones.py) saldrían de los resúmenes
+    with pool.escritura() as conn:
+        reconstruir_en(conn)
+
+
+@metricas.instrumentar()
+def periodos(pool):
+    tabla = DIMENSIONES["segmento"][0]
+    with pool.lectura() as conn:
+        return [
+            fila[0]
+            for fila in conn.execute(
+                f"SELECT DISTINCT periodo FROM {tabla} WHERE periodo NOT IN (?, ?) "
+                "ORDER BY periodo",
+                (PERIODO_TOTAL, SIN_FECHA),
+            )
+        ]
+
+
+def _rango(desde, hasta):
+    # Los periodos "AAAA-MM" caen en este rango; "*" y "sin fecha" quedan fuera
+    return desde or "0000-00", hasta or "9999-99"
+
+
+@metricas.instrumentar()
+def ventas_por(pool, dimension, desde=None, hasta=None, limite=None):
+    """Devuelve [(clave, ingreso, cantidad, lineas)] ordenado por ingreso.
+
+    Sin `desde`/`hasta` usa la fila acumulada "*"; con alguno de ellos suma
+    los periodos "AAAA-MM" del rango (inclusive). Para productos y clientes la
+    clave que se devuelve es el nombre.
+    """
+    tabla, _ = DIMENSIONES[dimension]
+    if desde is None and hasta is None:
+        condicion, parametros = "periodo = ?", [PERIODO_TOTAL]
+    else:
+        condicion, parametros = "periodo BETWEEN ? AND ?", list(_rango(desde, hasta))
+    sql = f"""
+        SELECT clave, SUM(ingreso_centimos) / 100.0 AS ingreso, SUM(cantidad) AS cantidad,
+               SUM(lineas) AS lineas
+        FROM {tabla} WHERE {condicion} GROUP BY clave
+        ORDER BY ingreso DESC {'LIMIT ?' if limite else ''}
+    """
+    if limite:
+        parametros.append(limite)
+
+    tabla_nombres = TABLAS_NOMBRE.get(dimension)
+    if tabla_nombres:
+        # La clave es un ID; el nombre se busca solo para las filas devueltas
+        sql = f"""
+            SELECT COALESCE(t.nombre, r.clave), r.ingreso, r.cantidad, r.lineas
+            FROM ({sql}) r
+            LEFT JOIN {tabla_nombres} t ON t.id = r.clave
+            ORDER BY r.ingreso DESC
+        """
+    with pool.lectura() as conn:
+        return conn.execute(sql, parametros).fetchall()
+
+
+@metricas.instrumentar()
+def ventas_por_periodo(pool, desde=None, hasta=None):
+    # Ingreso total de cada mes; cualquier dimensión suma lo mismo por periodo
+    tabla = DIMENSIONES["segmento"][0]
+    with pool.lectura() as conn:
+        return conn.execute(
+            f"""
+            SELECT periodo, SUM(ingreso_centimos) / 100.0, SUM(cantidad), SUM(lineas)
+            FROM {tabla}
+            WHERE periodo BETWEEN ? AND ?
+            GROUP BY periodo ORDER BY periodo
+            """,
+            _rango(desde, hasta),
+        ).fetchall()
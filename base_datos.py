@@ -0,0 +1,264 @@
+"""Acceso a SQLite compartido por todas las sesiones de Streamlit.
+
+Cada script thread de Streamlit pide conexiones a un pool por archivo de base
+de datos en vez de usar una conexión global. Las lecturas usan varias
+conexiones en paralelo (WAL permite lectores concurrentes) y las escrituras
+pasan por una única conexión protegida con un lock, así nunca hay dos
+escritores peleando por el archivo dentro del mismo proceso.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from metricas import metricas
+from migraciones import migrar
+
+RUTA_BD = os.environ.get("ERP_DB_PATH", "erp_app.db")
+
+# Ajustes aplicados a cada conexión nueva
+PRAGMAS = {
+    "synchronous": "NORMAL",  # con WAL es seguro y evita un fsync por commit
+    "cache_size": -16000,  # ~16 MiB de caché de páginas por conexión
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",  # SQLite no valida las FOREIGN KEY si no se pide
+}
+BUSY_TIMEOUT_MS = 5000
+MAX_LECTORES = 8
+
+
+class CursorMedido(sqlite3.Cursor):
+    # Cuenta las filas que se leen de un SELECT (rowcount es -1 para ellos) y
+    # las suma a la serie de la sentencia; al iterar, al terminar o al cerrarlo
+    operacion = None
+    leidas = 0
+
+    def _volcar(self, filas=0):
+        filas += self.leidas
+        self.leidas = 0
+        if filas and self.operacion is not None:
+            metricas.sumar_filas(self.operacion, filas)
+
+    def __next__(self):
+        try:
+            fila = super().__next__()
+        except StopIteration:
+            self._volcar()
+            raise
+        self.leidas += 1
+        return fila
+
+    def fetchone(self):
+        fila = super().fetchone()
+        self._volcar(fila is not None)
+        return fila
+
+    def fetchmany(self, size=None):
+        filas = super().fetchmany(self.arraysize if size is None else size)
+        self._volcar(len(filas))
+        return filas
+
+    def fetchall(self):
+        filas = super().fetchall()
+        self._volcar(len(filas))
+        return filas
+
+    def close(self):
+        self._volcar()
+        super().close()
+
+
+class ConexionMedida(sqlite3.Connection):
+    # Cada execute/executemany queda en metricas (y en el log si es lenta).
+    # El tiempo es el de ejecutar la sentencia; las filas de un SELECT las
+    # cuenta el cursor a medida que se leen
+    def execute(self, sql, parametros=()):
+        cursor = self.cursor(CursorMedido)
+        inicio = time.perf_counter()
+        cursor.execute(sql, parametros)
+        self._registrar(cursor, sql, time.perf_counter() - inicio)
+        return cursor
+
+    def executemany(self, sql, filas):
+        cursor = self.cursor(CursorMedido)
+        inicio = time.perf_counter()
+        cursor.executemany(sql, filas)
+        self._registrar(cursor, sql, time.perf_counter() - inicio)
+        return cursor
+
+    @staticmethod
+    def _registrar(cursor, sql, segundos):
+        devuelve_filas = cursor.description is not None
+        operacion = metricas.registrar_sql(
+            sql, segundos, None if devuelve_filas else cursor.rowcount
+        )
+        if devuelve_filas:
+            cursor.operacion = operacion
+
+
+def conectar(ruta, pragmas=None, busy_timeout_ms=BUSY_TIMEOUT_MS):
+    # isolation_level=None: las transacciones se abren explícitamente
+    conn = sqlite3.connect(
+        ruta,
+        timeout=busy_timeout_ms / 1000,
+        isolation_level=None,
+        check_same_thread=False,
+        factory=ConexionMedida,
+    )
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    for nombre, valor in (PRAGMAS if pragmas is None else pragmas).items():
+        conn.execute(f"PRAGMA {nombre} = {valor}")
+    return conn
+
+
+class PoolConexiones:
+    def __init__(self, ruta, max_lectores=MAX_LECTORES, busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.ruta = ruta
+        self.max_lectores = max_lectores
+        self.busy_timeout_ms = busy_timeout_ms
+        self._lock_escritura = threading.Lock()
+        self._lock_creacion = threading.Lock()
+        self._lectores = queue.LifoQueue()
+        self._lectores_creados = 0
+        self._cerrado = False
+
+        self._escritor = conectar(ruta, busy_timeout_ms=busy_timeout_ms)
+        # WAL es persistente en el archivo; basta con activarlo una vez
+        self._escritor.execute("PRAGMA journal_mode = WAL")
+
+        # Métricas simples para diagnosticar contención
+        self.esperas_escritura = 0
+        self.segundos_espera_escritura = 0.0
+        # Conteo de sentencias por hilo, activo solo dentro de contar_consultas
+        self._conteo = threading.local()
+
+    def _tomar_lector(self):
+        try:
+            return self._lectores.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock_creacion:
+            if self._lectores_creados < self.max_lectores:
+                self._lectores_creados += 1
+                return conectar(self.ruta, busy_timeout_ms=self.busy_timeout_ms)
+        # Todas las conexiones están ocupadas: esperamos a que se libere una
+        return self._lectores.get(timeout=self.busy_timeout_ms / 1000)
+
+    def _contar(self, sql):
+        self._conteo.consultas += 1
+
+    def _rastrear(self, conn):
+        # El trace callback solo se instala mientras el hilo está contando,
+        # así las cargas masivas no pagan una llamada a Python por sentencia
+        if getattr(self._conteo, "consultas", None) is not None:
+            conn.set_trace_callback(self._contar)
+            return True
+        return False
+
+    @contextmanager
+    def contar_consultas(self):
+        """Cuenta las sentencias SQL que el hilo actual ejecuta en el bloque.
+
+        Entrega un dict cuyo valor "consultas" se completa al salir. Incluye
+        BEGIN/COMMIT y cada fila de un executemany.
+        """
+        anterior = getattr(self._conteo, "consultas", None)
+        self._conteo.consultas = 0
+        resultado = {"consultas": 0}
+        try:
+            yield resultado
+        finally:
+            resultado["consultas"] = self._conteo.consultas
+            self._conteo.consultas = (
+                None if anterior is None else anterior + resultado["consultas"]
+            )
+
+    @contextmanager
+    def lectura(self):
+        conn = self._tomar_lector()
+        rastreada = self._rastrear(conn)
+        try:
+            yield conn
+        finally:
+            if rastreada:
+                conn.set_trace_callback(None)
+            if conn.in_transaction:
+                conn.rollback()
+            if self._cerrado:
+                conn.close()
+            else:
+                self._lectores.put(conn)
+
+    @contextmanager
+    def escritura(self):
+        """Transacción de escritura exclusiva del proceso.
+
+        Hace COMMIT al salir del bloque y ROLLBACK si se lanza una excepción.
+        """
+        if not self._lock_escritura.acquire(blocking=False):
+            inicio = time.perf_counter()
+            self._lock_escritura.acquire()
+            self.esperas_escritura += 1
+            self.segundos_espera_escritura += time.perf_counter() - inicio
+        conn = self._escritor
+        rastreada = self._rastrear(conn)
+        try:
+            # IMMEDIATE toma el lock de escritura al inicio, así otro proceso
+            # con la misma base no puede dejarnos a medias con SQLITE_BUSY
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+        finally:
+            if rastreada:
+                conn.set_trace_callback(None)
+            self._lock_escritura.release()
+
+    @contextmanager
+    def exclusiva(self):
+        """La conexión de escritura sin transacción abierta.
+
+        Para sentencias que SQLite no permite dentro de una transacción
+        (VACUUM, checkpoints); mientras dura nadie más escribe en el proceso.
+        """
+        with self._lock_escritura:
+            yield self._escritor
+
+    def cerrar(self):
+        self._cerrado = True
+        with self._lock_escritura:
+            self._escritor.close()
+        while True:
+            try:
+                self._lectores.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_lock_pools = threading.Lock()
+
+
+def obtener_pool(ruta=RUTA_BD):
+    # Un pool por archivo y por proceso, compartido por todas las sesiones.
+    # Las migraciones corren solo al crearlo, no en cada rerun.
+    ruta = os.path.abspath(ruta)
+    with _lock_pools:
+        pool = _pools.get(ruta)
+        if pool is None:
+            pool = PoolConexiones(ruta)
+            crear_esquema(pool)
+            _pools[ruta] = pool
+        return pool
+
+
+def crear_esquema(pool):
+    return migrar(pool)
@@ -0,0 +1,116 @@
+"""Reportes de ventas: tablas de resumen vs. GROUP BY sobre las líneas.
+
+Siembra facturas sintéticas y mide, para cada dimensión, la consulta de
+analitica.ventas_por (lee ventas_por_*) contra el mismo reporte calculado en
+el momento con joins sobre factura_productos. También mide cuánto le agrega a
+registrar_factura mantener los resúmenes al día.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_analitica --facturas 10000 100000 --lineas 5
+"""
+
+import argparse
+import time
+
+from analitica import DIMENSIONES, _EXPRESION_PERIODO, ventas_por
+from base_datos import PoolConexiones, crear_esquema
+from benchmarks.comun import base_temporal
+from facturacion import INSERTAR_LINEA, registrar_factura
+from metricas import percentil
+from precios import TOTAL_LINEA_SQL, a_centimos, liquidar
+from importacion import poblar_sintetico
+
+REPETICIONES = 20
+RANGO = ("2023-04", "2024-03")
+
+
+def medir(funcion, repeticiones=REPETICIONES):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return {"p50_ms": percentil(tiempos, 50) * 1000, "p95_ms": percentil(tiempos, 95) * 1000}
+
+
+def ventas_en_vivo(pool, dimension, desde, hasta):
+    # El reporte sin resúmenes: recorre todas las líneas del rango
+    _, clave = DIMENSIONES[dimension]
+    with pool.lectura() as conn:
+        return conn.execute(
+            f"""
+            SELECT {clave}, SUM({TOTAL_LINEA_SQL}) / 100.0 AS ingreso
+            FROM factura_productos fp
+            JOIN facturas f ON f.id = fp.factura_id
+            JOIN clientes c ON c.id = f.cliente_id
+            JOIN productos p ON p.id = fp.producto_id
+            WHERE {_EXPRESION_PERIODO} BETWEEN ? AND ?
+            GROUP BY 1 ORDER BY ingreso DESC LIMIT 20
+            """,
+            (desde, hasta),
+        ).fetchall()
+
+
+def registrar_sin_resumen(pool, cliente_id, lineas):
+    # registrar_factura sin la actualización de analitica, como referencia
+    with pool.escritura() as conn:
+        factura_id = conn.execute(
+            "INSERT INTO facturas (cliente_id, total_centimos, emitida_en) VALUES (?, ?, datetime('now'))",
+            (cliente_id, liquidar(lineas)["total"]),
+        ).lastrowid
+        conn.executemany(
+            INSERTAR_LINEA,
+            [(factura_id, l["producto_id"], l["cantidad"], a_centimos(l["monto"])) for l in lineas],
+        )
+    return factura_id
+
+
+def ejecutar(facturas, lineas):
+    resultados = []
+    with base_temporal() as ruta:
+        pool = PoolConexiones(ruta)
+        crear_esquema(pool)
+        poblar_sintetico(
+            pool, clientes=1_000, productos=500, facturas=facturas, lineas_por_factura=lineas
+        )
+
+        for dimension in DIMENSIONES:
+            casos = {
+                f"resumen_{dimension}": lambda: ventas_por(pool, dimension, *RANGO, limite=20),
+                f"en_vivo_{dimension}": lambda: ventas_en_vivo(pool, dimension, *RANGO),
+            }
+            for caso, funcion in casos.items():
+                resultados.append({"facturas": facturas, "caso": caso, **medir(funcion)})
+
+        lineas_factura = [
+            {"producto_id": p, "cantidad": 2, "monto": 1000.0} for p in range(1, lineas + 1)
+        ]
+        for caso, registrar in (
+            ("registrar_sin_resumen", registrar_sin_resumen),
+            ("registrar_con_resumen", registrar_factura),
+        ):
+            resultados.append(
+                {
+                    "facturas": facturas,
+                    "caso": caso,
+                    **medir(lambda: registrar(pool, 1, lineas_factura), repeticiones=200),
+                }
+            )
+        pool.cerrar()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facturas", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--lineas", type=int, default=5)
+    args = parser.parse_args()
+
+    for facturas in args.facturas:
+        for resultado in ejecutar(facturas, args.lineas):
+            print(resultado)
+
+
+if __name__ == "__main__":
+    main()
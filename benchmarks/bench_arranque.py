@@ -0,0 +1,153 @@
+"""Latencia de arranque en frío y de reruns de la aplicación.
+
+Cada medición corre en un proceso nuevo, para que nada quede importado de
+antes:
+
+- "modulos": importar los módulos de la aplicación y abrir el pool (que
+  migra el esquema la primera vez), con la base vacía y ya migrada.
+- "app": ejecutar erp_app.py con streamlit.testing (AppTest); la primera
+  corrida es el arranque en frío y las siguientes son reruns. Se omite si
+  Streamlit no está instalado.
+
+Con --max-rerun-ms sale con código 1 si el p95 de los reruns supera ese
+límite, para detectar regresiones en CI.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_arranque --clientes 10000 --reruns 20
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from base_datos import PoolConexiones, crear_esquema
+from benchmarks.comun import base_temporal
+from importacion import poblar_sintetico
+from metricas import percentil
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS_APP = [
+    "base_datos",
+    "cache_datos",
+    "cola_facturas",
+    "analitica",
+    "facturacion",
+    "importacion",
+    "paginacion",
+    "datos_ejemplo",
+]
+
+# Se ejecutan con `python -c` en un proceso nuevo; imprimen un JSON
+_CODIGO_MODULOS = """
+import importlib, json, os, sys, time
+inicio = time.perf_counter()
+tiempos = {}
+for modulo in sys.argv[1:]:
+    t = time.perf_counter()
+    importlib.import_module(modulo)
+    tiempos[modulo] = (time.perf_counter() - t) * 1000
+t = time.perf_counter()
+from base_datos import obtener_pool
+obtener_pool(os.environ["ERP_DB_PATH"])
+tiempos["obtener_pool"] = (time.perf_counter() - t) * 1000
+tiempos["total"] = (time.perf_counter() - inicio) * 1000
+print(json.dumps(tiempos))
+"""
+
+_CODIGO_APP = """
+import json, sys, time
+inicio = time.perf_counter()
+try:
+    from streamlit.testing.v1 import AppTest
+except ImportError:
+    print(json.dumps(None))
+    sys.exit(0)
+importar_ms = (time.perf_counter() - inicio) * 1000
+app = AppTest.from_file("erp_app.py", default_timeout=120)
+t = time.perf_counter()
+app.run()
+frio_ms = (time.perf_counter() - t) * 1000
+if app.exception:
+    raise SystemExit(f"erp_app.py falló: {app.exception}")
+reruns = []
+for _ in range(int(sys.argv[1])):
+    t = time.perf_counter()
+    app.run()
+    reruns.append((time.perf_counter() - t) * 1000)
+print(json.dumps({"importar_streamlit_ms": importar_ms, "frio_ms": frio_ms, "reruns_ms": reruns}))
+"""
+
+
+def _ejecutar(codigo, argumentos, ruta):
+    entorno = dict(os.environ, ERP_DB_PATH=ruta, ERP_FACTURAS_BACKEND="stub")
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo, *argumentos],
+        cwd=RAIZ,
+        env=entorno,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir_modulos(ruta):
+    return _ejecutar(_CODIGO_MODULOS, MODULOS_APP, ruta)
+
+
+def medir_app(ruta, reruns):
+    resultado = _ejecutar(_CODIGO_APP, [str(reruns)], ruta)
+    if resultado is None:
+        return None
+    tiempos = sorted(resultado.pop("reruns_ms"))
+    resultado["rerun_p50_ms"] = percentil(tiempos, 50)
+    resultado["rerun_p95_ms"] = percentil(tiempos, 95)
+    return resultado
+
+
+def ejecutar(clientes, reruns):
+    resultados = []
+    with base_temporal() as ruta:
+        # Primer arranque: base vacía, corren todas las migraciones
+        resultados.append({"caso": "modulos_base_nueva", **medir_modulos(ruta)})
+
+        pool = PoolConexiones(ruta)
+        crear_esquema(pool)
+        poblar_sintetico(pool, clientes=clientes, productos=clientes // 10, facturas=clientes)
+        pool.cerrar()
+
+        resultados.append({"caso": "modulos_base_migrada", **medir_modulos(ruta)})
+        app = medir_app(ruta, reruns)
+        if app is None:
+            print("streamlit no está instalado; se omite la medición de la app")
+        else:
+            resultados.append({"caso": "app", "clientes": clientes, **app})
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clientes", type=int, default=10_000)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--max-rerun-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.clientes, args.reruns)
+    for resultado in resultados:
+        print(resultado)
+
+    if args.max_rerun_ms is not None:
+        for resultado in resultados:
+            if resultado["caso"] == "app" and resultado["rerun_p95_ms"] > args.max_rerun_ms:
+                print(
+                    f"REGRESIÓN: p95 de rerun {resultado['rerun_p95_ms']:.1f} ms "
+                    f"> {args.max_rerun_ms:.1f} ms"
+                )
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
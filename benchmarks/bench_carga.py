@@ -0,0 +1,345 @@
+"""Prueba de carga de erp_app.py con muchas sesiones simuladas, sin navegador.
+
+Cada sesión es un AppTest (streamlit.testing) que ejecuta el script real y
+repite flujos de un dependiente: ver el listado de clientes, agregar un
+cliente, armar y generar una factura, agregar y eliminar un producto. Las
+sesiones de un proceso corren en hilos y comparten el pool, el caché y la
+cola de PDFs, como las de un servidor de Streamlit; con --procesos hay
+varios "servidores" sobre el mismo archivo SQLite. Los PDFs van a un
+servidor local que imita la API de facturas (ver bench_pdf).
+
+Informa por flujo p50/p95/p99, reruns por flujo y errores (excepciones del
+script, st.error y widgets que no aparecieron), y por proceso las esperas por
+la conexión de escritura y los "database is locked".
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_carga --sesiones 50 --iteraciones 20
+    python -m benchmarks.bench_carga --procesos 2 --sesiones 25 --salida carga.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.bench_pdf import servidor_simulado
+from benchmarks.comun import base_temporal
+from metricas import percentil
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLOQUEADA = "database is locked"
+CANDADO = threading.Lock()
+
+
+class ErrorFlujo(Exception):
+    pass
+
+
+class Sesion:
+    """Un dependiente: su AppTest y lo que se midió en sus reruns."""
+
+    def __init__(self, numero, app):
+        self.numero = numero
+        self.app = app
+        self.reruns = 0
+        self.tiempos_rerun = []
+        self.contador = 0
+
+    def correr(self, elemento):
+        # `elemento` es el AppTest o un widget con su valor ya puesto
+        inicio = time.perf_counter()
+        elemento.run()
+        self.tiempos_rerun.append(time.perf_counter() - inicio)
+        self.reruns += 1
+        if self.app.exception:
+            raise ErrorFlujo(f"excepción: {self.app.exception[0].message}")
+        if len(self.app.error):
+            raise ErrorFlujo(f"st.error: {self.app.error[0].value}")
+
+    def ir_a(self, seccion):
+        self.correr(self.app.radio(key="seccion").set_value(seccion))
+
+    def widget(self, tipo, etiqueta):
+        for elemento in getattr(self.app, tipo):
+            if elemento.label == etiqueta:
+                return elemento
+        raise ErrorFlujo(f"no apareció {tipo} '{etiqueta}'")
+
+    def nombre_unico(self, prefijo):
+        self.contador += 1
+        return f"{prefijo} s{self.numero}n{self.contador}"
+
+
+# Flujos: reciben la sesión, un Random y los tamaños de la base sembrada
+def listar_clientes(sesion, rnd, datos):
+    sesion.ir_a("Listado de Clientes")
+    for _ in range(rnd.randint(1, 3)):
+        siguiente = sesion.app.button(key="siguiente_clientes")
+        if siguiente.disabled:
+            break
+        sesion.correr(siguiente.click())
+
+
+def agregar_cliente(sesion, rnd, datos):
+    sesion.ir_a("Agregar Cliente")
+    nombre = sesion.nombre_unico("Carga")
+    sesion.widget("text_input", "Nombre").input(nombre)
+    sesion.widget("text_input", "Correo Electrónico").input(
+        f"{nombre.replace(' ', '.').lower()}@example.com"
+    )
+    sesion.correr(sesion.widget("button", "Agregar").click())
+
+
+def facturar(sesion, rnd, datos):
+    sesion.ir_a("Facturar")
+    sesion.correr(
+        sesion.app.text_input(key="buscar_factura_cliente").input(
+            f"cliente {rnd.randint(1, datos['clientes'])}"
+        )
+    )
+    for _ in range(rnd.randint(1, 4)):
+        sesion.correr(
+            sesion.app.text_input(key="buscar_factura_producto").input(
+                f"producto {rnd.randint(1, datos['productos'])}"
+            )
+        )
+        sesion.widget("number_input", "Cantidad").set_value(rnd.randint(1, 5))
+        sesion.correr(sesion.widget("button", "Agregar producto").click())
+    sesion.correr(sesion.widget("button", "Generar factura").click())
+
+
+def eliminar_producto(sesion, rnd, datos):
+    sesion.ir_a("Productos")
+    nombre = sesion.nombre_unico("Carga")
+    sesion.widget("text_input", "Nombre del Producto").input(nombre)
+    sesion.widget("text_input", "Categoría").input("Carga")
+    sesion.widget("number_input", "Monto").set_value(float(rnd.randint(1, 500) * 100))
+    sesion.correr(sesion.widget("button", "Agregar Producto").click())
+    sesion.correr(sesion.app.text_input(key="buscar_eliminar_producto").input(nombre))
+    selector = sesion.app.selectbox(key="producto_eliminar")
+    if nombre not in selector.options:
+        raise ErrorFlujo(f"la búsqueda no encontró '{nombre}'")
+    sesion.correr(selector.select_index(selector.options.index(nombre)))
+    sesion.correr(sesion.widget("button", "Eliminar Producto").click())
+
+
+# nombre -> (flujo, peso relativo): sobre todo consultas y facturas
+FLUJOS = {
+    "listar_clientes": (listar_clientes, 4),
+    "agregar_cliente": (agregar_cliente, 1),
+    "facturar": (facturar, 4),
+    "eliminar_producto": (eliminar_producto, 1),
+}
+
+
+def _simular(app_test, numero, iteraciones, pausa, semilla, datos, resultados):
+    rnd = random.Random(f"{semilla}-{numero}")
+    nombres = list(FLUJOS)
+    pesos = [FLUJOS[nombre][1] for nombre in nombres]
+    sesion = Sesion(numero, app_test.from_file(os.path.join(RAIZ, "erp_app.py"), default_timeout=120))
+    try:
+        sesion.correr(sesion.app)
+    except Exception as e:
+        resultados["errores"].append({"flujo": "carga_inicial", "error": str(e)})
+        return
+    for _ in range(iteraciones):
+        nombre = rnd.choices(nombres, pesos)[0]
+        reruns_antes = sesion.reruns
+        inicio = time.perf_counter()
+        try:
+            FLUJOS[nombre][0](sesion, rnd, datos)
+        except Exception as e:
+            resultados["errores"].append({"flujo": nombre, "error": f"{type(e).__name__}: {e}"})
+        else:
+            resultados["flujos"][nombre].append(time.perf_counter() - inicio)
+        with CANDADO:
+            resultados["reruns"][nombre] += sesion.reruns - reruns_antes
+        if pausa:
+            time.sleep(rnd.uniform(0, 2 * pausa))
+    resultados["tiempos_rerun"].extend(sesion.tiempos_rerun)
+    if "facturas_pdf" in sesion.app.session_state:
+        resultados["facturas_pdf"].extend(sesion.app.session_state["facturas_pdf"])
+
+
+def trabajador(sesiones, iteraciones, pausa, semilla, datos):
+    """Corre las sesiones de un proceso en hilos; devuelve sus mediciones crudas."""
+    try:
+        from streamlit.testing.v1 import AppTest  # type: ignore
+    except ImportError:
+        return None
+    # Después de fijar ERP_DB_PATH: son los mismos objetos que usa erp_app.py
+    from base_datos import RUTA_BD, obtener_pool
+    from cola_facturas import LISTA, obtener_cola
+
+    resultados = {
+        "flujos": {nombre: [] for nombre in FLUJOS},
+        "reruns": {nombre: 0 for nombre in FLUJOS},
+        "errores": [],
+        "tiempos_rerun": [],
+        "facturas_pdf": [],
+    }
+    # append/extend sobre listas son atómicos con el GIL; los contadores van con CANDADO
+    hilos = [
+        threading.Thread(
+            target=_simular,
+            args=(AppTest, numero, iteraciones, pausa, semilla, datos, resultados),
+        )
+        for numero in range(sesiones)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    trabajos = obtener_cola().esperar(resultados["facturas_pdf"], timeout=60)
+    pool = obtener_pool(RUTA_BD)
+    resultados.update(
+        esperas_escritura=pool.esperas_escritura,
+        segundos_espera_escritura=pool.segundos_espera_escritura,
+        pdf_listos=sum(1 for t in trabajos if t is not None and t.estado == LISTA),
+        pdf_total=len(trabajos),
+    )
+    del resultados["facturas_pdf"]
+    return resultados
+
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 2)
+
+
+def resumir(por_proceso):
+    """Junta las mediciones de todos los procesos en filas por flujo y un total."""
+    filas = []
+    errores = [e for r in por_proceso for e in r["errores"]]
+    for nombre in FLUJOS:
+        tiempos = sorted(t for r in por_proceso for t in r["flujos"][nombre])
+        reruns = sum(r["reruns"][nombre] for r in por_proceso)
+        fallidos = sum(1 for e in errores if e["flujo"] == nombre)
+        ejecutados = len(tiempos) + fallidos
+        filas.append(
+            {
+                "flujo": nombre,
+                "ejecutados": ejecutados,
+                "errores": fallidos,
+                "p50_ms": _ms(percentil(tiempos, 50)),
+                "p95_ms": _ms(percentil(tiempos, 95)),
+                "p99_ms": _ms(percentil(tiempos, 99)),
+                "reruns_por_flujo": round(reruns / ejecutados, 2) if ejecutados else None,
+            }
+        )
+    reruns = sorted(t for r in por_proceso for t in r["tiempos_rerun"])
+    total = {
+        "reruns": len(reruns),
+        "rerun_p50_ms": _ms(percentil(reruns, 50)),
+        "rerun_p95_ms": _ms(percentil(reruns, 95)),
+        "rerun_p99_ms": _ms(percentil(reruns, 99)),
+        "esperas_escritura": sum(r["esperas_escritura"] for r in por_proceso),
+        "segundos_espera_escritura": round(
+            sum(r["segundos_espera_escritura"] for r in por_proceso), 3
+        ),
+        "database_is_locked": sum(1 for e in errores if BLOQUEADA in e["error"]),
+        "pdf_listos": sum(r["pdf_listos"] for r in por_proceso),
+        "pdf_total": sum(r["pdf_total"] for r in por_proceso),
+    }
+    return filas, total, errores
+
+
+def ejecutar(procesos, sesiones, iteraciones, pausa, demora_api, clientes, semilla):
+    from base_datos import PoolConexiones, crear_esquema
+    from importacion import poblar_sintetico
+
+    datos = {"clientes": clientes, "productos": max(1, clientes // 10)}
+    with base_temporal() as ruta:
+        pool = PoolConexiones(ruta)
+        crear_esquema(pool)
+        poblar_sintetico(
+            pool, clientes=datos["clientes"], productos=datos["productos"], facturas=clientes
+        )
+        pool.cerrar()
+
+        servidor = servidor_simulado(demora_api)
+        directorio = os.path.dirname(ruta)
+        entorno = dict(
+            os.environ,
+            ERP_DB_PATH=ruta,
+            ERP_FACTURAS_BACKEND="api",
+            INVOICE_API_URL=f"http://127.0.0.1:{servidor.server_port}",
+            INVOICE_API_KEY="simulada",
+            ERP_DIRECTORIO_FACTURAS=os.path.join(directorio, "facturas_pdf"),
+            ERP_METRICAS_ARCHIVO=os.path.join(directorio, "metricas.prom"),
+        )
+        argumentos = [
+            "--trabajador", "--sesiones", str(sesiones), "--iteraciones", str(iteraciones),
+            "--pausa-ms", str(pausa * 1000), "--semilla", str(semilla),
+            "--datos", json.dumps(datos),
+        ]
+        inicio = time.perf_counter()
+        hijos = [
+            subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.bench_carga", *argumentos, "--proceso", str(i)],
+                cwd=RAIZ, env=entorno, stdout=subprocess.PIPE, text=True,
+            )
+            for i in range(procesos)
+        ]
+        salidas = [hijo.communicate()[0] for hijo in hijos]
+        segundos = time.perf_counter() - inicio
+        servidor.shutdown()
+
+    for hijo in hijos:
+        if hijo.returncode:
+            raise SystemExit(f"un proceso de carga terminó con código {hijo.returncode}")
+    por_proceso = [json.loads(salida.strip().splitlines()[-1]) for salida in salidas]
+    if any(r is None for r in por_proceso):
+        return None
+    filas, total, errores = resumir(por_proceso)
+    total.update(procesos=procesos, sesiones=procesos * sesiones, segundos=round(segundos, 2))
+    return {"flujos": filas, "total": total, "errores": errores}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procesos", type=int, default=1)
+    parser.add_argument("--sesiones", type=int, default=50, help="sesiones por proceso")
+    parser.add_argument("--iteraciones", type=int, default=20, help="flujos por sesión")
+    parser.add_argument("--pausa-ms", type=float, default=0, help="pausa media entre flujos")
+    parser.add_argument("--demora-api-ms", type=float, default=80)
+    parser.add_argument("--clientes", type=int, default=10_000)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="JSON con el resultado completo")
+    # Uso interno: cada proceso hijo
+    parser.add_argument("--trabajador", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--proceso", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--datos", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trabajador:
+        resultados = trabajador(
+            args.sesiones, args.iteraciones, args.pausa_ms / 1000,
+            f"{args.semilla}-{args.proceso}", json.loads(args.datos),
+        )
+        print(json.dumps(resultados))
+        return
+
+    resultado = ejecutar(
+        args.procesos, args.sesiones, args.iteraciones, args.pausa_ms / 1000,
+        args.demora_api_ms / 1000, args.clientes, args.semilla,
+    )
+    if resultado is None:
+        print("streamlit no está instalado; no hay nada que medir")
+        return
+    for fila in resultado["flujos"]:
+        print(fila)
+    print(resultado["total"])
+    for error in resultado["errores"][:10]:
+        print(f"  {error['flujo']}: {error['error']}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, sort_keys=True, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
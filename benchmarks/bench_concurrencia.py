@@ -0,0 +1,163 @@
+"""Estrés de concurrencia: N sesiones registrando facturas a la vez.
+
+Compara conexiones sueltas por sesión con la configuración por defecto de
+SQLite contra el pool de base_datos (WAL, pragmas y un único escritor). Cada
+sesión simulada registra facturas igual que la pestaña Facturar: un INSERT del
+encabezado y uno por línea, cada uno en su propia transacción.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_concurrencia --sesiones 16 --facturas 50 --lineas 5
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+
+from base_datos import PoolConexiones, crear_esquema
+from benchmarks.comun import base_temporal, sembrar
+from metricas import percentil
+
+
+class EstrategiaSinPool:
+    # Lo que se obtiene sin el pool: cada sesión abre su propia conexión con
+    # los valores por defecto (journal DELETE, synchronous FULL) y hace un
+    # commit por sentencia. Compartir un único cursor entre hilos, como hacía
+    # el código original, ni siquiera es medible: el proceso puede caerse.
+    nombre = "sin_pool"
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        self._conexiones = []
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._conexiones.append(conn)
+        return conn
+
+    def registrar(self, cliente_id, lineas):
+        conn = self._conexion()
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO facturas (cliente_id, total_centimos) VALUES (?, ?)",
+            (cliente_id, sum(m * c for _, c, m in lineas)),
+        )
+        conn.commit()
+        factura_id = cursor.lastrowid
+        for producto_id, cantidad, monto in lineas:
+            cursor.execute(
+                "INSERT INTO factura_productos (factura_id, producto_id, cantidad, precio_centimos) VALUES (?, ?, ?, ?)",
+                (factura_id, producto_id, cantidad, monto),
+            )
+            conn.commit()
+        return factura_id
+
+    def cerrar(self):
+        for conn in self._conexiones:
+            conn.close()
+
+
+class EstrategiaPool:
+    nombre = "pool"
+
+    def __init__(self, ruta):
+        self.pool = PoolConexiones(ruta)
+        crear_esquema(self.pool)
+
+    def registrar(self, cliente_id, lineas):
+        with self.pool.escritura() as conn:
+            factura_id = conn.execute(
+                "INSERT INTO facturas (cliente_id, total_centimos) VALUES (?, ?)",
+                (cliente_id, sum(m * c for _, c, m in lineas)),
+            ).lastrowid
+        for producto_id, cantidad, monto in lineas:
+            with self.pool.escritura() as conn:
+                conn.execute(
+                    "INSERT INTO factura_productos (factura_id, producto_id, cantidad, precio_centimos) VALUES (?, ?, ?, ?)",
+                    (factura_id, producto_id, cantidad, monto),
+                )
+        return factura_id
+
+    def cerrar(self):
+        self.pool.cerrar()
+
+
+ESTRATEGIAS = {e.nombre: e for e in (EstrategiaSinPool, EstrategiaPool)}
+
+
+def ejecutar(estrategia_cls, sesiones, facturas, lineas):
+    with base_temporal() as ruta:
+        sembrar(ruta)
+        estrategia = estrategia_cls(ruta)
+        latencias = []
+        ids = []
+        errores = []
+        lock = threading.Lock()
+        barrera = threading.Barrier(sesiones)
+
+        def sesion(numero):
+            items = [(1 + (numero + i) % 20, 1 + i % 3, (1000 + i) * 100) for i in range(lineas)]
+            barrera.wait()
+            for _ in range(facturas):
+                inicio = time.perf_counter()
+                try:
+                    factura_id = estrategia.registrar(1, items)
+                except Exception as exc:  # contamos cualquier fallo de SQLite
+                    with lock:
+                        errores.append(repr(exc))
+                    continue
+                with lock:
+                    latencias.append(time.perf_counter() - inicio)
+                    ids.append(factura_id)
+
+        hilos = [threading.Thread(target=sesion, args=(n,)) for n in range(sesiones)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        esperas = getattr(getattr(estrategia, "pool", None), "esperas_escritura", None)
+        estrategia.cerrar()
+
+        # Dos sesiones que reciben el mismo lastrowid delatan estado compartido
+        ids_repetidos = len(ids) - len(set(ids))
+        latencias.sort()
+        return {
+            "estrategia": estrategia_cls.nombre,
+            "facturas_ok": len(latencias),
+            "errores": len(errores),
+            "ids_repetidos": ids_repetidos,
+            "facturas_por_segundo": len(latencias) / duracion if duracion else 0.0,
+            "p50_ms": _ms(percentil(latencias, 50)),
+            "p95_ms": _ms(percentil(latencias, 95)),
+            "esperas_lock_escritura": esperas,
+            "ejemplo_error": errores[0] if errores else None,
+        }
+
+
+def _ms(segundos):
+    return None if segundos is None else segundos * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sesiones", type=int, default=16)
+    parser.add_argument("--facturas", type=int, default=50)
+    parser.add_argument("--lineas", type=int, default=5)
+    parser.add_argument(
+        "--estrategia", choices=sorted(ESTRATEGIAS), action="append"
+    )
+    args = parser.parse_args()
+
+    for nombre in args.estrategia or sorted(ESTRATEGIAS):
+        resultado = ejecutar(ESTRATEGIAS[nombre], args.sesiones, args.facturas, args.lineas)
+        print(resultado)
+
+
+if __name__ == "__main__":
+    main()
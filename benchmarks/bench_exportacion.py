@@ -0,0 +1,92 @@
+"""Memoria y velocidad de la exportación de facturas con sus líneas.
+
+Para cada tamaño siembra una base con unas `filas` líneas de factura y
+exporta el conjunto "facturas" en cada formato con exportacion.exportar
+(fetchmany + generadores). El pico de memoria de Python (tracemalloc, en una
+corrida aparte para no inflar los tiempos) debería ser el mismo a 100k que a
+10M filas. Como referencia mide también el camino ingenuo, fetchall y después
+escribir, hasta `--max-materializar` filas.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_exportacion --filas 100000 1000000 10000000
+"""
+
+import argparse
+import csv
+import os
+import time
+import tracemalloc
+
+from base_datos import PoolConexiones, crear_esquema
+from benchmarks.comun import base_temporal
+from exportacion import CONJUNTOS, columnas, exportar
+from importacion import poblar_sintetico
+
+LINEAS_POR_FACTURA = 3
+
+
+def materializar(pool, destino):
+    # Como un cargador que devuelve la tabla entera (p. ej. un DataFrame)
+    with pool.lectura() as conn:
+        filas = conn.execute(CONJUNTOS["facturas"][1]).fetchall()
+    with open(destino, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(columnas("facturas"))
+        escritor.writerows(filas)
+    return {"filas": len(filas)}
+
+
+def medir(operacion):
+    inicio = time.perf_counter()
+    resumen = operacion()
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    operacion()
+    pico_mib = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return {
+        "filas_exportadas": resumen["filas"],
+        "segundos": round(segundos, 2),
+        "filas_por_segundo": round(resumen["filas"] / segundos) if segundos else None,
+        "pico_mib": round(pico_mib, 2),
+    }
+
+
+def ejecutar(filas, formatos, max_materializar):
+    resultados = []
+    with base_temporal() as ruta:
+        pool = PoolConexiones(ruta)
+        crear_esquema(pool)
+        poblar_sintetico(
+            pool, clientes=1000, productos=1000,
+            facturas=max(1, filas // LINEAS_POR_FACTURA),
+            lineas_por_factura=LINEAS_POR_FACTURA,
+        )
+        salida = os.path.join(os.path.dirname(ruta), "exportacion")
+        for formato in formatos:
+            destino = f"{salida}.{formato}"
+            resultado = medir(lambda: exportar(pool, "facturas", formato, destino))
+            resultado["bytes"] = os.path.getsize(destino)
+            resultados.append({"filas": filas, "caso": f"streaming_{formato}", **resultado})
+        if filas <= max_materializar:
+            destino = f"{salida}-fetchall.csv"
+            resultado = medir(lambda: materializar(pool, destino))
+            resultados.append({"filas": filas, "caso": "fetchall_csv", **resultado})
+        pool.cerrar()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--formatos", nargs="+", default=["csv", "jsonl", "parquet"])
+    parser.add_argument("--max-materializar", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    for filas in args.filas:
+        for resultado in ejecutar(filas, args.formatos, args.max_materializar):
+            print(resultado)
+
+
+if __name__ == "__main__":
+    main()
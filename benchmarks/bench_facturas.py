@@ -0,0 +1,88 @@
+"""Throughput de registro de facturas: por línea vs. transacción única.
+
+"por_linea" reproduce el camino anterior de la pestaña Facturar
+(agregar_factura + un agregar_factura_producto por línea, N+1 commits) y,
+para hacer el mismo trabajo, actualiza los resúmenes de ventas y deja el
+evento de cambio en un commit más; "atomica" usa
+facturacion.registrar_factura (todo en un commit con executemany).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_facturas --facturas 500 --lineas 1 10 100
+"""
+
+import argparse
+import time
+
+from analitica import actualizar_agregados
+from base_datos import PoolConexiones
+from benchmarks.comun import base_temporal, sembrar
+from cambios import ALTA, registrar
+from facturacion import INSERTAR_LINEA, registrar_factura
+from metricas import percentil
+from precios import a_centimos, liquidar
+
+
+def registrar_por_linea(pool, cliente_id, lineas):
+    with pool.escritura() as conn:
+        factura_id = conn.execute(
+            "INSERT INTO facturas (cliente_id, total_centimos) VALUES (?, ?)",
+            (cliente_id, liquidar(lineas)["total"]),
+        ).lastrowid
+    for linea in lineas:
+        with pool.escritura() as conn:
+            conn.execute(
+                INSERTAR_LINEA,
+                (factura_id, linea["producto_id"], linea["cantidad"], a_centimos(linea["monto"])),
+            )
+    with pool.escritura() as conn:
+        actualizar_agregados(conn, factura_id)
+        registrar(conn, "facturas", ALTA, [factura_id])
+    return factura_id
+
+
+MODOS = {"por_linea": registrar_por_linea, "atomica": registrar_factura}
+
+
+def ejecutar(modo, facturas, lineas):
+    with base_temporal() as ruta:
+        sembrar(ruta, productos=100)
+        pool = PoolConexiones(ruta)
+        items = [
+            {"producto_id": 1 + i % 100, "cantidad": 1 + i % 3, "monto": 1000.0 + i}
+            for i in range(lineas)
+        ]
+        registrar = MODOS[modo]
+        latencias = []
+        inicio = time.perf_counter()
+        for _ in range(facturas):
+            t0 = time.perf_counter()
+            registrar(pool, 1, items)
+            latencias.append(time.perf_counter() - t0)
+        duracion = time.perf_counter() - inicio
+        pool.cerrar()
+
+    latencias.sort()
+    return {
+        "modo": modo,
+        "lineas": lineas,
+        "facturas_por_segundo": facturas / duracion,
+        "lineas_por_segundo": facturas * lineas / duracion,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facturas", type=int, default=500)
+    parser.add_argument("--lineas", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--modo", choices=sorted(MODOS), action="append")
+    args = parser.parse_args()
+
+    for lineas in args.lineas:
+        for modo in args.modo or sorted(MODOS):
+            print(ejecutar(modo, args.facturas, lineas))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Llamadas HTTP salientes contra un servidor local simulado.
+
+Compara, para la API de citas:
+- requests.get suelto (una conexión TCP nueva por llamada, como antes),
+- ClienteHttp con sesión keep-alive,
+- Reserva de citas ya pedidas (lo que ve la pestaña Chistín),
+y mide cuánto tarda una llamada con el servicio caído, con y sin
+cortocircuito (el servidor simulado tarda `--demora-caido-ms` en devolver 503).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_http --llamadas 200 --demora-ms 20
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cliente_http import CircuitoAbierto, ClienteHttp, Cortocircuito, Reserva
+from metricas import percentil
+
+
+def servidor_simulado(demora, demora_caido):
+    estado = {"caido": False}
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_GET(self):
+            if estado["caido"]:
+                time.sleep(demora_caido)
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            time.sleep(demora)
+            cuerpo = json.dumps(
+                {"value": "Cita de prueba", "appeared_at": "2016-01-01T00:00:00Z"}
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, estado
+
+
+def medir(nombre, llamar, llamadas):
+    tiempos = []
+    errores = 0
+    for _ in range(llamadas):
+        inicio = time.perf_counter()
+        try:
+            llamar()
+        except Exception:
+            errores += 1
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    print(
+        f"{nombre:<28} p50 {percentil(tiempos, 50) * 1000:7.2f} ms  "
+        f"p95 {percentil(tiempos, 95) * 1000:7.2f} ms  errores {errores}"
+    )
+
+
+def main():
+    import requests  # type: ignore
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llamadas", type=int, default=200)
+    parser.add_argument("--demora-ms", type=float, default=20)
+    parser.add_argument("--demora-caido-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    servidor, estado = servidor_simulado(args.demora_ms / 1000, args.demora_caido_ms / 1000)
+    url = f"http://127.0.0.1:{servidor.server_port}/random/quote"
+    cliente = ClienteHttp("bench", cortocircuito=Cortocircuito(umbral_fallos=3))
+
+    def pedir():
+        respuesta = cliente.solicitar("GET", url)
+        respuesta.raise_for_status()
+        return respuesta.json()
+
+    medir("requests.get por llamada", lambda: requests.get(url, timeout=10).json(), args.llamadas)
+    medir("sesión keep-alive", pedir, args.llamadas)
+
+    reserva = Reserva(pedir, capacidad=10, minimo=3, nombre="bench")
+    reserva.rellenar()
+    while reserva.disponibles() < reserva.capacidad:
+        time.sleep(0.01)
+    # A ritmo de usuario: una cita cada tanto, el relleno va por detrás
+    def tomar():
+        reserva.tomar()
+        time.sleep(args.demora_ms / 1000)
+
+    medir("reserva de citas", tomar, args.llamadas)
+    print(f"  aciertos {reserva.aciertos}, fallos {reserva.fallos}")
+
+    estado["caido"] = True
+    llamadas_caido = max(10, args.llamadas // 10)
+    medir(
+        "caído, sin cortocircuito",
+        lambda: requests.get(url, timeout=10).raise_for_status(),
+        llamadas_caido,
+    )
+    medir("caído, con cortocircuito", pedir, llamadas_caido)
+    print(
+        f"  estado {cliente.cortocircuito.estado}, "
+        f"rechazadas sin red {cliente.cortocircuito.rechazadas}"
+    )
+    try:
+        pedir()
+    except CircuitoAbierto as e:
+        print(f"  {e}")
+    cliente.cerrar()
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Consultas SQL por interacción: pestañas (todo se ejecuta) vs. secciones.
+
+Ejecuta erp_app.py con streamlit.testing (AppTest) en cada modo de
+ERP_NAVEGACION y lee st.session_state.consultas_rerun, que la aplicación
+llena con pool.contar_consultas. Cada modo corre en un proceso nuevo, así el
+caché de lecturas empieza vacío en ambos.
+
+AppTest vuelve a ejecutar el script completo en cada interacción, así que los
+números no incluyen el ahorro de los fragmentos; ese se ve en la barra
+lateral de la aplicación ("Consultas SQL del último rerun de la factura").
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_navegacion --clientes 10000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from base_datos import PoolConexiones, crear_esquema
+from benchmarks.comun import base_temporal
+from importacion import poblar_sintetico
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODOS = ["pestanas", "secciones"]
+
+# Se ejecuta con `python -c` en un proceso nuevo; imprime un JSON
+_CODIGO = """
+import json, os, sys
+try:
+    from streamlit.testing.v1 import AppTest
+except ImportError:
+    print(json.dumps(None))
+    sys.exit(0)
+
+secciones = os.environ["ERP_NAVEGACION"] == "secciones"
+app = AppTest.from_file("erp_app.py", default_timeout=120)
+conteos = {}
+
+def medir(nombre):
+    if app.exception:
+        raise SystemExit(f"erp_app.py falló en {nombre}: {app.exception}")
+    conteos[nombre] = app.session_state["consultas_rerun"]
+
+def ir_a(seccion):
+    if secciones:
+        app.radio(key="seccion").set_value(seccion).run()
+    else:
+        app.run()
+
+def boton(etiqueta):
+    return next(b for b in app.button if b.label == etiqueta)
+
+app.run()
+medir("carga_inicial")
+app.run()
+medir("rerun_sin_cambios")
+ir_a("Listado de Clientes")
+app.button(key="siguiente_clientes").click().run()
+medir("pagina_siguiente_clientes")
+ir_a("Facturar")
+medir("abrir_facturar")
+boton("Agregar producto").click().run()
+medir("agregar_linea_factura")
+ir_a("Chistín")
+medir("abrir_chistin")
+print(json.dumps(conteos))
+"""
+
+
+def medir_modo(ruta, modo):
+    entorno = dict(
+        os.environ, ERP_DB_PATH=ruta, ERP_FACTURAS_BACKEND="stub", ERP_NAVEGACION=modo
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", _CODIGO],
+        cwd=RAIZ,
+        env=entorno,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def ejecutar(clientes):
+    resultados = []
+    with base_temporal() as ruta:
+        pool = PoolConexiones(ruta)
+        crear_esquema(pool)
+        poblar_sintetico(pool, clientes=clientes, productos=max(1, clientes // 10), facturas=0)
+        pool.cerrar()
+
+        for modo in MODOS:
+            conteos = medir_modo(ruta, modo)
+            if conteos is None:
+                print("streamlit no está instalado; no hay nada que medir")
+                return []
+            for interaccion, consultas in conteos.items():
+                resultados.append(
+                    {"modo": modo, "interaccion": interaccion, "consultas": consultas}
+                )
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clientes", type=int, default=10_000)
+    args = parser.parse_args()
+
+    for resultado in ejecutar(args.clientes):
+        print(resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Latencia de listados paginados a distintos tamaños de tabla.
+
+Compara la paginación por llave de paginacion.pagina contra LIMIT/OFFSET,
+pidiendo la primera página y una página cerca del final, con y sin filtros.
+Con keyset la latencia debería mantenerse plana al crecer la tabla. También
+mide la búsqueda de texto completo de los selectores (busqueda.buscar).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_paginacion --filas 1000 100000 1000000
+"""
+
+import argparse
+import time
+
+from base_datos import PoolConexiones, crear_esquema
+from busqueda import buscar
+from benchmarks.comun import base_temporal
+from importacion import poblar_sintetico
+from metricas import percentil
+from paginacion import CLIENTES, pagina
+
+REPETICIONES = 50
+
+
+def medir(funcion, repeticiones=REPETICIONES):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return {"p50_ms": percentil(tiempos, 50) * 1000, "p95_ms": percentil(tiempos, 95) * 1000}
+
+
+def pagina_offset(pool, tamano, desplazamiento):
+    with pool.lectura() as conn:
+        return conn.execute(
+            "SELECT id, nombre, correo_electronico, segmento_negocio FROM clientes "
+            "ORDER BY id LIMIT ? OFFSET ?",
+            (tamano, desplazamiento),
+        ).fetchall()
+
+
+def ejecutar(filas, tamano=50):
+    resultados = []
+    with base_temporal() as ruta:
+        pool = PoolConexiones(ruta)
+        crear_esquema(pool)
+        poblar_sintetico(pool, clientes=filas)
+        cerca_del_final = (filas - 2 * tamano, filas - 2 * tamano)
+
+        casos = {
+            "keyset_primera": lambda: pagina(pool, CLIENTES, tamano),
+            "keyset_final": lambda: pagina(pool, CLIENTES, tamano, cerca_del_final),
+            "offset_primera": lambda: pagina_offset(pool, tamano, 0),
+            "offset_final": lambda: pagina_offset(pool, tamano, filas - 2 * tamano),
+            "keyset_segmento": lambda: pagina(pool, CLIENTES, tamano, filtro="Retail"),
+            "keyset_prefijo": lambda: pagina(pool, CLIENTES, tamano, prefijo="Cliente 99"),
+            "keyset_por_nombre": lambda: pagina(pool, CLIENTES, tamano, orden="nombre"),
+            "fts_selectiva": lambda: buscar(pool, CLIENTES, "cliente 12", tamano),
+            "fts_comun": lambda: buscar(pool, CLIENTES, "cliente", tamano),
+            "fts_correo": lambda: buscar(pool, CLIENTES, "example", tamano),
+        }
+        for caso, funcion in casos.items():
+            resultados.append({"filas": filas, "caso": caso, **medir(funcion)})
+        pool.cerrar()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--tamano", type=int, default=50)
+    args = parser.parse_args()
+
+    for filas in args.filas:
+        for resultado in ejecutar(filas, args.tamano):
+            print(resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Base activa con todo el historial contra años viejos archivados.
+
+Siembra `--facturas` facturas repartidas en `--anios` años cerrados más unas
+cuantas del mes actual y mide, antes y después de archivar los años viejos
+con particiones.archivar_anteriores (y compactar):
+- las facturas del mes (particiones.facturas_entre),
+- registrar una factura,
+- el tamaño de la base activa y cuánto tarda respaldarla.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_particiones --facturas 1000000 --anios 10
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+from base_datos import PoolConexiones, crear_esquema
+from benchmarks.comun import base_temporal
+from facturacion import registrar_factura, registrar_facturas
+from importacion import poblar_sintetico
+from mantenimiento import compactar, respaldar
+from metricas import percentil
+import particiones
+
+REPETICIONES = 200
+
+
+def medir(funcion, repeticiones=REPETICIONES):
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return round(percentil(tiempos, 50) * 1000, 3), round(percentil(tiempos, 95) * 1000, 3)
+
+
+def sembrar(pool, facturas, anios):
+    poblar_sintetico(pool, clientes=10_000, productos=1_000, facturas=facturas)
+    # Las fechas sintéticas caen en 2023-2024; se corren de a años completos
+    with pool.escritura() as conn:
+        conn.execute(
+            "UPDATE facturas SET emitida_en = datetime(emitida_en, printf('-%d years', id % ?))",
+            (anios,),
+        )
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    lineas = [{"producto_id": 1, "cantidad": 1, "monto": 1000.0}]
+    registrar_facturas(pool, [(1 + i % 1000, lineas) for i in range(1000)], emitida_en=ahora)
+
+
+def mediciones(pool, directorio):
+    hoy = datetime.now().date()
+    desde, hasta = hoy.replace(day=1).isoformat(), f"{hoy.year + 1:04d}-01-01"
+    lineas = [{"producto_id": 1, "cantidad": 1, "monto": 1000.0}]
+    mes_p50, mes_p95 = medir(lambda i: particiones.facturas_entre(pool, desde, hasta))
+    registrar_p50, registrar_p95 = medir(lambda i: registrar_factura(pool, 1 + i, lineas))
+    inicio = time.perf_counter()
+    respaldo = respaldar(pool, directorio)
+    segundos_respaldo = time.perf_counter() - inicio
+    os.remove(respaldo)
+    return {
+        "mes_p50_ms": mes_p50,
+        "mes_p95_ms": mes_p95,
+        "registrar_p50_ms": registrar_p50,
+        "registrar_p95_ms": registrar_p95,
+        "base_activa_mib": round(os.path.getsize(pool.ruta) / 1024 / 1024, 1),
+        "respaldo_s": round(segundos_respaldo, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facturas", type=int, default=1_000_000)
+    parser.add_argument("--anios", type=int, default=10)
+    args = parser.parse_args()
+
+    with base_temporal() as ruta:
+        directorio = os.path.dirname(ruta)
+        pool = PoolConexiones(ruta)
+        crear_esquema(pool)
+        sembrar(pool, args.facturas, args.anios)
+        compactar(pool)
+        print({"caso": "todo_en_la_base_activa", **mediciones(pool, directorio)})
+
+        inicio = time.perf_counter()
+        resumenes = particiones.archivar_anteriores(
+            pool, directorio=os.path.join(directorio, "archivo")
+        )
+        segundos = time.perf_counter() - inicio
+        compactar(pool)
+        print(
+            {
+                "caso": "archivar",
+                "anios": len(resumenes),
+                "facturas": sum(r["facturas"] for r in resumenes),
+                "segundos": round(segundos, 2),
+            }
+        )
+        print({"caso": "anios_viejos_archivados", **mediciones(pool, directorio)})
+        pool.cerrar()
+
+
+if __name__ == "__main__":
+    main()
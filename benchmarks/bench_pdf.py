@@ -0,0 +1,119 @@
+"""Latencia por factura: API remota (contra un servidor simulado) vs. render local.
+
+El servidor simulado responde como invoice-generator.com tras una demora
+configurable (por defecto 80 ms, un RTT razonable a un servicio externo), así
+se mide el costo del camino remoto sin depender de la red real. También mide
+el lote de re-emisión en serie vs. en un pool de procesos.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_pdf --facturas 200 --lineas 10 --demora-ms 80
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cola_facturas import BackendApi, datos_factura
+from metricas import percentil
+from pdf_facturas import CachePdf, renderizar_lote, renderizar_pdf
+
+
+def servidor_simulado(demora):
+    class Manejador(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(demora)
+            cuerpo = b"%PDF-1.4\n%%EOF\n"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def facturas_de_prueba(cantidad, lineas):
+    return [
+        datos_factura(
+            numero,
+            f"Cliente {numero}",
+            [
+                {"nombre": f"Producto {i}", "cantidad": 1 + i % 4, "monto": 1000.0 + i}
+                for i in range(lineas)
+            ],
+        )
+        for numero in range(1, cantidad + 1)
+    ]
+
+
+def medir(nombre, renderizar, lista_datos):
+    tiempos = []
+    for datos in lista_datos:
+        inicio = time.perf_counter()
+        renderizar(datos)
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return {
+        "camino": nombre,
+        "p50_ms": percentil(tiempos, 50) * 1000,
+        "p95_ms": percentil(tiempos, 95) * 1000,
+        "facturas_por_segundo": len(tiempos) / sum(tiempos),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facturas", type=int, default=200)
+    parser.add_argument("--lineas", type=int, default=10)
+    parser.add_argument("--demora-ms", type=float, default=80)
+    parser.add_argument("--procesos", type=int, default=None)
+    args = parser.parse_args()
+
+    lista_datos = facturas_de_prueba(args.facturas, args.lineas)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(medir("local_sin_cache", renderizar_pdf, lista_datos))
+        cache = CachePdf(os.path.join(tmp, "cache"))
+        for datos in lista_datos:
+            cache.obtener(datos)
+        print(medir("local_cache", cache.obtener, lista_datos))
+
+        servidor = servidor_simulado(args.demora_ms / 1000)
+        backend = BackendApi(url=f"http://127.0.0.1:{servidor.server_port}", api_key="simulada")
+        try:
+            # La API es lenta: con unas pocas facturas alcanza para la mediana
+            print(medir("api_simulada", backend.renderizar, lista_datos[:50]))
+        except ImportError:
+            print({"camino": "api_simulada", "omitido": "requests no está instalado"})
+        finally:
+            servidor.shutdown()
+
+        for procesos in (1, args.procesos):
+            inicio = time.perf_counter()
+            renderizar_lote(
+                lista_datos,
+                os.path.join(tmp, f"lote_{procesos}"),
+                procesos,
+                os.path.join(tmp, f"cache_lote_{procesos}"),
+            )
+            segundos = time.perf_counter() - inicio
+            print(
+                {
+                    "camino": f"lote_procesos_{procesos or os.cpu_count()}",
+                    "segundos": segundos,
+                    "facturas_por_segundo": len(lista_datos) / segundos,
+                }
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Utilidades compartidas por los benchmarks."""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+from base_datos import PoolConexiones, crear_esquema
+
+
+@contextmanager
+def base_temporal(nombre="bench.db"):
+    # Cada corrida usa un archivo nuevo que se borra al terminar
+    with tempfile.TemporaryDirectory() as tmp:
+        yield os.path.join(tmp, nombre)
+
+
+def sembrar(ruta, clientes=1, productos=20):
+    pool = PoolConexiones(ruta)
+    crear_esquema(pool)
+    with pool.escritura() as conn:
+        conn.executemany(
+            "INSERT INTO clientes (nombre, correo_electronico, segmento_negocio) VALUES (?, ?, ?)",
+            [(f"Cliente {i}", f"cliente{i}@example.com", "Corporativo") for i in range(clientes)],
+        )
+        conn.executemany(
+            "INSERT INTO productos (nombre, categoria, precio_centimos) VALUES (?, ?, ?)",
+            [(f"Producto {i}", "Bench", (1000 + i) * 100) for i in range(productos)],
+        )
+    pool.cerrar()
@@ -0,0 +1,270 @@
+"""Suite de benchmarks de los caminos de datos del ERP, sin Streamlit.
+
+Para cada escala (clientes = productos = N, más N/10 facturas de 3 líneas)
+siembra una base nueva y mide los cargadores de listados, el CRUD de
+clientes, el registro de facturas (por línea como agregar_factura +
+agregar_factura_producto, y atómico con registrar_factura), las variantes por
+lotes de repositorio y facturacion, la carga de los datos de ejemplo y
+reset_database. De cada caso guarda throughput, p50/p95/p99
+y el pico de memoria de Python (tracemalloc, en una corrida aparte para no
+inflar los tiempos).
+
+Los resultados se escriben en un JSON con claves ordenadas, pensado para
+compararlo entre corridas con --comparar o con un diff.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.suite --escalas 1000 100000 1000000 --salida resultados.json
+    python -m benchmarks.suite --escalas 1000 --comparar resultados.json
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from base_datos import PoolConexiones, crear_esquema
+from benchmarks.comun import base_temporal
+from datos_ejemplo import insertar_datos_de_ejemplo
+from facturacion import calcular_total, registrar_factura, registrar_facturas
+from importacion import poblar_sintetico
+from metricas import percentil
+from paginacion import CLIENTES, PRODUCTOS, pagina
+import repositorio
+
+OPERACIONES_ESCRITURA = 200
+LINEAS_POR_FACTURA = 3
+TAMANO_LOTE = 10_000
+
+
+def factura_por_linea(pool, cliente_id, lineas):
+    # Camino anterior de la pestaña Facturar: N+1 transacciones
+    factura_id = repositorio.agregar_factura(pool, cliente_id, calcular_total(lineas))
+    for linea in lineas:
+        repositorio.agregar_factura_producto(
+            pool, factura_id, linea["producto_id"], linea["cantidad"], linea["monto"]
+        )
+    return factura_id
+
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 4)
+
+
+def medir(caso, escala, operacion, repeticiones, memoria=True):
+    """Corre `operacion(i)` `repeticiones` veces y arma el resultado del caso."""
+    tiempos = []
+    inicio_total = time.perf_counter()
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        operacion(i)
+        tiempos.append(time.perf_counter() - inicio)
+    total = time.perf_counter() - inicio_total
+
+    pico_kib = None
+    if memoria:
+        tracemalloc.start()
+        operacion(repeticiones)
+        pico_kib = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+
+    tiempos.sort()
+    return {
+        "escala": escala,
+        "caso": caso,
+        "operaciones": repeticiones,
+        "ops_por_segundo": round(repeticiones / total, 2) if total else None,
+        "p50_ms": _ms(percentil(tiempos, 50)),
+        "p95_ms": _ms(percentil(tiempos, 95)),
+        "p99_ms": _ms(percentil(tiempos, 99)),
+        "pico_memoria_kib": pico_kib,
+    }
+
+
+def ejecutar(escala):
+    resultados = []
+    # Cargar la tabla completa es lineal en N: menos repeticiones en las grandes
+    repeticiones_carga = max(3, min(50, 5_000_000 // escala))
+    with base_temporal() as ruta:
+        pool = PoolConexiones(ruta)
+        crear_esquema(pool)
+        inicio = time.perf_counter()
+        poblar_sintetico(
+            pool, clientes=escala, productos=escala, facturas=max(10, escala // 10),
+            lineas_por_factura=LINEAS_POR_FACTURA,
+        )
+        print(f"{escala}: base sembrada en {time.perf_counter() - inicio:.1f} s", file=sys.stderr)
+
+        casos = [
+            ("cargar_clientes", lambda i: repositorio.cargar_clientes(pool), repeticiones_carga),
+            ("cargar_productos", lambda i: repositorio.cargar_productos(pool), repeticiones_carga),
+            ("pagina_clientes", lambda i: pagina(pool, CLIENTES, 50), 100),
+            ("pagina_clientes_segmento", lambda i: pagina(pool, CLIENTES, 50, filtro="Retail"), 100),
+            (
+                "buscar_productos_prefijo",
+                lambda i: pagina(pool, PRODUCTOS, 50, orden="nombre", prefijo=f"Producto {i % 10}"),
+                100,
+            ),
+        ]
+        for caso, operacion, repeticiones in casos:
+            resultados.append(medir(caso, escala, operacion, repeticiones))
+
+        # CRUD sobre clientes nuevos, para no depender de los IDs sembrados
+        nuevos = []
+        resultados.append(
+            medir(
+                "agregar_cliente",
+                escala,
+                lambda i: nuevos.append(
+                    repositorio.agregar_cliente(
+                        pool, f"Bench {i}", f"bench{i}@example.com", "Bench"
+                    )
+                ),
+                OPERACIONES_ESCRITURA,
+            )
+        )
+        resultados.append(
+            medir(
+                "actualizar_cliente",
+                escala,
+                lambda i: repositorio.actualizar_cliente(
+                    pool, nuevos[i], f"Bench {i} bis", f"bench{i}@example.com", "Bench"
+                ),
+                OPERACIONES_ESCRITURA,
+            )
+        )
+        resultados.append(
+            medir(
+                "eliminar_cliente",
+                escala,
+                lambda i: repositorio.eliminar_cliente(pool, nuevos[i]),
+                OPERACIONES_ESCRITURA,
+            )
+        )
+
+        lineas = [
+            {"producto_id": 1 + p, "cantidad": 2, "monto": 1000.0}
+            for p in range(LINEAS_POR_FACTURA)
+        ]
+        resultados.append(
+            medir(
+                "factura_por_linea",
+                escala,
+                lambda i: factura_por_linea(pool, 1, lineas),
+                OPERACIONES_ESCRITURA,
+            )
+        )
+        resultados.append(
+            medir(
+                "registrar_factura",
+                escala,
+                lambda i: registrar_factura(pool, 1, lineas),
+                OPERACIONES_ESCRITURA,
+            )
+        )
+        # Variantes por lotes de repositorio/facturacion, para trabajos nocturnos
+        lote_clientes = [
+            (f"Lote {i}", f"lote{i}@example.com", "Lote") for i in range(TAMANO_LOTE)
+        ]
+        resultados.append(
+            medir(
+                "agregar_clientes_lote",
+                escala,
+                lambda i: repositorio.agregar_clientes(pool, lote_clientes),
+                5,
+            )
+        )
+        lote_facturas = [(1, lineas)] * (TAMANO_LOTE // 10)
+        resultados.append(
+            medir(
+                "registrar_facturas_lote",
+                escala,
+                lambda i: registrar_facturas(pool, lote_facturas),
+                5,
+            )
+        )
+        resultados.append(
+            medir(
+                "iterar_clientes",
+                escala,
+                lambda i: sum(len(b) for b in repositorio.iterar(pool, "clientes")),
+                max(1, repeticiones_carga // 5),
+            )
+        )
+
+        resultados.append(
+            medir("datos_de_ejemplo", escala, lambda i: insertar_datos_de_ejemplo(pool), 5)
+        )
+
+        # Destructivo: una sola corrida, con tracemalloc activo durante ella
+        # (el trabajo es casi todo SQLite, así que apenas afecta el tiempo)
+        tracemalloc.start()
+        resultado = medir(
+            "reset_database", escala, lambda i: repositorio.borrar_todo(pool), 1, memoria=False
+        )
+        resultado["pico_memoria_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+        resultados.append(resultado)
+        pool.cerrar()
+    return resultados
+
+
+def metadatos():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+    }
+
+
+def comparar(anteriores, actuales):
+    # Diferencia de p50 y throughput contra una corrida anterior
+    previos = {(r["escala"], r["caso"]): r for r in anteriores["resultados"]}
+    for resultado in actuales["resultados"]:
+        previo = previos.get((resultado["escala"], resultado["caso"]))
+        if previo is None or not previo["p50_ms"]:
+            continue
+        cambio = (resultado["p50_ms"] - previo["p50_ms"]) / previo["p50_ms"] * 100
+        print(
+            f"{resultado['escala']:>9} {resultado['caso']:<26} "
+            f"p50 {previo['p50_ms']:.3f} -> {resultado['p50_ms']:.3f} ms ({cambio:+.1f} %)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--salida", default="resultados_benchmarks.json")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    resultados = []
+    for escala in args.escalas:
+        for resultado in ejecutar(escala):
+            print(resultado)
+            resultados.append(resultado)
+
+    documento = {"metadatos": metadatos(), "resultados": resultados}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(json.load(f), documento)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(documento, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+    print(f"Resultados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Búsqueda de texto completo de clientes y productos con FTS5.
+
+Cada tabla tiene un índice FTS5 de contenido externo (no duplica el texto,
+lo lee de la tabla original) que los triggers mantienen al día en la misma
+transacción que cada INSERT/UPDATE/DELETE. El tokenizador unicode61 con
+remove_diacritics 2 ignora mayúsculas y tildes: "papeleria" encuentra
+"Papelería" y "disenos" encuentra "Diseños". Cada palabra buscada se trata
+como prefijo, y los resultados se ordenan por relevancia (bm25, con más peso
+para el nombre).
+
+Ordenar por relevancia obliga a puntuar todas las coincidencias: con un
+millón de clientes "cliente" coincide con todos y tarda segundos. Por eso se
+puntúan como mucho MAX_CANDIDATOS coincidencias (las primeras por ID); las
+búsquedas selectivas, que son las útiles, quedan ordenadas por completo.
+"""
+
+import re
+from contextlib import contextmanager
+
+from metricas import metricas
+
+# tabla -> (índice FTS5, columnas indexadas, peso bm25 de cada columna)
+INDICES = {
+    "clientes": ("clientes_fts", ("nombre", "correo_electronico"), (10.0, 1.0)),
+    "productos": ("productos_fts", ("nombre", "categoria"), (10.0, 2.0)),
+}
+# Con menos caracteres conviene el listado por prefijo de nombre
+MIN_CARACTERES = 2
+MAX_CANDIDATOS = 200
+
+_PALABRA = re.compile(r"\w+")
+
+
+def vaciar_indices(conn):
+    # Para cuando las tablas se vacían sin DELETE (mantenimiento.vaciar), que
+    # no dispara los triggers
+    for indice, _, _ in INDICES.values():
+        conn.execute(f"INSERT INTO {indice} ({indice}) VALUES ('delete-all')")
+
+
+@contextmanager
+def indexacion_diferida(conn, tablas):
+    """Quita los triggers de búsqueda de `tablas` y al salir indexa las filas nuevas.
+
+    Para cargas masivas que solo insertan: un INSERT ... SELECT al final es
+    varias veces más rápido que el trigger fila por fila. Debe usarse dentro
+    de una transacción abierta.
+    """
+    tablas = [tabla for tabla in tablas if tabla in INDICES]
+    desde = {}
+    triggers = []
+    for tabla in tablas:
+        desde[tabla] = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabla}").fetchone()[0]
+        triggers += conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ? AND name LIKE ?",
+            (tabla, f"{INDICES[tabla][0]}_%"),
+        ).fetchall()
+    for nombre, _ in triggers:
+        conn.execute(f'DROP TRIGGER "{nombre}"')
+    yield
+    for tabla in tablas:
+        indice, columnas, _ = INDICES[tabla]
+        lista = ", ".join(columnas)
+        conn.execute(
+            f"INSERT INTO {indice} (rowid, {lista}) SELECT id, {lista} FROM {tabla} WHERE id > ?",
+            (desde[tabla],),
+        )
+    for _, sql in triggers:
+        conn.execute(sql)
+
+
+def consulta_fts(texto):
+    """Convierte lo que escribió el usuario en una consulta MATCH segura.
+
+    Cada palabra se vuelve un prefijo entre comillas ("pape"*), así los
+    operadores de FTS5 (AND, OR, NEAR, :, -) se buscan como texto. Devuelve
+    None si no hay ninguna palabra.
+    """
+    palabras = _PALABRA.findall(texto or "")
+    if not palabras:
+        return None
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+
+@metricas.instrumentar()
+def buscar(pool, listado, texto, limite=50):
+    """Filas del listado (mismas columnas que paginacion) que coinciden con `texto`.
+
+    Ordenadas por relevancia entre las primeras MAX_CANDIDATOS coincidencias
+    y como mucho `limite`.
+    """
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return []
+    tabla = listado["tabla"]
+    indice = INDICES[tabla][0]
+    columnas = ", ".join(f"t.{c}" for c in listado["columnas"])
+    # Sin ORDER BY, FTS5 entrega las coincidencias en orden de ID y se
+    # detiene en el LIMIT interno; solo esas se puntúan
+    with pool.lectura() as conn:
+        return conn.execute(
+            f"""
+            SELECT {columnas}
+            FROM (
+                SELECT rowid, rank FROM {indice} WHERE {indice} MATCH ? LIMIT ?
+            ) candidatos
+            JOIN {tabla} t ON t.id = candidatos.rowid
+            ORDER BY candidatos.rank
+            LIMIT ?
+            """,
+            (consulta, MAX_CANDIDATOS, limite),
+        ).fetchall()
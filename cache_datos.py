@@ -0,0 +1,148 @@
+"""Caché de lecturas compartida por todo el proceso.
+
+Streamlit vuelve a ejecutar erp_app.py en cada interacción, pero los módulos
+importados se conservan en memoria, así que el caché vive aquí y lo comparten
+todas las sesiones. Hay un caché por archivo de base de datos (`obtener_cache`),
+así dos pools del mismo proceso nunca comparten filas. Cada entrada depende de una o más tablas; cada tabla lleva
+un contador de versión que las funciones de escritura incrementan para
+invalidar las entradas afectadas.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Límite de memoria por defecto: 64 MiB (configurable con ERP_CACHE_MAX_BYTES)
+MAX_BYTES_POR_DEFECTO = 64 * 1024 * 1024
+# Con más elementos que esto, el tamaño de una colección se extrapola de una muestra
+MUESTRA_TAMANO = 256
+
+
+def estimar_tamano(valor):
+    # Los DataFrames reportan su tamaño real; para lo demás basta una aproximación
+    uso_memoria = getattr(valor, "memory_usage", None)
+    if callable(uso_memoria):
+        try:
+            return int(uso_memoria(deep=True).sum())
+        except TypeError:
+            pass
+    return _tamano_profundo(valor)
+
+
+def _tamano_profundo(valor):
+    # getsizeof de una lista solo cuenta los punteros: se suman las filas y
+    # sus valores. En colecciones grandes se mide una muestra pareja y se
+    # extrapola, así estimar no cuesta tanto como cargar
+    tamano = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        elementos = [*valor.keys(), *valor.values()]
+    elif isinstance(valor, (list, tuple)):
+        elementos = valor
+    elif isinstance(valor, (set, frozenset)):
+        elementos = list(valor)
+    else:
+        return tamano
+    if not elementos:
+        return tamano
+    paso = max(1, len(elementos) // MUESTRA_TAMANO)
+    muestra = elementos[::paso]
+    medido = sum(_tamano_profundo(elemento) for elemento in muestra)
+    return tamano + medido * len(elementos) // len(muestra)
+
+
+class CacheLecturas:
+    def __init__(self, max_bytes=MAX_BYTES_POR_DEFECTO):
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._versiones = {}
+        # clave -> (versiones de las tablas al cargar, tablas, valor, tamaño)
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self, tabla):
+        with self._lock:
+            return self._versiones.get(tabla, 0)
+
+    def obtener(self, clave, tablas, cargar):
+        """Devuelve el valor cacheado para `clave` o lo carga con `cargar()`.
+
+        El valor devuelto se comparte entre sesiones y no debe modificarse.
+        """
+        with self._lock:
+            versiones = tuple(self._versiones.get(t, 0) for t in tablas)
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == versiones:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return entrada[2]
+            self.misses += 1
+
+        valor = cargar()
+        tamano = estimar_tamano(valor)
+
+        with self._lock:
+            # Si alguien escribió mientras cargábamos, el valor ya nació viejo
+            if versiones != tuple(self._versiones.get(t, 0) for t in tablas):
+                return valor
+            self._quitar(clave)
+            if tamano <= self.max_bytes:
+                self._entradas[clave] = (versiones, tuple(tablas), valor, tamano)
+                self._bytes += tamano
+                self._desalojar()
+        return valor
+
+    def invalidar(self, *tablas):
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+            for clave in [
+                c for c, e in self._entradas.items() if set(e[1]) & set(tablas)
+            ]:
+                self._quitar(clave)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is not None:
+            self._bytes -= entrada[3]
+
+    def _desalojar(self):
+        # Sacamos las entradas menos usadas hasta volver a caber en el límite
+        while self._bytes > self.max_bytes and self._entradas:
+            _, entrada = self._entradas.popitem(last=False)
+            self._bytes -= entrada[3]
+            self.evictions += 1
+
+
+_caches = {}
+_lock_caches = threading.Lock()
+
+
+def obtener_cache(pool):
+    # Un caché por archivo de base de datos y por proceso, como el pool
+    with _lock_caches:
+        cache = _caches.get(pool.ruta)
+        if cache is None:
+            cache = _caches[pool.ruta] = CacheLecturas(
+                max_bytes=int(os.environ.get("ERP_CACHE_MAX_BYTES", MAX_BYTES_POR_DEFECTO))
+            )
+        return cache
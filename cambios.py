@@ -0,0 +1,343 @@
+"""Registro de cambios para mantener al día los cachés de varios procesos.
+
+Cada función de escritura agrega, en su misma transacción, un evento por fila
+tocada a la tabla `cambios`: (seq, tabla, fila_id, op, origen). Las cargas
+masivas y los vaciados dejan un solo evento sin fila_id ("todo": cambió la
+tabla entera). Como en SQLite hay un solo escritor a la vez y `seq` es
+AUTOINCREMENT, los números de secuencia quedan en el orden de los commits y
+sin huecos: quien ya leyó hasta `seq` nunca verá aparecer después un evento
+anterior.
+
+Cada proceso (cada réplica de Streamlit) tiene un `Suscriptor` que consulta
+los eventos nuevos cada INTERVALO_SONDEO segundos y:
+- invalida en el caché de lecturas de la base solo las tablas que otro proceso cambió (las
+  escrituras propias ya invalidan al momento),
+- actualiza por ID las instantáneas en memoria de clientes y productos; un
+  evento "todo" o un hueco en la secuencia (eventos ya podados, base
+  restaurada de un respaldo) recarga la tabla entera.
+
+Así una réplica puede cachear sin límite de tiempo y ver los cambios de las
+demás con un retraso acotado por el intervalo de sondeo.
+
+Uso:
+    python cambios.py --listar 20
+    python cambios.py --podar
+"""
+
+import argparse
+import logging
+import os
+import secrets
+import threading
+import time
+
+from cache_datos import obtener_cache
+
+logger = logging.getLogger(__name__)
+
+TABLA_CAMBIOS = "cambios"
+# Tablas cuyos cambios se registran
+TABLAS = ("clientes", "productos", "facturas")
+ALTA, CAMBIO, BAJA, TODO = "alta", "cambio", "baja", "todo"
+# Más filas que esto en una escritura se registran como un solo evento "todo"
+MAX_FILAS_POR_EVENTO = 1000
+INTERVALO_SONDEO = float(os.environ.get("ERP_INTERVALO_CAMBIOS_MS", 1000)) / 1000
+RETENCION_SEGUNDOS = 24 * 3600
+PODAR_CADA = 600
+LOTE = 1000
+# SQLite acepta hasta 32766 parámetros por sentencia (999 en versiones viejas)
+MAX_PARAMETROS = 900
+
+# Identifica los eventos de este proceso; distinto en cada arranque
+ORIGEN = secrets.randbits(62)
+
+
+def registrar(conn, tabla, op, ids=None):
+    """Agrega los eventos de una escritura; va dentro de su transacción.
+
+    Sin `ids` (o con más de MAX_FILAS_POR_EVENTO) se registra un solo evento
+    "todo" para la tabla.
+    """
+    if tabla not in TABLAS:
+        raise ValueError(f"Tabla sin registro de cambios: {tabla}")
+    ahora = time.time()
+    ids = None if ids is None else [int(i) for i in ids]
+    if ids is None or len(ids) > MAX_FILAS_POR_EVENTO:
+        filas = [(tabla, None, TODO, ORIGEN, ahora)]
+    else:
+        filas = [(tabla, fila_id, op, ORIGEN, ahora) for fila_id in ids]
+    conn.executemany(
+        f"INSERT INTO {TABLA_CAMBIOS} (tabla, fila_id, op, origen, registrado_en) "
+        "VALUES (?, ?, ?, ?, ?)",
+        filas,
+    )
+
+
+def ultimo_seq(conn):
+    # El contador de AUTOINCREMENT no baja al podar; solo retrocede si la base
+    # se reemplaza por un respaldo
+    fila = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = ?", (TABLA_CAMBIOS,)
+    ).fetchone()
+    return fila[0] if fila else 0
+
+
+def leer_desde(conn, seq, limite=LOTE):
+    """Eventos (seq, tabla, fila_id, op, origen) posteriores a `seq`, en orden."""
+    return conn.execute(
+        f"SELECT seq, tabla, fila_id, op, origen FROM {TABLA_CAMBIOS} "
+        "WHERE seq > ? ORDER BY seq LIMIT ?",
+        (seq, limite),
+    ).fetchall()
+
+
+def podar(pool, retencion_segundos=RETENCION_SEGUNDOS):
+    """Borra los eventos más viejos que la retención; devuelve cuántos.
+
+    Un suscriptor que se quedó atrás más que eso lo nota por el hueco en la
+    secuencia y recarga todo.
+    """
+    limite = time.time() - retencion_segundos
+    with pool.escritura() as conn:
+        # Solo el tramo inicial de la secuencia, hasta el primer evento retenido:
+        # un evento con el reloj atrasado no arrastra a los posteriores. Se
+        # recorre por la clave primaria desde el principio
+        return conn.execute(
+            f"""
+            DELETE FROM {TABLA_CAMBIOS}
+            WHERE seq < COALESCE(
+                (SELECT seq FROM {TABLA_CAMBIOS} WHERE registrado_en >= ? ORDER BY seq LIMIT 1),
+                (SELECT MAX(seq) + 1 FROM {TABLA_CAMBIOS})
+            )
+            """,
+            (limite,),
+        ).rowcount
+
+
+def _en_bloques(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), MAX_PARAMETROS):
+        yield ids[i:i + MAX_PARAMETROS]
+
+
+class Instantanea:
+    """Copia en memoria de una tabla completa: ID -> tupla de `columnas`.
+
+    La mantiene al día un Suscriptor; no debe modificarse desde afuera.
+    """
+
+    def __init__(self, tabla, columnas):
+        self.tabla = tabla
+        self.columnas = tuple(columnas)
+        self._filas = {}
+        self._lock = threading.Lock()
+        self.recargas = 0
+        self.filas_actualizadas = 0
+
+    def recargar(self, conn):
+        filas = conn.execute(
+            f"SELECT {', '.join(self.columnas)} FROM {self.tabla}"
+        ).fetchall()
+        with self._lock:
+            self._filas = {fila[0]: fila for fila in filas}
+            self.recargas += 1
+
+    def actualizar(self, conn, ids):
+        # Vuelve a leer las filas tocadas: las que ya no existen se quitan.
+        # No importa qué operación fue, así aplicar un evento dos veces no daña
+        for bloque in _en_bloques(ids):
+            marcadores = ", ".join("?" for _ in bloque)
+            filas = conn.execute(
+                f"SELECT {', '.join(self.columnas)} FROM {self.tabla} "
+                f"WHERE id IN ({marcadores})",
+                bloque,
+            ).fetchall()
+            encontradas = {fila[0]: fila for fila in filas}
+            with self._lock:
+                for fila_id in bloque:
+                    if fila_id in encontradas:
+                        self._filas[fila_id] = encontradas[fila_id]
+                    else:
+                        self._filas.pop(fila_id, None)
+                self.filas_actualizadas += len(bloque)
+
+    def obtener(self, fila_id, por_defecto=None):
+        with self._lock:
+            return self._filas.get(fila_id, por_defecto)
+
+    def filas(self):
+        with self._lock:
+            return list(self._filas.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._filas)
+
+
+class Suscriptor:
+    """Aplica los eventos de `cambios` al caché y a las instantáneas del proceso."""
+
+    def __init__(self, pool, cache=None, intervalo=INTERVALO_SONDEO):
+        self.pool = pool
+        self.cache = cache if cache is not None else obtener_cache(pool)
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._instantaneas = {}
+        self._hilo = None
+        self._detener = threading.Event()
+        self._ultima_poda = time.monotonic()
+        # Lo anterior al arranque no hace falta: el caché y las instantáneas nacen vacíos
+        with pool.lectura() as conn:
+            self.ultimo = ultimo_seq(conn)
+        self.eventos = 0
+        self.eventos_ajenos = 0
+        self.recargas_completas = 0
+        self.ultimo_sondeo = None
+
+    def instantanea(self, tabla, columnas):
+        """La instantánea de `tabla`; se carga completa la primera vez."""
+        with self._lock:
+            instantanea = self._instantaneas.get(tabla)
+            if instantanea is None:
+                instantanea = Instantanea(tabla, columnas)
+                # Con el lock tomado ningún sondeo avanza `ultimo` mientras se
+                # carga, así que no se pierde ningún evento posterior
+                with self.pool.lectura() as conn:
+                    instantanea.recargar(conn)
+                self._instantaneas[tabla] = instantanea
+            return instantanea
+
+    def sondear(self):
+        """Aplica los eventos nuevos; devuelve cuántos había."""
+        with self._lock:
+            with self.pool.lectura() as conn:
+                maximo = ultimo_seq(conn)
+                if maximo == self.ultimo:
+                    self.ultimo_sondeo = time.monotonic()
+                    return 0
+                tocadas, ajenas = {}, set()
+                if maximo < self.ultimo:
+                    # La base se restauró de un respaldo: la secuencia retrocedió
+                    self._todo(tocadas, ajenas)
+                    self.ultimo = maximo
+                aplicados = ajenos = 0
+                while True:
+                    eventos = leer_desde(conn, self.ultimo)
+                    if not eventos:
+                        if self.ultimo < maximo:
+                            # Se podaron todos los eventos pendientes
+                            self._todo(tocadas, ajenas)
+                            self.ultimo = maximo
+                        break
+                    if eventos[0][0] != self.ultimo + 1:
+                        # Se podaron eventos que este proceso no alcanzó a leer
+                        self._todo(tocadas, ajenas)
+                    for seq, tabla, fila_id, op, origen in eventos:
+                        if origen != ORIGEN:
+                            ajenas.add(tabla)
+                            ajenos += 1
+                        if fila_id is None:
+                            tocadas[tabla] = None
+                        elif tocadas.get(tabla, set()) is not None:
+                            tocadas.setdefault(tabla, set()).add(fila_id)
+                    self.ultimo = eventos[-1][0]
+                    aplicados += len(eventos)
+                    if len(eventos) < LOTE:
+                        break
+
+                if ajenas:
+                    self.cache.invalidar(*ajenas)
+                for tabla, ids in tocadas.items():
+                    instantanea = self._instantaneas.get(tabla)
+                    if instantanea is None:
+                        continue
+                    if ids is None:
+                        instantanea.recargar(conn)
+                        self.recargas_completas += 1
+                    else:
+                        instantanea.actualizar(conn, ids)
+            self.eventos += aplicados
+            self.eventos_ajenos += ajenos
+            self.ultimo_sondeo = time.monotonic()
+            return aplicados
+
+    def _todo(self, tocadas, ajenas):
+        for tabla in TABLAS:
+            tocadas[tabla] = None
+            ajenas.add(tabla)
+
+    def iniciar(self):
+        # Hilo de sondeo; también poda los eventos viejos de vez en cuando
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(
+                    target=self._sondear_siempre, name="cambios-sondeo", daemon=True
+                )
+                self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def _sondear_siempre(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.sondear()
+                if time.monotonic() - self._ultima_poda > PODAR_CADA:
+                    self._ultima_poda = time.monotonic()
+                    podar(self.pool)
+            except Exception:
+                # Una base ocupada no debe matar el hilo; el próximo sondeo
+                # lo vuelve a intentar desde el mismo `ultimo`
+                logger.warning("No se pudieron leer los cambios", exc_info=True)
+
+    def estadisticas(self):
+        return {
+            "ultimo_seq": self.ultimo,
+            "eventos": self.eventos,
+            "eventos_ajenos": self.eventos_ajenos,
+            "recargas_completas": self.recargas_completas,
+            "segundos_desde_sondeo": (
+                None if self.ultimo_sondeo is None else time.monotonic() - self.ultimo_sondeo
+            ),
+        }
+
+
+_suscriptores = {}
+_lock_suscriptores = threading.Lock()
+
+
+def obtener_suscriptor(pool):
+    # Un suscriptor por pool y por proceso, con su hilo de sondeo ya andando
+    with _lock_suscriptores:
+        suscriptor = _suscriptores.get(pool.ruta)
+        if suscriptor is None:
+            suscriptor = Suscriptor(pool)
+            suscriptor.iniciar()
+            _suscriptores[pool.ruta] = suscriptor
+        return suscriptor
+
+
+def main():
+    from base_datos import RUTA_BD, obtener_pool
+
+    parser = argparse.ArgumentParser(description="Registro de cambios del ERP")
+    parser.add_argument("--bd", default=RUTA_BD)
+    parser.add_argument("--listar", type=int, metavar="N", help="muestra los últimos N eventos")
+    parser.add_argument("--podar", action="store_true")
+    parser.add_argument("--retencion-horas", type=float, default=RETENCION_SEGUNDOS / 3600)
+    args = parser.parse_args()
+
+    pool = obtener_pool(args.bd)
+    if args.listar:
+        with pool.lectura() as conn:
+            eventos = leer_desde(conn, max(0, ultimo_seq(conn) - args.listar), args.listar)
+        for seq, tabla, fila_id, op, origen in eventos:
+            print(f"{seq}\t{tabla}\t{'*' if fila_id is None else fila_id}\t{op}\t{origen:x}")
+    if args.podar:
+        print(f"{podar(pool, args.retencion_horas * 3600)} eventos podados")
+
+
+if __name__ == "__main__":
+    main()
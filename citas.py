@@ -0,0 +1,44 @@
+"""Citas aleatorias de Tronald Dump para la pestaña Chistín.
+
+Las citas se piden por adelantado a una Reserva compartida por el proceso:
+al abrir la pestaña ya hay varias esperando y el hilo de relleno trae más
+mientras tanto. Con ERP_URL_CITAS se puede apuntar a un servidor local.
+"""
+
+import os
+import threading
+
+from cliente_http import Reserva, obtener_cliente
+
+URL_CITAS = os.environ.get("ERP_URL_CITAS", "https://www.tronalddump.io/random/quote")
+
+
+class ErrorCita(Exception):
+    pass
+
+
+def pedir_cita(url=URL_CITAS):
+    """Trae una cita de la API; devuelve {"value", "appeared_at"}."""
+    respuesta = obtener_cliente("tronalddump", timeout_lectura=5).solicitar("GET", url)
+    if respuesta.status_code != 200:
+        raise ErrorCita(f"{respuesta.status_code} - {respuesta.text[:200]}")
+    # Solo lo que muestra la pestaña; la respuesta completa trae enlaces y etiquetas
+    try:
+        cita = respuesta.json()
+        return {"value": cita["value"], "appeared_at": cita["appeared_at"]}
+    except (ValueError, KeyError, TypeError) as e:
+        raise ErrorCita(f"Respuesta inesperada: {respuesta.text[:200]}") from e
+
+
+_reserva = None
+_lock_reserva = threading.Lock()
+
+
+def obtener_reserva():
+    # Una reserva por proceso; empieza a llenarse la primera vez que se pide
+    global _reserva
+    with _lock_reserva:
+        if _reserva is None:
+            _reserva = Reserva(pedir_cita, capacidad=10, minimo=3, ttl=3600, nombre="citas")
+            _reserva.rellenar()
+        return _reserva
@@ -0,0 +1,228 @@
+"""Cliente HTTP compartido para los servicios externos (citas, facturas PDF).
+
+Cada servicio tiene un ClienteHttp por proceso con una requests.Session
+(keep-alive: no abre una conexión TCP/TLS nueva por llamada), timeouts de
+conexión y lectura siempre puestos y un cortocircuito: después de
+`umbral_fallos` fallos seguidos deja de llamar al servicio durante
+`espera_abierto` segundos y falla de inmediato con CircuitoAbierto, en vez de
+dejar colgado el rerun de cada sesión. Pasada la espera deja pasar una sola
+llamada de prueba; si responde, el circuito se cierra.
+
+`Reserva` mantiene unas cuantas respuestas ya pedidas (p. ej. citas) y la
+rellena en segundo plano, así la interfaz responde sin esperar a la red.
+"""
+
+import threading
+import time
+from collections import deque
+
+from metricas import metricas
+
+TIMEOUT_CONEXION = 3.05
+TIMEOUT_LECTURA = 10
+CONEXIONES_POR_HOST = 10
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbierto(Exception):
+    pass
+
+
+class Cortocircuito:
+    def __init__(self, umbral_fallos=5, espera_abierto=30.0, reloj=time.monotonic):
+        self.umbral_fallos = umbral_fallos
+        self.espera_abierto = espera_abierto
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_desde = None
+        self._prueba_en_curso = False
+        self.rechazadas = 0
+
+    @property
+    def estado(self):
+        with self._lock:
+            return self._estado()
+
+    def _estado(self):
+        if self._abierto_desde is None:
+            return CERRADO
+        if self._reloj() - self._abierto_desde < self.espera_abierto:
+            return ABIERTO
+        return SEMIABIERTO
+
+    def permitir(self):
+        """Lanza CircuitoAbierto si no se debe llamar al servicio ahora."""
+        with self._lock:
+            estado = self._estado()
+            if estado == CERRADO:
+                return
+            if estado == SEMIABIERTO and not self._prueba_en_curso:
+                # Una sola llamada de prueba; las demás siguen fallando rápido
+                self._prueba_en_curso = True
+                return
+            self.rechazadas += 1
+            restante = max(0.0, self.espera_abierto - (self._reloj() - self._abierto_desde))
+        raise CircuitoAbierto(f"Servicio no disponible; se reintenta en {restante:.0f} s")
+
+    def exito(self):
+        with self._lock:
+            self._fallos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+
+    def fallo(self):
+        with self._lock:
+            self._fallos += 1
+            if self._prueba_en_curso or self._fallos >= self.umbral_fallos:
+                self._abierto_desde = self._reloj()
+            self._prueba_en_curso = False
+
+
+class ClienteHttp:
+    def __init__(
+        self,
+        nombre,
+        timeout_conexion=TIMEOUT_CONEXION,
+        timeout_lectura=TIMEOUT_LECTURA,
+        conexiones=CONEXIONES_POR_HOST,
+        cortocircuito=None,
+    ):
+        # `nombre` identifica al servicio en las métricas (http.<nombre>)
+        self.nombre = nombre
+        self.timeout = (timeout_conexion, timeout_lectura)
+        self.conexiones = conexiones
+        self.cortocircuito = cortocircuito or Cortocircuito()
+        self._sesion = None
+        self._lock = threading.Lock()
+
+    def _obtener_sesion(self):
+        # requests solo se carga con la primera llamada al servicio
+        with self._lock:
+            if self._sesion is None:
+                import requests  # type: ignore
+
+                sesion = requests.Session()
+                adaptador = requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.conexiones
+                )
+                sesion.mount("http://", adaptador)
+                sesion.mount("https://", adaptador)
+                self._sesion = sesion
+            return self._sesion
+
+    def solicitar(self, metodo, url, **kwargs):
+        """Hace la petición y devuelve la respuesta de requests.
+
+        Lanza CircuitoAbierto sin tocar la red si el servicio viene fallando.
+        Los errores de red, 429 y 5xx cuentan como fallos del servicio; los
+        demás códigos se devuelven tal cual.
+        """
+        self.cortocircuito.permitir()
+        kwargs.setdefault("timeout", self.timeout)
+        # Toda salida después de permitir() pasa por fallo() o exito(): en
+        # medio abierto, permitir() ya reservó la única prueba
+        try:
+            sesion = self._obtener_sesion()
+            with metricas.medir(f"http.{self.nombre}"):
+                respuesta = sesion.request(metodo, url, **kwargs)
+        except Exception:
+            self.cortocircuito.fallo()
+            raise
+        if respuesta.status_code == 429 or respuesta.status_code >= 500:
+            self.cortocircuito.fallo()
+        else:
+            self.cortocircuito.exito()
+        return respuesta
+
+    def cerrar(self):
+        with self._lock:
+            if self._sesion is not None:
+                self._sesion.close()
+                self._sesion = None
+
+
+class Reserva:
+    """Respuestas pedidas por adelantado, con vencimiento.
+
+    `producir()` trae un elemento nuevo (o lanza una excepción). `tomar()`
+    entrega el más viejo que no haya vencido y, si quedan menos de `minimo`,
+    despierta al hilo que rellena hasta `capacidad`. Si la reserva está vacía
+    produce uno en el momento.
+    """
+
+    def __init__(self, producir, capacidad=10, minimo=3, ttl=3600.0, nombre="reserva"):
+        self.producir = producir
+        self.capacidad = capacidad
+        self.minimo = minimo
+        self.ttl = ttl
+        self.nombre = nombre
+        self._elementos = deque()
+        self._lock = threading.Lock()
+        self._pedido = threading.Event()
+        self._hilo = None
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _vigentes(self):
+        limite = time.monotonic() - self.ttl
+        while self._elementos and self._elementos[0][0] < limite:
+            self._elementos.popleft()
+        return len(self._elementos)
+
+    def tomar(self):
+        with self._lock:
+            disponible = self._vigentes() > 0
+            elemento = self._elementos.popleft()[1] if disponible else None
+            if disponible:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+            quedan = len(self._elementos)
+        if quedan < self.minimo:
+            self.rellenar()
+        return elemento if disponible else self.producir()
+
+    def disponibles(self):
+        with self._lock:
+            return self._vigentes()
+
+    def rellenar(self):
+        # Despierta (o arranca) el hilo de relleno; nunca bloquea al llamador
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(
+                    target=self._rellenar, name=f"{self.nombre}-relleno", daemon=True
+                )
+                self._hilo.start()
+        self._pedido.set()
+
+    def _rellenar(self):
+        while True:
+            self._pedido.wait()
+            self._pedido.clear()
+            while self.disponibles() < self.capacidad:
+                try:
+                    elemento = self.producir()
+                except Exception:
+                    # Con el servicio caído (o el circuito abierto) se espera
+                    # al próximo pedido en vez de insistir
+                    break
+                with self._lock:
+                    self._elementos.append((time.monotonic(), elemento))
+
+
+_clientes = {}
+_lock_clientes = threading.Lock()
+
+
+def obtener_cliente(nombre, **opciones):
+    # Un cliente por servicio y por proceso, compartido por todas las sesiones
+    with _lock_clientes:
+        cliente = _clientes.get(nombre)
+        if cliente is None:
+            cliente = _clientes[nombre] = ClienteHttp(nombre, **opciones)
+        return cliente
@@ -0,0 +1,276 @@
+"""Generación de PDFs de facturas en segundo plano.
+
+La pestaña Facturar encola el trabajo y sigue respondiendo; un pool de hilos
+llama al backend (la API remota, el renderizador local de pdf_facturas o un
+stub), reintenta con espera exponencial si falla y guarda cada PDF en su
+propio archivo por ID de factura. La interfaz consulta el estado con
+`estado(factura_id)`.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from cliente_http import CircuitoAbierto, obtener_cliente
+from precios import a_colones, liquidar
+
+URL_API = os.environ.get("INVOICE_API_URL", "https://invoice-generator.com")
+# Sin clave la API remota no se usa por defecto (ver backend_por_defecto)
+API_KEY = os.environ.get("INVOICE_API_KEY")
+DIRECTORIO_FACTURAS = os.environ.get("ERP_DIRECTORIO_FACTURAS", "facturas_pdf")
+
+PENDIENTE = "pendiente"
+PROCESANDO = "procesando"
+LISTA = "lista"
+ERROR = "error"
+
+
+class ErrorRenderizado(Exception):
+    def __init__(self, mensaje, reintentable=True):
+        super().__init__(mensaje)
+        self.reintentable = reintentable
+
+
+class ColaLlena(Exception):
+    pass
+
+
+def datos_factura(factura_id, cliente_nombre, productos, descuento_bp=0, impuesto_bp=0):
+    # Mismo formato que espera invoice-generator.com. Descuento e impuesto van
+    # como montos fijos de precios.liquidar, así el total impreso es el mismo
+    # que facturas.total_centimos. "liquidacion" (en céntimos) no es parte de
+    # ese formato: la usa el renderizador local y BackendApi no la envía
+    liquidacion = liquidar(productos, descuento_bp, impuesto_bp)
+    datos = {
+        "from": "FACTURA",
+        "to": cliente_nombre,
+        "logo": "https://example.com/img/logo-invoice.png",
+        "number": factura_id,
+        "items": [
+            {
+                "name": prod["nombre"],
+                "quantity": prod["cantidad"],
+                "unit_cost": prod["monto"],
+            }
+            for prod in productos
+        ],
+        "notes": "¡Gracias por su compra!",
+        "currency": "CRC",  # Moneda configurada a Colones Costarricenses
+        "liquidacion": {
+            clave: liquidacion[clave] for clave in ("subtotal", "descuento", "impuesto", "total")
+        },
+    }
+    if liquidacion["descuento"] or liquidacion["impuesto"]:
+        datos["fields"] = {"discounts": True, "tax": True}
+        datos["discounts"] = a_colones(liquidacion["descuento"])
+        datos["tax"] = a_colones(liquidacion["impuesto"])
+    return datos
+
+
+# Campos del formato de invoice-generator.com que arma datos_factura
+CAMPOS_API = (
+    "from", "to", "logo", "number", "items", "notes", "currency", "fields", "discounts", "tax",
+)
+
+
+class BackendApi:
+    nombre = "api"
+
+    def __init__(self, url=URL_API, api_key=API_KEY, cliente=None):
+        self.url = url
+        self.api_key = api_key
+        # Sesión keep-alive compartida por los hilos de la cola, con cortocircuito
+        self.cliente = cliente or obtener_cliente("invoice_api", timeout_lectura=20)
+
+    def renderizar(self, datos):
+        if not self.api_key:
+            raise ErrorRenderizado("Falta INVOICE_API_KEY para la API de facturas", reintentable=False)
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        cuerpo = {clave: valor for clave, valor in datos.items() if clave in CAMPOS_API}
+        try:
+            response = self.cliente.solicitar("POST", self.url, headers=headers, json=cuerpo)
+        except CircuitoAbierto as e:
+            # Reintentar con espera exponencial no sirve mientras siga abierto
+            raise ErrorRenderizado(str(e), reintentable=False) from e
+        except OSError as e:
+            # requests.RequestException hereda de OSError
+            raise ErrorRenderizado(f"Error de red: {e}") from e
+
+        if response.status_code == 200:
+            return response.content
+        # 429 y 5xx son temporales; el resto (datos o credenciales) no mejora reintentando
+        raise ErrorRenderizado(
+            f"{response.status_code} - {response.text[:200]}",
+            reintentable=response.status_code == 429 or response.status_code >= 500,
+        )
+
+
+class BackendStub:
+    # Sustituto local de la API para pruebas y benchmarks: no usa la red
+    nombre = "stub"
+
+    def __init__(self, demora=0.0, tasa_fallos=0.0, semilla=None):
+        self.demora = demora
+        self.tasa_fallos = tasa_fallos
+        self._random = random.Random(semilla)
+
+    def renderizar(self, datos):
+        if self.demora:
+            time.sleep(self.demora)
+        if self._random.random() < self.tasa_fallos:
+            raise ErrorRenderizado("Fallo simulado")
+        lineas = "\n".join(
+            f"{i['name']} x{i['quantity']} {i['unit_cost']}" for i in datos["items"]
+        )
+        encabezado = f"% Factura {datos['number']} para {datos['to']}"
+        return f"%PDF-1.4\n{encabezado}\n{lineas}\n%%EOF\n".encode()
+
+
+def backend_por_defecto():
+    # ERP_FACTURAS_BACKEND: "api" (remoto), "local" (pdf_facturas) o "stub";
+    # sin indicarlo, la API si hay INVOICE_API_KEY y si no el renderizador local
+    backend = os.environ.get("ERP_FACTURAS_BACKEND", "api" if API_KEY else "local")
+    if backend == "stub":
+        return BackendStub()
+    if backend == "local":
+        from pdf_facturas import BackendLocal
+
+        return BackendLocal()
+    return BackendApi()
+
+
+class Trabajo:
+    def __init__(self, factura_id, datos):
+        self.factura_id = factura_id
+        self.datos = datos
+        self.estado = PENDIENTE
+        self.ruta = None
+        self.error = None
+        self.intentos = 0
+        self.creado = time.time()
+        self.terminado = None
+
+
+class ColaFacturas:
+    def __init__(
+        self,
+        backend=None,
+        directorio=DIRECTORIO_FACTURAS,
+        max_trabajadores=4,
+        reintentos=3,
+        espera_base=0.5,
+        max_pendientes=1000,
+        max_historial=10_000,
+    ):
+        self.backend = backend or backend_por_defecto()
+        self.directorio = directorio
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.max_pendientes = max_pendientes
+        self.max_historial = max_historial
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_trabajadores, thread_name_prefix="factura-pdf"
+        )
+        self._lock = threading.Lock()
+        self._trabajos = OrderedDict()
+        self._pendientes = 0
+        os.makedirs(directorio, exist_ok=True)
+
+    def ruta_pdf(self, factura_id):
+        return os.path.join(self.directorio, f"factura_{factura_id}.pdf")
+
+    def encolar(self, factura_id, datos):
+        """Encola la factura y devuelve su Trabajo (el existente si ya estaba)."""
+        with self._lock:
+            trabajo = self._trabajos.get(factura_id)
+            if trabajo is not None and trabajo.estado != ERROR:
+                return trabajo
+            if self._pendientes >= self.max_pendientes:
+                raise ColaLlena("Hay demasiadas facturas en cola; intenta más tarde")
+            trabajo = self._trabajos[factura_id] = Trabajo(factura_id, datos)
+            self._trabajos.move_to_end(factura_id)
+            self._pendientes += 1
+            self._podar()
+        self._executor.submit(self._procesar, trabajo)
+        return trabajo
+
+    def reintentar(self, factura_id):
+        trabajo = self.estado(factura_id)
+        if trabajo is None:
+            return None
+        return self.encolar(factura_id, trabajo.datos)
+
+    def estado(self, factura_id):
+        with self._lock:
+            return self._trabajos.get(factura_id)
+
+    def esperar(self, factura_ids, timeout=None):
+        # Útil en benchmarks y scripts: bloquea hasta que terminen los trabajos
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            trabajos = [self.estado(f) for f in factura_ids]
+            if all(t is None or t.estado in (LISTA, ERROR) for t in trabajos):
+                return trabajos
+            if limite is not None and time.monotonic() > limite:
+                return trabajos
+            time.sleep(0.01)
+
+    def cerrar(self, esperar=True):
+        self._executor.shutdown(wait=esperar)
+
+    def _procesar(self, trabajo):
+        trabajo.estado = PROCESANDO
+        try:
+            while True:
+                trabajo.intentos += 1
+                try:
+                    contenido = self.backend.renderizar(trabajo.datos)
+                    break
+                except ErrorRenderizado as e:
+                    if not e.reintentable or trabajo.intentos > self.reintentos:
+                        raise
+                    # Espera exponencial con jitter para no golpear al upstream en sincronía
+                    espera = self.espera_base * 2 ** (trabajo.intentos - 1)
+                    time.sleep(espera * random.uniform(0.5, 1.5))
+
+            ruta = self.ruta_pdf(trabajo.factura_id)
+            temporal = f"{ruta}.{threading.get_ident()}.tmp"
+            with open(temporal, "wb") as f:
+                f.write(contenido)
+            os.replace(temporal, ruta)  # nadie lee un PDF a medio escribir
+            trabajo.ruta = ruta
+            trabajo.estado = LISTA
+        except Exception as e:
+            trabajo.error = str(e)
+            trabajo.estado = ERROR
+        finally:
+            trabajo.terminado = time.time()
+            with self._lock:
+                self._pendientes -= 1
+
+    def _podar(self):
+        # Olvida los trabajos terminados más viejos; el PDF queda en disco
+        while len(self._trabajos) > self.max_historial:
+            factura_id, trabajo = next(iter(self._trabajos.items()))
+            if trabajo.estado not in (LISTA, ERROR):
+                break
+            del self._trabajos[factura_id]
+
+
+_cola = None
+_lock_cola = threading.Lock()
+
+
+def obtener_cola():
+    # Una cola por proceso, compartida por todas las sesiones
+    global _cola
+    with _lock_cola:
+        if _cola is None:
+            _cola = ColaFacturas()
+        return _cola
@@ -0,0 +1,177 @@
+"""Datos de ejemplo de la pestaña "Generar datos prefabricados".
+
+Viven en un módulo aparte para que Python los construya una sola vez por
+proceso, en vez de en cada rerun del script de Streamlit.
+"""
+
+from analitica import sumar_lineas_desde, ultima_linea
+from cambios import ALTA, registrar
+from importacion import importar_bloques, ultimos_ids
+from precios import a_centimos
+
+# Clientes y productos como (nombre, correo, segmento) y (nombre, categoría, monto)
+CLIENTES = [
+    ("Oficina Central", "oficina.central@example.com", "Corporativo"),
+    ("Papelería Rápida", "papeleria.rapida@example.com", "Pequeño Negocio"),
+    ("Tech Solutions", "tech.solutions@example.com", "Tecnología"),
+    ("Diseños Creativos", "disenos.creativos@example.com", "Diseño Gráfico"),
+    ("Consultores XYZ", "consultores.xyz@example.com", "Consultoría"),
+    ("Ofiservicios", "ofiservicios@example.com", "Servicios"),
+    ("Papel y Más", "papel.mas@example.com", "Papelería"),
+    ("Digital Plus", "digital.plus@example.com", "Impresión"),
+    ("Suministros Globales", "suministros.globales@example.com", "Importación"),
+    ("ABC Oficina", "abc.oficina@example.com", "Corporativo"),
+    ("Papelería Universal", "papeleria.universal@example.com", "Papelería"),
+    ("Equipos de Oficina CR", "equipos.oficina.cr@example.com", "Retail"),
+    ("Soluciones Integrales", "soluciones.integrales@example.com", "Consultoría"),
+    ("MaxiOficina", "maxioficina@example.com", "Corporativo"),
+    ("Servicios Empresariales", "servicios.empresariales@example.com", "Servicios"),
+]
+
+PRODUCTOS = [
+    ("Asrock X570 Phantom Gaming 4 WIFI AX", "Tarjetas Madre", 87000),
+    ("G.SKILL Trident Z RGB 16 GB DDR4 3200 - Ryzen", "Memoria RAM", 24000),
+    ("MSI B450M PRO-VDH MAX", "Tarjetas Madre", 42000),
+    ("Aerocool Cylon 700W ARGB - 80 Plus Bronze", "Fuentes de Poder", 25000),
+    ("AMD Athlon 3000G", "Procesadores", 43900),
+    ("Adata HD330 2 TB USB 3.2", "Almacenamiento", 43900),
+    ("NZXT Kraken Z63 - Pantalla LCD", "Enfriamiento Líquido", 119000),
+    ("Seasonic Focus GX-850 - 80 Plus Gold", "Fuentes de Poder", 69000),
+    ("Aerocool Eclipse 12 ARGB - 120mm PWM", "Ventiladores", 3500),
+    ("Teamgroup MP33 1TB", "Almacenamiento", 32900),
+    ("Corsair Vengeance LPX 16GB DDR4", "Memoria RAM", 29000),
+    ("Asus ROG Strix B450-F Gaming", "Tarjetas Madre", 82000),
+    ("Intel Core i5-10400F", "Procesadores", 125000),
+    ("Samsung 970 EVO Plus 500GB", "Almacenamiento", 79000),
+    ("Cooler Master Hyper 212 RGB", "Enfriamiento Líquido", 45000),
+    ("Gigabyte B550 AORUS Elite", "Tarjetas Madre", 110000),
+    ("WD Blue 1TB 3D NAND", "Almacenamiento", 60000),
+    ("AMD Ryzen 5 3600", "Procesadores", 135000),
+    ("Patriot Viper Steel 16GB DDR4", "Memoria RAM", 28000),
+    ("MSI MPG B550 Gaming Plus", "Tarjetas Madre", 95000),
+    ("Corsair H100i RGB Platinum", "Enfriamiento Líquido", 135000),
+    ("Seagate BarraCuda 2TB", "Almacenamiento", 85000),
+    ("Thermaltake Smart 600W", "Fuentes de Poder", 45000),
+    ("Asus TUF Gaming X570-Plus", "Tarjetas Madre", 125000),
+    ("G.SKILL Ripjaws V Series 16GB DDR4", "Memoria RAM", 32000),
+    ("Intel Core i7-10700K", "Procesadores", 250000),
+    ("Samsung 860 EVO 1TB", "Almacenamiento", 150000),
+    ("DeepCool Gammaxx GTE V2", "Enfriamiento Líquido", 40000),
+    ("Gigabyte X570 AORUS Elite", "Tarjetas Madre", 140000),
+    ("Crucial MX500 1TB", "Almacenamiento", 135000),
+    ("AMD Ryzen 7 3700X", "Procesadores", 270000),
+    ("Corsair Vengeance RGB Pro 16GB DDR4", "Memoria RAM", 36000),
+    ("MSI MEG X570 Unify", "Tarjetas Madre", 165000),
+    ("NZXT H510", "Gabinetes", 70000),
+    ("Gigabyte B450M DS3H", "Tarjetas Madre", 75000),
+    ("Patriot Viper Elite 8GB DDR4", "Memoria RAM", 16000),
+    ("Intel Core i9-10900K", "Procesadores", 370000),
+    ("WD Black SN750 1TB NVMe", "Almacenamiento", 175000),
+    ("Noctua NH-D15", "Enfriamiento Líquido", 90000),
+    ("MSI B450 TOMAHAWK MAX", "Tarjetas Madre", 105000),
+    ("Corsair RM750x", "Fuentes de Poder", 85000),
+    ("Asus Prime B450M-A", "Tarjetas Madre", 68000),
+    ("Adata XPG SX8200 Pro 1TB", "Almacenamiento", 150000),
+    ("AMD Ryzen 9 3900X", "Procesadores", 370000),
+    ("Corsair Vengeance LPX 32GB DDR4", "Memoria RAM", 58000),
+    ("Asrock B450 Steel Legend", "Tarjetas Madre", 95000),
+    ("Samsung 970 Pro 1TB", "Almacenamiento", 210000),
+    ("Thermaltake Toughpower GF1 750W", "Fuentes de Poder", 90000),
+    ("MSI MAG B550M Mortar", "Tarjetas Madre", 100000),
+    ("Intel Core i5-10600K", "Procesadores", 160000),
+    ("Patriot Burst 480GB SSD", "Almacenamiento", 45000),
+    ("NZXT Kraken X53", "Enfriamiento Líquido", 130000),
+    ("Gigabyte Z490 AORUS Ultra", "Tarjetas Madre", 225000),
+    ("Crucial Ballistix 16GB DDR4", "Memoria RAM", 33000),
+    ("AMD Ryzen 5 5600X", "Procesadores", 190000),
+    ("WD Blue SN550 500GB", "Almacenamiento", 80000),
+    ("Corsair SF600", "Fuentes de Poder", 110000),
+    ("Asus ROG Strix B550-F Gaming", "Tarjetas Madre", 150000),
+    ("Samsung 860 QVO 1TB", "Almacenamiento", 130000),
+    ("Cooler Master MasterLiquid ML240L", "Enfriamiento Líquido", 100000),
+    ("MSI MPG Z490 Gaming Edge", "Tarjetas Madre", 185000),
+    ("G.SKILL Trident Z Neo 16GB DDR4", "Memoria RAM", 42000),
+    ("Intel Core i9-11900K", "Procesadores", 400000),
+    ("TeamGroup T-Force Vulcan Z 1TB", "Almacenamiento", 140000),
+    ("Thermaltake Smart BX1 650W", "Fuentes de Poder", 55000),
+    ("Gigabyte Z390 AORUS Pro", "Tarjetas Madre", 180000),
+    ("Patriot P300 512GB", "Almacenamiento", 70000),
+    ("AMD Ryzen 7 5800X", "Procesadores", 320000),
+    ("Corsair Dominator Platinum 16GB DDR4", "Memoria RAM", 45000),
+    ("Asrock X570 Taichi", "Tarjetas Madre", 180000),
+    ("Samsung 980 Pro 1TB", "Almacenamiento", 250000),
+    ("Cooler Master V850 Gold", "Fuentes de Poder", 125000),
+    ("MSI MEG Z490 ACE", "Tarjetas Madre", 240000),
+    ("Intel Core i7-11700K", "Procesadores", 290000),
+    ("WD Blue 4TB HDD", "Almacenamiento", 200000),
+    ("NZXT H710", "Gabinetes", 130000),
+    ("Asus TUF Gaming B550M-PLUS", "Tarjetas Madre", 110000),
+    ("Adata XPG Gammix S11 Pro 1TB", "Almacenamiento", 165000),
+    ("Corsair AX860", "Fuentes de Poder", 145000),
+    ("Gigabyte Z490 Vision G", "Tarjetas Madre", 190000),
+    ("AMD Ryzen 9 5950X", "Procesadores", 620000),
+    ("TeamGroup T-Force Delta RGB 32GB DDR4", "Memoria RAM", 90000),
+    ("MSI MPG Z490 Gaming Carbon", "Tarjetas Madre", 210000),
+    ("Samsung 870 QVO 1TB", "Almacenamiento", 120000),
+    ("Corsair CX550M", "Fuentes de Poder", 65000),
+    ("Asrock B550 Phantom Gaming 4", "Tarjetas Madre", 90000),
+    ("Patriot Viper VPN100 512GB NVMe", "Almacenamiento", 95000),
+    ("Intel Core i5-11600K", "Procesadores", 170000),
+    ("Cooler Master MasterBox Q300L", "Gabinetes", 45000),
+]
+
+# Facturas como n.º de cliente y líneas como (n.º de factura, n.º de producto,
+# cantidad), contando desde 1 dentro de estas listas. Cada línea se vende al
+# precio del producto y el total de la factura se calcula de sus líneas
+FACTURAS = [1, 2, 3, 4, 5]
+
+FACTURA_PRODUCTOS = [
+    (1, 1, 2),
+    (1, 2, 4),
+    (2, 3, 2),
+    (3, 4, 3),
+    (4, 5, 1),
+    (5, 12, 1),
+]
+
+
+def insertar_datos_de_ejemplo(pool):
+    precios = [a_centimos(monto) for _, _, monto in PRODUCTOS]
+    totales = [0] * len(FACTURAS)
+    for f, p, cantidad in FACTURA_PRODUCTOS:
+        totales[f - 1] += precios[p - 1] * cantidad
+
+    with pool.escritura() as conn:
+        desde_linea = ultima_linea(conn)
+        importar_bloques(conn, "clientes", [CLIENTES])
+        clientes_ids = ultimos_ids(conn, "clientes", len(CLIENTES))
+        importar_bloques(
+            conn,
+            "productos",
+            [[(nombre, categoria, precio) for (nombre, categoria, _), precio in zip(PRODUCTOS, precios)]],
+        )
+        productos_ids = ultimos_ids(conn, "productos", len(PRODUCTOS))
+
+        # Las facturas de ejemplo apuntan al 1.º, 2.º, ... cliente y producto
+        # recién insertados, sean cuales sean sus IDs reales (las claves
+        # foráneas se validan)
+        importar_bloques(
+            conn,
+            "facturas",
+            [[(clientes_ids[c - 1], total) for c, total in zip(FACTURAS, totales)]],
+        )
+        facturas_ids = ultimos_ids(conn, "facturas", len(FACTURAS))
+        importar_bloques(
+            conn,
+            "factura_productos",
+            [
+                [
+                    (facturas_ids[f - 1], productos_ids[p - 1], cantidad, precios[p - 1])
+                    for f, p, cantidad in FACTURA_PRODUCTOS
+                ]
+            ],
+        )
+        sumar_lineas_desde(conn, desde_linea)
+        registrar(conn, "clientes", ALTA, clientes_ids)
+        registrar(conn, "productos", ALTA, productos_ids)
+        registrar(conn, "facturas", ALTA, facturas_ids)
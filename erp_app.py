@@ -1,211 +1,199 @@
 import streamlit as st  # type: ignore
+import os
 import sqlite3
+from datetime import datetime, timedelta
 import pandas as pd  # type: ignore
-import requests  # type: ignore
 
+from analitica import (
+    DIMENSIONES,
+    periodos,
+    ventas_por,
+    ventas_por_periodo,
+)
+from base_datos import RUTA_BD, obtener_pool
+from cache_datos import obtener_cache
+from cambios import obtener_suscriptor
+from citas import ErrorCita, obtener_reserva
+from cliente_http import CircuitoAbierto
+from cola_facturas import ERROR, LISTA, ColaLlena, datos_factura, obtener_cola
+from datos_ejemplo import insertar_datos_de_ejemplo
+from exportacion import CONJUNTOS as CONJUNTOS_EXPORTACION, FORMATOS, exportar_a_archivo
+from facturacion import registrar_factura
+from importacion import importar, leer_archivo, poblar_sintetico
+from mantenimiento import MODOS as MODOS_VACIADO, compactar, respaldar
+from metricas import metricas
+from paginacion import CLIENTES, PRODUCTOS, pagina, valores_filtro
+from precios import IMPUESTO_BP, a_colones, a_puntos_base, liquidar
+import busqueda
+import particiones
+import repositorio
+
+
+# Pool de conexiones compartido por todas las sesiones. Se crea (y migra el
+# esquema) una vez por proceso; en los reruns solo se recupera.
+pool = obtener_pool(RUTA_BD)
+cache_lecturas = obtener_cache(pool)
+# Cola de PDFs de facturas, también una por proceso
+cola_facturas = obtener_cola()
+# Aplica al caché lo que escriben otros procesos (otras réplicas) sobre la
+# misma base, con a lo sumo ERP_INTERVALO_CAMBIOS_MS de retraso
+suscriptor_cambios = obtener_suscriptor(pool)
+
+
+COLUMNAS_CLIENTES = ["ID", "Nombre", "Correo Electrónico", "Segmento de Negocio"]
+COLUMNAS_PRODUCTOS = ["ID", "Nombre", "Categoría", "Monto"]
+# Cuántas opciones trae como máximo cada selector con búsqueda
+LIMITE_OPCIONES = 50
+
+
+# Funciones auxiliares para guardar datos
+# El acceso a datos vive en repositorio.py (sin Streamlit); aquí solo se fija
+# el pool del proceso.
+def agregar_cliente(nombre, correo, segmento):
+    return repositorio.agregar_cliente(pool, nombre, correo, segmento)
 
-# Conectar a la base de datos SQLite (se creará si no existe)
-conn = sqlite3.connect("erp_app.db")
-cursor = conn.cursor()
 
-# Crear las tablas si no existen
-cursor.execute(
-    """
-CREATE TABLE IF NOT EXISTS clientes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nombre TEXT NOT NULL,
-    correo_electronico TEXT NOT NULL,
-    segmento_negocio TEXT NOT NULL
-)
-"""
-)
-cursor.execute(
-    """
-CREATE TABLE IF NOT EXISTS facturas (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    cliente_id INTEGER NOT NULL,
-    total REAL NOT NULL,
-    FOREIGN KEY(cliente_id) REFERENCES clientes(id)
-)
-"""
-)
-cursor.execute(
-    """
-CREATE TABLE IF NOT EXISTS productos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nombre TEXT NOT NULL,
-    categoria TEXT NOT NULL,
-    monto REAL NOT NULL
-)
-"""
-)
-cursor.execute(
-    """
-CREATE TABLE IF NOT EXISTS factura_productos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    factura_id INTEGER NOT NULL,
-    producto_id INTEGER NOT NULL,
-    cantidad INTEGER NOT NULL,
-    monto REAL NOT NULL,
-    FOREIGN KEY(factura_id) REFERENCES facturas(id),
-    FOREIGN KEY(producto_id) REFERENCES productos(id)
-)
-"""
-)
-conn.commit()
+def actualizar_cliente(cliente_id, nombre, correo, segmento):
+    return repositorio.actualizar_cliente(pool, cliente_id, nombre, correo, segmento)
 
 
-# Funciones auxiliares para cargar y guardar datos
-def cargar_clientes():
-    cursor.execute("SELECT * FROM clientes")
-    clientes = cursor.fetchall()
-    clientes_df = pd.DataFrame(
-        clientes, columns=["ID", "Nombre", "Correo Electrónico", "Segmento de Negocio"]
-    )
-    return clientes_df
+def eliminar_cliente(cliente_id):
+    return repositorio.eliminar_cliente(pool, cliente_id)
 
 
-def agregar_cliente(nombre, correo, segmento):
-    cursor.execute(
-        "INSERT INTO clientes (nombre, correo_electronico, segmento_negocio) VALUES (?, ?, ?)",
-        (nombre, correo, segmento),
-    )
-    conn.commit()
-    return cursor.lastrowid
+def agregar_producto(nombre, categoria, monto):
+    return repositorio.agregar_producto(pool, nombre, categoria, monto)
 
 
-def actualizar_cliente(cliente_id, nombre, correo, segmento):
-    cursor.execute(
-        "UPDATE clientes SET nombre = ?, correo_electronico = ?, segmento_negocio = ? WHERE id = ?",
-        (nombre, correo, segmento, cliente_id),
-    )
-    conn.commit()
+def eliminar_producto(producto_id):
+    return repositorio.eliminar_producto(pool, producto_id)
 
 
-def eliminar_cliente(cliente_id):
-    cursor.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,))
-    conn.commit()
+@metricas.instrumentar()
+def generar_factura_api(
+    factura_id, cliente_nombre, cliente_correo, productos, descuento_bp=0, impuesto_bp=0
+):
+    # Encola el PDF en segundo plano; el estado se consulta con
+    # cola_facturas.estado(factura_id) sin bloquear el rerun
+    datos = datos_factura(factura_id, cliente_nombre, productos, descuento_bp, impuesto_bp)
+    return cola_facturas.encolar(factura_id, datos)
 
 
-def cargar_productos():
-    cursor.execute("SELECT * FROM productos")
-    productos = cursor.fetchall()
-    productos_df = pd.DataFrame(
-        productos, columns=["ID", "Nombre", "Categoría", "Monto"]
-    )
-    return productos_df
+def get_random_quote():
+    # Sale de la reserva de citas del proceso; solo espera a la red si está
+    # vacía, y nunca más que el timeout del cliente HTTP
+    try:
+        return obtener_reserva().tomar()
+    except (CircuitoAbierto, ErrorCita, OSError, ValueError) as e:
+        # requests.RequestException hereda de OSError
+        st.error(f"Error al obtener la cita: {e}")
+        return None
 
 
-def agregar_producto(nombre, categoria, monto):
-    cursor.execute(
-        "INSERT INTO productos (nombre, categoria, monto) VALUES (?, ?, ?)",
-        (nombre, categoria, monto),
+def mostrar_listado_paginado(clave, listado, encabezados, etiqueta_filtro):
+    # Estado de la paginación por listado: pila de cursores de páginas vistas
+    estado = st.session_state.setdefault(
+        f"paginas_{clave}", {"filtros": None, "cursores": [None]}
     )
-    conn.commit()
-    return cursor.lastrowid
-
 
-def eliminar_producto(producto_id):
-    cursor.execute("DELETE FROM productos WHERE id = ?", (producto_id,))
-    conn.commit()
+    col1, col2, col3, col4 = st.columns(4)
+    valores = cache_lecturas.obtener(
+        f"filtro_{clave}", (listado["tabla"],), lambda: valores_filtro(pool, listado)
+    )
+    filtro = col1.selectbox(etiqueta_filtro, ["Todos"] + valores, key=f"filtro_{clave}")
+    prefijo = col2.text_input("Nombre empieza con", key=f"prefijo_{clave}")
+    orden = col3.selectbox("Ordenar por", list(listado["ordenes"]), key=f"orden_{clave}")
+    tamano = col4.selectbox(
+        "Filas por página", [25, 50, 100, 250], index=1, key=f"tamano_{clave}"
+    )
+    descendente = st.checkbox("Descendente", key=f"desc_{clave}")
+
+    # Si cambió algún filtro volvemos a la primera página
+    filtros = (filtro, prefijo, orden, tamano, descendente)
+    if estado["filtros"] != filtros:
+        estado["filtros"] = filtros
+        estado["cursores"] = [None]
+
+    # Las páginas vistas quedan en el caché hasta que cambie la tabla, aquí o
+    # en otra réplica
+    parametros = (
+        tamano, estado["cursores"][-1], orden, descendente,
+        None if filtro == "Todos" else filtro, prefijo.strip() or None,
+    )
+    filas, siguiente = cache_lecturas.obtener(
+        ("pagina", listado["tabla"], *parametros),
+        (listado["tabla"],),
+        lambda: pagina(pool, listado, *parametros),
+    )
 
+    col_anterior, col_pagina, col_siguiente = st.columns([1, 2, 1])
+    primera = len(estado["cursores"]) == 1
+    if col_anterior.button("Anterior", key=f"anterior_{clave}", disabled=primera):
+        estado["cursores"].pop()
+        st.rerun()
+    col_pagina.write(f"Página {len(estado['cursores'])}")
+    ultima = siguiente is None
+    if col_siguiente.button("Siguiente", key=f"siguiente_{clave}", disabled=ultima):
+        estado["cursores"].append(siguiente)
+        st.rerun()
+
+    return pd.DataFrame(filas, columns=encabezados)
+
+
+def indice_busqueda(listado, columnas, texto, limite=LIMITE_OPCIONES):
+    # Índice ID -> registro de los `limite` más relevantes para `texto`
+    # (búsqueda de texto completo; con menos de MIN_CARACTERES, los primeros
+    # nombres que empiezan así). Se construye una vez por carga cacheada y los
+    # reruns lo reutilizan
+    def cargar():
+        if len(texto) >= busqueda.MIN_CARACTERES:
+            filas = busqueda.buscar(pool, listado, texto, limite)
+        else:
+            filas, _ = pagina(pool, listado, limite, orden="nombre", prefijo=texto or None)
+        return {fila[0]: dict(zip(columnas, fila)) for fila in filas}
 
-def agregar_factura(cliente_id, total):
-    cursor.execute(
-        "INSERT INTO facturas (cliente_id, total) VALUES (?, ?)", (cliente_id, total)
+    return cache_lecturas.obtener(
+        ("busqueda", listado["tabla"], texto, limite), (listado["tabla"],), cargar
     )
-    conn.commit()
-    return cursor.lastrowid
 
 
-def agregar_factura_producto(factura_id, producto_id, cantidad, monto):
-    cursor.execute(
-        "INSERT INTO factura_productos (factura_id, producto_id, cantidad, monto) VALUES (?, ?, ?, ?)",
-        (factura_id, producto_id, cantidad, monto),
+def buscador(etiqueta, listado, columnas, clave):
+    texto = st.text_input(
+        f"Buscar {etiqueta}",
+        key=f"buscar_{clave}",
+        placeholder="Nombre, correo o categoría (sin tildes también)",
     )
-    conn.commit()
-
-
-def generar_factura_api(cliente_nombre, cliente_correo, productos, total):
-    url = "https://invoice-generator.com"
-    api_key = "sk_yLqHnjWxZFirKYSBIhJpZq7gvHQzw4Ay"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-
-    items = [
-        {
-            "name": prod["nombre"],
-            "quantity": prod["cantidad"],
-            "unit_cost": prod["monto"],
-        }
-        for prod in productos
-    ]
-
-    data = {
-        "from": "FACTURA",
-        "to": cliente_nombre,
-        "logo": "https://example.com/img/logo-invoice.png",
-        "number": 1,
-        "items": items,
-        "notes": "¡Gracias por su compra!",
-        "currency": "CRC",  # Moneda configurada a Colones Costarricenses
-    }
-
-    response = requests.post(url, headers=headers, json=data)
-
-    if response.status_code == 200:
-        with open("invoice.pdf", "wb") as f:
-            f.write(response.content)
-        return "invoice.pdf"
-    else:
-        st.error(
-            f"Error al generar la factura: {response.status_code} - {response.text}"
-        )
-        return None
+    return indice_busqueda(listado, columnas, texto.strip())
 
 
-def get_random_quote():
-    response = requests.get("https://www.tronalddump.io/random/quote")
-    if response.status_code == 200:
-        return response.json()
-    else:
-        st.error("Error al obtener la cita.")
-        return None
+def seleccionar_registro(etiqueta, indice, clave):
+    # Las opciones son IDs; el nombre sale del índice en O(1)
+    registro_id = st.selectbox(
+        etiqueta, list(indice), format_func=lambda x: indice[x]["Nombre"], key=clave
+    )
+    return indice[registro_id]
 
 
 # Configuración de la aplicación Streamlit
 st.set_page_config(layout="wide", page_icon="💻", page_title="Oliver Tech 🦮")
 st.title("💻 OliverTech 🦮")
 
-# Crear las pestañas
-tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(
-    [
-        "Listado de Clientes",
-        "Agregar Cliente",
-        "Actualizar o Eliminar Cliente",
-        "Productos",
-        "Facturar",
-        "Chistín",
-        "Generar datos prefabricados",
-        "Borrar toda la base de datos",
-    ]
-)
-
 ### **Pestaña: Listado de Clientes**
-with tab1:
+def seccion_listado_clientes():
     st.subheader("Listado de Clientes")
-    clientes_df = cargar_clientes()
-    if not clientes_df.empty:
-        st.dataframe(clientes_df)
+    pagina_clientes_df = mostrar_listado_paginado(
+        "clientes", CLIENTES, COLUMNAS_CLIENTES, "Segmento de Negocio"
+    )
+    if not pagina_clientes_df.empty:
+        st.dataframe(pagina_clientes_df, hide_index=True)
     else:
         st.write("No hay clientes registrados.")
 
 ### **Pestaña: Agregar Cliente**
-with tab2:
+def seccion_agregar_cliente():
     st.subheader("Agregar Cliente")
-    segmentos_df = (
-        clientes_df["Segmento de Negocio"].drop_duplicates().tolist()
-        if not clientes_df.empty
-        else []
+    segmentos_df = cache_lecturas.obtener(
+        "filtro_clientes", ("clientes",), lambda: valores_filtro(pool, CLIENTES)
     )
 
     with st.form("form_agregar_cliente"):
@@ -227,59 +215,57 @@ with tab2:
 
 
 ### **Pestaña: Actualizar o Eliminar Cliente**
-with tab3:
+def seccion_editar_cliente():
     st.subheader("Actualizar o Eliminar Cliente")
-    clientes_df = cargar_clientes()
-    if not clientes_df.empty:
-        cliente_id = st.selectbox(
+    clientes_indice = buscador("cliente", CLIENTES, COLUMNAS_CLIENTES, "editar_cliente")
+    if clientes_indice:
+        cliente_seleccionado = seleccionar_registro(
             "Selecciona un Cliente para Editar o Eliminar",
-            clientes_df["ID"],
-            format_func=lambda x: clientes_df.loc[
-                clientes_df["ID"] == x, "Nombre"
-            ].values[0],
+            clientes_indice,
+            "cliente_editar",
         )
-        cliente_seleccionado_df = clientes_df[clientes_df["ID"] == cliente_id]
-
-        if not cliente_seleccionado_df.empty:
-            cliente_seleccionado = cliente_seleccionado_df.iloc[0]
-
-            # Formulario para actualizar el cliente
-            with st.form("form_actualizar_cliente"):
-                nuevo_nombre = st.text_input("Nombre", cliente_seleccionado["Nombre"])
-                nuevo_correo = st.text_input(
-                    "Correo Electrónico", cliente_seleccionado["Correo Electrónico"]
+        cliente_id = cliente_seleccionado["ID"]
+
+        # Formulario para actualizar el cliente
+        with st.form("form_actualizar_cliente"):
+            nuevo_nombre = st.text_input("Nombre", cliente_seleccionado["Nombre"])
+            nuevo_correo = st.text_input(
+                "Correo Electrónico", cliente_seleccionado["Correo Electrónico"]
+            )
+            nuevo_segmento = st.text_input(
+                "Segmento de Negocio", cliente_seleccionado["Segmento de Negocio"]
+            )
+            actualizar_button = st.form_submit_button("Actualizar Cliente")
+
+            if actualizar_button:
+                actualizar_cliente(
+                    cliente_id, nuevo_nombre, nuevo_correo, nuevo_segmento
                 )
-                nuevo_segmento = st.text_input(
-                    "Segmento de Negocio", cliente_seleccionado["Segmento de Negocio"]
-                )
-                actualizar_button = st.form_submit_button("Actualizar Cliente")
-
-                if actualizar_button:
-                    actualizar_cliente(
-                        cliente_id, nuevo_nombre, nuevo_correo, nuevo_segmento
-                    )
-                    st.success("Cliente actualizado exitosamente")
+                st.success("Cliente actualizado exitosamente")
 
-            # Formulario separado para eliminar el cliente
-            with st.form("form_eliminar_cliente"):
-                eliminar_button = st.form_submit_button("Eliminar Cliente")
+        # Formulario separado para eliminar el cliente
+        with st.form("form_eliminar_cliente"):
+            eliminar_button = st.form_submit_button("Eliminar Cliente")
 
-                if eliminar_button:
+            if eliminar_button:
+                try:
                     eliminar_cliente(cliente_id)
+                except sqlite3.IntegrityError:
+                    st.error("No se puede eliminar un cliente que tiene facturas.")
+                else:
                     st.success("Cliente eliminado exitosamente")
-
-        else:
-            st.error("El cliente seleccionado no existe.")
     else:
         st.write("No hay clientes disponibles para actualizar o eliminar.")
 
 ### **Pestaña: Productos**
-with tab4:
+def seccion_productos():
     st.subheader("Gestión de Productos")
 
-    productos_df = cargar_productos()
-    if not productos_df.empty:
-        st.dataframe(productos_df)
+    pagina_productos_df = mostrar_listado_paginado(
+        "productos", PRODUCTOS, COLUMNAS_PRODUCTOS, "Categoría"
+    )
+    if not pagina_productos_df.empty:
+        st.dataframe(pagina_productos_df, hide_index=True)
 
     with st.form("form_agregar_producto"):
         producto_nombre = st.text_input("Nombre del Producto")
@@ -295,56 +281,64 @@ with tab4:
             else:
                 st.error("Todos los campos son obligatorios")
 
-    if not productos_df.empty:
-        producto_id = st.selectbox(
-            "Selecciona un Producto para Eliminar",
-            productos_df["ID"],
-            format_func=lambda x: productos_df.loc[
-                productos_df["ID"] == x, "Nombre"
-            ].values[0],
-        )
+    productos_indice = buscador(
+        "producto", PRODUCTOS, COLUMNAS_PRODUCTOS, "eliminar_producto"
+    )
+    if productos_indice:
+        producto_id = seleccionar_registro(
+            "Selecciona un Producto para Eliminar", productos_indice, "producto_eliminar"
+        )["ID"]
         eliminar_producto_button = st.button("Eliminar Producto")
 
         if eliminar_producto_button:
-            eliminar_producto(producto_id)
-            st.success("Producto eliminado exitosamente")
+            try:
+                eliminar_producto(producto_id)
+            except sqlite3.IntegrityError:
+                st.error("No se puede eliminar un producto que aparece en facturas.")
+            else:
+                st.success("Producto eliminado exitosamente")
 
 
 ### **Pestaña: Facturar**
-with tab5:
+def seccion_facturar():
     st.subheader("Generar Factura")
 
     if "productos_temp" not in st.session_state:
         st.session_state.productos_temp = []
+    if "facturas_pdf" not in st.session_state:
+        st.session_state.facturas_pdf = []
 
-    clientes_df = cargar_clientes()
-    if not clientes_df.empty:
-        cliente_id = st.selectbox(
-            "Selecciona un Cliente",
-            clientes_df["ID"],
-            format_func=lambda x: clientes_df.loc[
-                clientes_df["ID"] == x, "Nombre"
-            ].values[0],
+    clientes_indice = buscador("cliente", CLIENTES, COLUMNAS_CLIENTES, "factura_cliente")
+    if clientes_indice:
+        cliente_seleccionado_df = seleccionar_registro(
+            "Selecciona un Cliente", clientes_indice, "cliente_factura"
         )
-        cliente_seleccionado_df = clientes_df[clientes_df["ID"] == cliente_id].iloc[0]
 
         st.write(f"**Cliente:** {cliente_seleccionado_df['Nombre']}")
         st.write(f"**Correo:** {cliente_seleccionado_df['Correo Electrónico']}")
         st.write(f"**Segmento:** {cliente_seleccionado_df['Segmento de Negocio']}")
 
-        productos_df = cargar_productos()
-        if not productos_df.empty:
+        armar_factura(cliente_seleccionado_df)
+    else:
+        st.write("No hay clientes disponibles. Por favor, agrega un cliente primero.")
+
+
+@st.fragment
+def armar_factura(cliente_seleccionado_df):
+    # Fragmento: buscar productos, agregar líneas y guardar solo vuelven a
+    # ejecutar esta parte, no el selector de clientes ni el resto de la página
+    with pool.contar_consultas() as conteo, metricas.medir("fragmento.armar_factura"):
+        cliente_id = cliente_seleccionado_df["ID"]
+
+        # La búsqueda va fuera del formulario para que filtre al escribir
+        productos_indice = buscador(
+            "producto", PRODUCTOS, COLUMNAS_PRODUCTOS, "factura_producto"
+        )
+        if productos_indice:
             with st.form("invoice_form"):
-                producto_id = st.selectbox(
-                    "Selecciona un Producto",
-                    productos_df["ID"],
-                    format_func=lambda x: productos_df.loc[
-                        productos_df["ID"] == x, "Nombre"
-                    ].values[0],
+                producto_seleccionado_df = seleccionar_registro(
+                    "Selecciona un Producto", productos_indice, "producto_factura"
                 )
-                producto_seleccionado_df = productos_df[
-                    productos_df["ID"] == producto_id
-                ].iloc[0]
 
                 producto_cantidad = st.number_input("Cantidad", min_value=1)
                 agregar_producto_btn = st.form_submit_button("Agregar producto")
@@ -352,6 +346,7 @@ with tab5:
                 if agregar_producto_btn:
                     st.session_state.productos_temp.append(
                         {
+                            "producto_id": int(producto_seleccionado_df["ID"]),
                             "nombre": producto_seleccionado_df["Nombre"],
                             "categoria": producto_seleccionado_df["Categoría"],
                             "monto": producto_seleccionado_df["Monto"],
@@ -363,208 +358,202 @@ with tab5:
                     st.write("### Productos agregados")
                     st.table(st.session_state.productos_temp)
 
-                total = sum(
-                    p["monto"] * p["cantidad"] for p in st.session_state.productos_temp
+                col_descuento, col_impuesto = st.columns(2)
+                descuento_pct = col_descuento.number_input(
+                    "Descuento (%)", min_value=0.0, max_value=100.0, step=0.5
+                )
+                impuesto_pct = col_impuesto.number_input(
+                    "Impuesto (%)", min_value=0.0, value=IMPUESTO_BP / 100, step=0.5
                 )
-                st.write(f"### Total: {total:.2f}")
+                descuento_bp = a_puntos_base(descuento_pct)
+                impuesto_bp = a_puntos_base(impuesto_pct)
+                # Liquidación en céntimos, la misma que se guarda con la factura
+                liquidacion = liquidar(st.session_state.productos_temp, descuento_bp, impuesto_bp)
+                if liquidacion["descuento"] or liquidacion["impuesto"]:
+                    st.write(f"Subtotal: {a_colones(liquidacion['subtotal']):,.2f}")
+                    st.write(f"Descuento: -{a_colones(liquidacion['descuento']):,.2f}")
+                    st.write(f"Impuesto: {a_colones(liquidacion['impuesto']):,.2f}")
+                st.write(f"### Total: {a_colones(liquidacion['total']):,.2f}")
 
                 submit_invoice = st.form_submit_button("Generar factura")
-                if submit_invoice:
-                    factura_id = agregar_factura(cliente_id, total)
-
-                    for producto in st.session_state.productos_temp:
-                        producto_id = productos_df[
-                            productos_df["Nombre"] == producto["nombre"]
-                        ]["ID"].values[0]
-                        agregar_factura_producto(
-                            factura_id,
-                            producto_id,
-                            producto["cantidad"],
-                            producto["monto"],
+                if submit_invoice and not st.session_state.productos_temp:
+                    st.error("Agrega al menos un producto a la factura")
+                elif submit_invoice:
+                    try:
+                        factura_id = registrar_factura(
+                            pool,
+                            cliente_id,
+                            st.session_state.productos_temp,
+                            descuento_bp=descuento_bp,
+                            impuesto_bp=impuesto_bp,
                         )
-
-                    invoice_pdf = generar_factura_api(
-                        cliente_seleccionado_df["Nombre"],
-                        cliente_seleccionado_df["Correo Electrónico"],
-                        st.session_state.productos_temp,
-                        total,
-                    )
-
-                    if invoice_pdf:
-                        st.session_state.invoice_pdf = invoice_pdf
-                    st.success("Factura generada exitosamente")
-
-                    st.session_state.productos_temp = []
+                    except sqlite3.Error as e:
+                        # La transacción ya se revirtió: no queda nada a medias
+                        factura_id = None
+                        st.error(f"No se pudo guardar la factura: {e}")
+
+                    if factura_id is not None:
+                        try:
+                            generar_factura_api(
+                                factura_id,
+                                cliente_seleccionado_df["Nombre"],
+                                cliente_seleccionado_df["Correo Electrónico"],
+                                st.session_state.productos_temp,
+                                descuento_bp=descuento_bp,
+                                impuesto_bp=impuesto_bp,
+                            )
+                        except ColaLlena as e:
+                            st.warning(f"Factura guardada, pero sin PDF: {e}")
+                        else:
+                            st.session_state.facturas_pdf.append(factura_id)
+                        st.success("Factura generada exitosamente")
+
+                        st.session_state.productos_temp = []
 
         else:
             st.write("No hay productos disponibles para agregar a la factura.")
-    else:
-        st.write("No hay clientes disponibles. Por favor, agrega un cliente primero.")
 
-if "invoice_pdf" in st.session_state:
-    with open(st.session_state.invoice_pdf, "rb") as pdf_file:
-        st.download_button(
-            "Descargar Factura en PDF",
-            data=pdf_file,
-            file_name=st.session_state.invoice_pdf,
-        )
+        # Dentro del fragmento para que muestre la factura recién guardada
+        mostrar_facturas_pdf()
+    st.session_state.consultas_fragmento = conteo["consultas"]
+
+
+def mostrar_facturas_pdf():
+    # PDFs de las facturas de esta sesión (se generan en segundo plano)
+    if not st.session_state.get("facturas_pdf"):
+        return
+    st.subheader("Facturas en PDF")
+    st.button("Actualizar estado")
+    for factura_id in reversed(st.session_state.facturas_pdf[-5:]):
+        trabajo = cola_facturas.estado(factura_id)
+        if trabajo is None:
+            continue
+        if trabajo.estado == LISTA:
+            with open(trabajo.ruta, "rb") as pdf_file:
+                st.download_button(
+                    f"Descargar Factura #{factura_id} en PDF",
+                    data=pdf_file,
+                    file_name=os.path.basename(trabajo.ruta),
+                    key=f"descargar_{factura_id}",
+                )
+        elif trabajo.estado == ERROR:
+            st.error(f"Error al generar la factura #{factura_id}: {trabajo.error}")
+            if st.button("Reintentar", key=f"reintentar_{factura_id}"):
+                cola_facturas.reintentar(factura_id)
+                st.rerun(scope="fragment")
+        else:
+            st.info(f"Factura #{factura_id}: {trabajo.estado} (intento {trabajo.intentos})")
 
 
-def insertar_datos_de_ejemplo():
-    # Aquí está el código que maneja la inserción de datos de ejemplo
-    clientes = [
-        ("Oficina Central", "oficina.central@example.com", "Corporativo"),
-        ("Papelería Rápida", "papeleria.rapida@example.com", "Pequeño Negocio"),
-        ("Tech Solutions", "tech.solutions@example.com", "Tecnología"),
-        ("Diseños Creativos", "disenos.creativos@example.com", "Diseño Gráfico"),
-        ("Consultores XYZ", "consultores.xyz@example.com", "Consultoría"),
-        ("Ofiservicios", "ofiservicios@example.com", "Servicios"),
-        ("Papel y Más", "papel.mas@example.com", "Papelería"),
-        ("Digital Plus", "digital.plus@example.com", "Impresión"),
-        ("Suministros Globales", "suministros.globales@example.com", "Importación"),
-        ("ABC Oficina", "abc.oficina@example.com", "Corporativo"),
-        ("Papelería Universal", "papeleria.universal@example.com", "Papelería"),
-        ("Equipos de Oficina CR", "equipos.oficina.cr@example.com", "Retail"),
-        ("Soluciones Integrales", "soluciones.integrales@example.com", "Consultoría"),
-        ("MaxiOficina", "maxioficina@example.com", "Corporativo"),
-        ("Servicios Empresariales", "servicios.empresariales@example.com", "Servicios"),
-    ]
-    for cliente in clientes:
-        cursor.execute(
-            "INSERT INTO clientes (nombre, correo_electronico, segmento_negocio) VALUES (?, ?, ?)",
-            cliente,
+### **Pestaña: Analítica de ventas**
+# Lee solo las tablas de resumen de analitica.py, nunca factura_productos
+def seccion_analitica():
+    st.subheader("Ventas")
+    periodos_disponibles = periodos(pool)
+    if not periodos_disponibles:
+        st.write("Todavía no hay ventas registradas.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        desde = col1.selectbox("Desde", ["Todo el histórico"] + periodos_disponibles)
+        hasta = col2.selectbox(
+            "Hasta", periodos_disponibles, index=len(periodos_disponibles) - 1
         )
-
-    productos = [
-        ("Asrock X570 Phantom Gaming 4 WIFI AX", "Tarjetas Madre", 87000),
-        ("G.SKILL Trident Z RGB 16 GB DDR4 3200 - Ryzen", "Memoria RAM", 24000),
-        ("MSI B450M PRO-VDH MAX", "Tarjetas Madre", 42000),
-        ("Aerocool Cylon 700W ARGB - 80 Plus Bronze", "Fuentes de Poder", 25000),
-        ("AMD Athlon 3000G", "Procesadores", 43900),
-        ("Adata HD330 2 TB USB 3.2", "Almacenamiento", 43900),
-        ("NZXT Kraken Z63 - Pantalla LCD", "Enfriamiento Líquido", 119000),
-        ("Seasonic Focus GX-850 - 80 Plus Gold", "Fuentes de Poder", 69000),
-        ("Aerocool Eclipse 12 ARGB - 120mm PWM", "Ventiladores", 3500),
-        ("Teamgroup MP33 1TB", "Almacenamiento", 32900),
-        ("Corsair Vengeance LPX 16GB DDR4", "Memoria RAM", 29000),
-        ("Asus ROG Strix B450-F Gaming", "Tarjetas Madre", 82000),
-        ("Intel Core i5-10400F", "Procesadores", 125000),
-        ("Samsung 970 EVO Plus 500GB", "Almacenamiento", 79000),
-        ("Cooler Master Hyper 212 RGB", "Enfriamiento Líquido", 45000),
-        ("Gigabyte B550 AORUS Elite", "Tarjetas Madre", 110000),
-        ("WD Blue 1TB 3D NAND", "Almacenamiento", 60000),
-        ("AMD Ryzen 5 3600", "Procesadores", 135000),
-        ("Patriot Viper Steel 16GB DDR4", "Memoria RAM", 28000),
-        ("MSI MPG B550 Gaming Plus", "Tarjetas Madre", 95000),
-        ("Corsair H100i RGB Platinum", "Enfriamiento Líquido", 135000),
-        ("Seagate BarraCuda 2TB", "Almacenamiento", 85000),
-        ("Thermaltake Smart 600W", "Fuentes de Poder", 45000),
-        ("Asus TUF Gaming X570-Plus", "Tarjetas Madre", 125000),
-        ("G.SKILL Ripjaws V Series 16GB DDR4", "Memoria RAM", 32000),
-        ("Intel Core i7-10700K", "Procesadores", 250000),
-        ("Samsung 860 EVO 1TB", "Almacenamiento", 150000),
-        ("DeepCool Gammaxx GTE V2", "Enfriamiento Líquido", 40000),
-        ("Gigabyte X570 AORUS Elite", "Tarjetas Madre", 140000),
-        ("Crucial MX500 1TB", "Almacenamiento", 135000),
-        ("AMD Ryzen 7 3700X", "Procesadores", 270000),
-        ("Corsair Vengeance RGB Pro 16GB DDR4", "Memoria RAM", 36000),
-        ("MSI MEG X570 Unify", "Tarjetas Madre", 165000),
-        ("NZXT H510", "Gabinetes", 70000),
-        ("Gigabyte B450M DS3H", "Tarjetas Madre", 75000),
-        ("Patriot Viper Elite 8GB DDR4", "Memoria RAM", 16000),
-        ("Intel Core i9-10900K", "Procesadores", 370000),
-        ("WD Black SN750 1TB NVMe", "Almacenamiento", 175000),
-        ("Noctua NH-D15", "Enfriamiento Líquido", 90000),
-        ("MSI B450 TOMAHAWK MAX", "Tarjetas Madre", 105000),
-        ("Corsair RM750x", "Fuentes de Poder", 85000),
-        ("Asus Prime B450M-A", "Tarjetas Madre", 68000),
-        ("Adata XPG SX8200 Pro 1TB", "Almacenamiento", 150000),
-        ("AMD Ryzen 9 3900X", "Procesadores", 370000),
-        ("Corsair Vengeance LPX 32GB DDR4", "Memoria RAM", 58000),
-        ("Asrock B450 Steel Legend", "Tarjetas Madre", 95000),
-        ("Samsung 970 Pro 1TB", "Almacenamiento", 210000),
-        ("Thermaltake Toughpower GF1 750W", "Fuentes de Poder", 90000),
-        ("MSI MAG B550M Mortar", "Tarjetas Madre", 100000),
-        ("Intel Core i5-10600K", "Procesadores", 160000),
-        ("Patriot Burst 480GB SSD", "Almacenamiento", 45000),
-        ("NZXT Kraken X53", "Enfriamiento Líquido", 130000),
-        ("Gigabyte Z490 AORUS Ultra", "Tarjetas Madre", 225000),
-        ("Crucial Ballistix 16GB DDR4", "Memoria RAM", 33000),
-        ("AMD Ryzen 5 5600X", "Procesadores", 190000),
-        ("WD Blue SN550 500GB", "Almacenamiento", 80000),
-        ("Corsair SF600", "Fuentes de Poder", 110000),
-        ("Asus ROG Strix B550-F Gaming", "Tarjetas Madre", 150000),
-        ("Samsung 860 QVO 1TB", "Almacenamiento", 130000),
-        ("Cooler Master MasterLiquid ML240L", "Enfriamiento Líquido", 100000),
-        ("MSI MPG Z490 Gaming Edge", "Tarjetas Madre", 185000),
-        ("G.SKILL Trident Z Neo 16GB DDR4", "Memoria RAM", 42000),
-        ("Intel Core i9-11900K", "Procesadores", 400000),
-        ("TeamGroup T-Force Vulcan Z 1TB", "Almacenamiento", 140000),
-        ("Thermaltake Smart BX1 650W", "Fuentes de Poder", 55000),
-        ("Gigabyte Z390 AORUS Pro", "Tarjetas Madre", 180000),
-        ("Patriot P300 512GB", "Almacenamiento", 70000),
-        ("AMD Ryzen 7 5800X", "Procesadores", 320000),
-        ("Corsair Dominator Platinum 16GB DDR4", "Memoria RAM", 45000),
-        ("Asrock X570 Taichi", "Tarjetas Madre", 180000),
-        ("Samsung 980 Pro 1TB", "Almacenamiento", 250000),
-        ("Cooler Master V850 Gold", "Fuentes de Poder", 125000),
-        ("MSI MEG Z490 ACE", "Tarjetas Madre", 240000),
-        ("Intel Core i7-11700K", "Procesadores", 290000),
-        ("WD Blue 4TB HDD", "Almacenamiento", 200000),
-        ("NZXT H710", "Gabinetes", 130000),
-        ("Asus TUF Gaming B550M-PLUS", "Tarjetas Madre", 110000),
-        ("Adata XPG Gammix S11 Pro 1TB", "Almacenamiento", 165000),
-        ("Corsair AX860", "Fuentes de Poder", 145000),
-        ("Gigabyte Z490 Vision G", "Tarjetas Madre", 190000),
-        ("AMD Ryzen 9 5950X", "Procesadores", 620000),
-        ("TeamGroup T-Force Delta RGB 32GB DDR4", "Memoria RAM", 90000),
-        ("MSI MPG Z490 Gaming Carbon", "Tarjetas Madre", 210000),
-        ("Samsung 870 QVO 1TB", "Almacenamiento", 120000),
-        ("Corsair CX550M", "Fuentes de Poder", 65000),
-        ("Asrock B550 Phantom Gaming 4", "Tarjetas Madre", 90000),
-        ("Patriot Viper VPN100 512GB NVMe", "Almacenamiento", 95000),
-        ("Intel Core i5-11600K", "Procesadores", 170000),
-        ("Cooler Master MasterBox Q300L", "Gabinetes", 45000),
-    ]
-
-    for producto in productos:
-        cursor.execute(
-            "INSERT INTO productos (nombre, categoria, monto) VALUES (?, ?, ?)",
-            producto,
+        dimension = col3.selectbox(
+            "Agrupar por",
+            list(DIMENSIONES),
+            format_func={
+                "segmento": "Segmento de negocio",
+                "categoria": "Categoría",
+                "producto": "Producto (top 20)",
+                "cliente": "Cliente (top 20)",
+            }.get,
         )
+        if desde == "Todo el histórico":
+            # La fila acumulada incluye también las facturas sin fecha
+            desde = hasta = None
 
-    facturas = [
-        (1, 155000.00),
-        (2, 234000.00),
-        (3, 560000.00),
-        (4, 650000.00),
-        (5, 82000.00),
-    ]
-    for factura in facturas:
-        cursor.execute(
-            "INSERT INTO facturas (cliente_id, total) VALUES (?, ?)", factura
+        ventas_df = pd.DataFrame(
+            ventas_por(pool, dimension, desde, hasta, limite=20),
+            columns=["Nombre", "Ingreso", "Unidades", "Líneas"],
         )
+        if ventas_df.empty:
+            st.write("No hay ventas en ese rango.")
+        else:
+            st.bar_chart(ventas_df.set_index("Nombre")["Ingreso"])
+            st.dataframe(ventas_df, hide_index=True)
 
-    factura_productos = [
-        (1, 1, 2, 174000.00),
-        (1, 2, 4, 96000.00),
-        (2, 3, 2, 84000.00),
-        (3, 4, 3, 75000.00),
-        (4, 5, 1, 43900.00),
-    ]
-    for fp in factura_productos:
-        cursor.execute(
-            "INSERT INTO factura_productos (factura_id, producto_id, cantidad, monto) VALUES (?, ?, ?, ?)",
-            fp,
+        st.subheader("Ingreso por mes")
+        mensual_df = pd.DataFrame(
+            ventas_por_periodo(pool, desde, hasta),
+            columns=["Periodo", "Ingreso", "Unidades", "Líneas"],
+        )
+        if not mensual_df.empty:
+            st.line_chart(mensual_df.set_index("Periodo")["Ingreso"])
+
+
+### **Pestaña: Historial de facturas**
+# Solo abre los archivos de los años que caen en el rango (particiones.py)
+def seccion_historial():
+    st.subheader("Facturas emitidas")
+    hoy = datetime.now().date()
+    col1, col2 = st.columns(2)
+    desde = col1.date_input("Desde", hoy.replace(day=1))
+    hasta = col2.date_input("Hasta", hoy)
+    try:
+        facturas = particiones.facturas_entre(
+            pool, desde.isoformat(), (hasta + timedelta(days=1)).isoformat()
+        )
+    except FileNotFoundError as e:
+        st.error(f"No se pudo leer el historial: {e}")
+        facturas = []
+    facturas_df = pd.DataFrame(facturas, columns=["ID", "Cliente", "Emitida", "Total"])
+    if facturas_df.empty:
+        st.write("No hay facturas en ese rango.")
+    else:
+        st.dataframe(facturas_df, hide_index=True)
+        factura_id = st.selectbox("Ver líneas de la factura", facturas_df["ID"])
+        try:
+            lineas = particiones.lineas_factura(pool, int(factura_id))
+        except FileNotFoundError as e:
+            st.error(f"No se pudieron leer las líneas: {e}")
+            lineas = []
+        st.dataframe(
+            pd.DataFrame(lineas, columns=["ID Producto", "Producto", "Cantidad", "Monto"]),
+            hide_index=True,
         )
 
-    conn.commit()
-    st.success("Datos de ejemplo insertados correctamente.")
+    st.subheader("Años archivados")
+    with pool.lectura() as conn:
+        archivados = particiones.registradas(conn)
+    if archivados:
+        st.dataframe(
+            pd.DataFrame(
+                [fila[:4] for fila in archivados],
+                columns=["Año", "Archivo", "Facturas", "Líneas"],
+            ),
+            hide_index=True,
+        )
+    antes_de = hoy.year - particiones.ANIOS_ACTIVOS + 1
+    if st.button(f"Archivar las facturas anteriores a {antes_de}"):
+        with st.spinner("Archivando..."):
+            try:
+                resumenes = particiones.archivar_anteriores(pool, antes_de)
+            except (OSError, sqlite3.Error) as e:
+                st.error(f"No se pudo archivar: {e}")
+            else:
+                for resumen in resumenes:
+                    st.info(
+                        f"{resumen['anio']}: {resumen['facturas']} facturas y "
+                        f"{resumen['lineas']} líneas movidas a {resumen['ruta']}"
+                    )
+                if not resumenes:
+                    st.info("No hay años para archivar.")
 
 
 ### **Pestaña: Chistín (Citas Aleatorias de Tronald Dump)**
-with tab6:
+def seccion_chistin():
     st.title("Citas de Tronald Dump")
+    st.caption(f"Citas listas: {obtener_reserva().disponibles()}")
 
     # Botón para obtener una cita aleatoria
     if st.button("Obtener una cita aleatoria"):
@@ -574,23 +563,212 @@ with tab6:
             st.write(f"Fecha: {quote['appeared_at']}")
 
 
-with tab7:
+def seccion_datos():
     st.title("Generar Datos de Ejemplo")
     if st.button("Generar Datos de Ejemplo"):
-        insertar_datos_de_ejemplo()
+        insertar_datos_de_ejemplo(pool)
+        cache_lecturas.invalidar("clientes", "productos")
         st.success("Datos de ejemplo generados exitosamente.")
 
+    st.subheader("Importar desde CSV o Parquet")
+    with st.form("form_importar"):
+        tabla_importar = st.selectbox(
+            "Tabla destino",
+            ["clientes", "productos", "facturas", "factura_productos"],
+        )
+        archivo_importar = st.file_uploader(
+            "Archivo (las columnas deben llamarse como en la base de datos)",
+            type=["csv", "parquet"],
+        )
+        diferir_indices = st.checkbox("Recrear índices al final", value=True)
+        if st.form_submit_button("Importar") and archivo_importar is not None:
+            try:
+                resumen = importar(
+                    pool,
+                    [(tabla_importar, leer_archivo(archivo_importar, archivo_importar.name))],
+                    diferir_indices,
+                )
+            except (KeyError, ValueError, RuntimeError, sqlite3.Error) as e:
+                st.error(f"No se pudo importar el archivo: {e}")
+            else:
+                cache_lecturas.invalidar("clientes", "productos")
+                st.success(
+                    f"{resumen['filas'][tabla_importar]} filas importadas en "
+                    f"{resumen['segundos']:.2f} s ({resumen['filas_por_segundo']:.0f} filas/s)"
+                )
+
+    st.subheader("Exportar")
+    with st.form("form_exportar"):
+        col1, col2 = st.columns(2)
+        conjunto = col1.selectbox(
+            "Datos (las facturas salen con sus líneas)", list(CONJUNTOS_EXPORTACION)
+        )
+        formato = col2.selectbox("Formato", FORMATOS)
+        if st.form_submit_button("Exportar"):
+            try:
+                ruta, resumen = exportar_a_archivo(pool, conjunto, formato)
+            except (ValueError, RuntimeError, OSError, sqlite3.Error) as e:
+                st.error(f"No se pudo exportar: {e}")
+            else:
+                st.session_state.exportacion = ruta
+                st.success(
+                    f"{resumen['filas']} filas en {resumen['segundos']:.2f} s: {ruta}"
+                )
+    # La exportación se escribe a disco por bloques; el botón de descarga va
+    # fuera del formulario. Streamlit lee el archivo entero para servirlo, así
+    # que las exportaciones muy grandes conviene tomarlas del directorio
+    ruta_exportacion = st.session_state.get("exportacion")
+    if ruta_exportacion and os.path.exists(ruta_exportacion):
+        with open(ruta_exportacion, "rb") as archivo_exportado:
+            st.download_button(
+                f"Descargar {os.path.basename(ruta_exportacion)}",
+                data=archivo_exportado,
+                file_name=os.path.basename(ruta_exportacion),
+            )
+
+    st.subheader("Datos sintéticos para pruebas de carga")
+    with st.form("form_sintetico"):
+        col1, col2, col3, col4 = st.columns(4)
+        n_clientes = col1.number_input("Clientes", min_value=0, value=1000, step=1000)
+        n_productos = col2.number_input("Productos", min_value=0, value=200, step=100)
+        n_facturas = col3.number_input("Facturas", min_value=0, value=5000, step=1000)
+        semilla = col4.number_input("Semilla", min_value=0, value=0)
+        if st.form_submit_button("Generar"):
+            try:
+                resumen = poblar_sintetico(
+                    pool, int(n_clientes), int(n_productos), int(n_facturas),
+                    semilla=int(semilla),
+                )
+            except (ValueError, sqlite3.Error) as e:
+                st.error(f"No se pudieron generar los datos: {e}")
+            else:
+                cache_lecturas.invalidar("clientes", "productos")
+                st.success(
+                    f"{sum(resumen['filas'].values())} filas en {resumen['segundos']:.2f} s "
+                    f"({resumen['filas_por_segundo']:.0f} filas/s)"
+                )
+
 
-def reset_database():
-    cursor.execute("DELETE FROM factura_productos")
-    cursor.execute("DELETE FROM facturas")
-    cursor.execute("DELETE FROM productos")
-    cursor.execute("DELETE FROM clientes")
-    conn.commit()
+def reset_database(modo="recrear", progreso=None):
+    return repositorio.borrar_todo(pool, modo, progreso)
 
 
-with tab8:
+def seccion_reset():
+    respaldo = st.checkbox("Respaldar antes de borrar", value=True)
+    modo = st.radio(
+        "Cómo borrar",
+        MODOS_VACIADO,
+        format_func={
+            "recrear": "Recrear las tablas (rápido, bloquea la escritura unos segundos)",
+            "bloques": "Borrar por bloques (más lento, no bloquea a las demás sesiones)",
+        }.get,
+    )
+    compactar_al_final = st.checkbox("Compactar el archivo al terminar (VACUUM)")
     # Botón para resetear la base de datos
     if st.button("Resetear Base de Datos"):
-        reset_database()
-        st.warning("¡Todos los datos han sido eliminados!")
+        if respaldo:
+            with st.spinner("Respaldando..."):
+                ruta_respaldo = respaldar(pool)
+            st.info(f"Respaldo guardado en {ruta_respaldo}")
+        barra = st.progress(0.0) if modo == "bloques" else None
+        segundos = reset_database(
+            modo,
+            None if barra is None else lambda tabla, borradas, total: barra.progress(
+                borradas / total if total else 1.0, text=f"{tabla}: {borradas}/{total}"
+            ),
+        )
+        st.warning(f"¡Todos los datos han sido eliminados! ({segundos:.2f} s)")
+        if compactar_al_final:
+            with st.spinner("Compactando..."):
+                liberados = compactar(pool)
+            st.info(f"VACUUM liberó {liberados / 1024 / 1024:.1f} MiB")
+
+
+### **Pestaña: Rendimiento**
+def seccion_rendimiento():
+    st.subheader("Latencias por operación")
+    umbral = metricas.umbral_lenta
+    st.caption(
+        "Percentiles sobre las últimas muestras de cada operación. "
+        + (
+            f"Se registran en el log las sentencias de más de {umbral * 1000:.0f} ms "
+            f"({metricas.consultas_lentas} hasta ahora)."
+            if umbral is not None
+            else "El log de consultas lentas está apagado (ERP_UMBRAL_LENTA_MS)."
+        )
+    )
+    resumen_df = pd.DataFrame(metricas.resumen())
+    if resumen_df.empty:
+        st.write("Todavía no hay mediciones.")
+    else:
+        st.dataframe(resumen_df.round(3), hide_index=True)
+
+    st.write(
+        f"Esperas por la conexión de escritura: {pool.esperas_escritura} "
+        f"({pool.segundos_espera_escritura:.2f} s en total)"
+    )
+
+    col1, col2 = st.columns(2)
+    col1.download_button(
+        "Descargar métricas (Prometheus)",
+        data=metricas.exportar_prometheus(),
+        file_name="metricas.prom",
+        mime="text/plain",
+    )
+    if col2.button("Reiniciar métricas"):
+        metricas.limpiar()
+        st.rerun()
+
+
+SECCIONES = {
+    "Listado de Clientes": seccion_listado_clientes,
+    "Agregar Cliente": seccion_agregar_cliente,
+    "Actualizar o Eliminar Cliente": seccion_editar_cliente,
+    "Productos": seccion_productos,
+    "Facturar": seccion_facturar,
+    "Analítica": seccion_analitica,
+    "Historial de facturas": seccion_historial,
+    "Chistín": seccion_chistin,
+    "Generar datos prefabricados": seccion_datos,
+    "Borrar toda la base de datos": seccion_reset,
+    "Rendimiento": seccion_rendimiento,
+}
+# "secciones" ejecuta solo la sección elegida; "pestanas" es el modo anterior
+# con st.tabs, que ejecuta todas en cada rerun (útil para comparar)
+NAVEGACION = os.environ.get("ERP_NAVEGACION", "secciones")
+
+with pool.contar_consultas() as conteo_rerun:
+    if NAVEGACION == "pestanas":
+        with metricas.medir("rerun.pestanas"):
+            for pestana, seccion in zip(st.tabs(list(SECCIONES)), SECCIONES.values()):
+                with pestana:
+                    seccion()
+    else:
+        seccion_elegida = st.sidebar.radio("Sección", list(SECCIONES), key="seccion")
+        with metricas.medir(f"rerun.{seccion_elegida}"):
+            SECCIONES[seccion_elegida]()
+st.session_state.consultas_rerun = conteo_rerun["consultas"]
+# Archivo para el textfile collector de Prometheus, a lo sumo cada 15 s
+metricas.escribir_prometheus(cada=15)
+
+st.sidebar.caption(f"Consultas SQL en este rerun: {conteo_rerun['consultas']}")
+if "consultas_fragmento" in st.session_state:
+    st.sidebar.caption(
+        f"Consultas SQL del último rerun de la factura: {st.session_state.consultas_fragmento}"
+    )
+
+# Contadores del caché de lecturas, para confirmar que los reruns no tocan SQLite
+with st.sidebar.expander("Caché de lecturas"):
+    estadisticas_cache = cache_lecturas.estadisticas()
+    st.write(f"Aciertos: {estadisticas_cache['hits']}")
+    st.write(f"Fallos: {estadisticas_cache['misses']}")
+    st.write(f"Desalojos: {estadisticas_cache['evictions']}")
+    st.write(
+        f"Memoria: {estadisticas_cache['bytes'] / 1024:.1f} KiB "
+        f"de {estadisticas_cache['max_bytes'] / 1024:.0f} KiB"
+    )
+    estadisticas_cambios = suscriptor_cambios.estadisticas()
+    st.write(
+        f"Cambios de otros procesos aplicados: {estadisticas_cambios['eventos_ajenos']} "
+        f"(hasta el evento {estadisticas_cambios['ultimo_seq']})"
+    )
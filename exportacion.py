@@ -0,0 +1,227 @@
+"""Exportación de clientes, productos y facturas a CSV, JSONL o Parquet.
+
+Las filas se leen con un cursor de SQLite de a `tamano_bloque` (fetchmany) y
+pasan por generadores hasta el archivo: nunca hay más de un bloque en
+memoria, así que el pico no depende de cuántas filas tenga la tabla. Las
+facturas salen unidas con sus líneas (una fila por línea; las facturas sin
+líneas salen una vez con las columnas de línea vacías). Solo las de la base
+activa: los años archivados (particiones.py) ya son un archivo SQLite cada uno.
+
+Los montos se exportan en colones, con los mismos nombres de columna que
+acepta importacion.py. La lectura es una sola consulta, así que la
+exportación ve una foto consistente de la base aunque otras sesiones sigan
+escribiendo (mientras dure, el WAL no se puede recortar).
+
+Uso:
+    python exportacion.py --conjunto facturas --formato csv --salida facturas.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+from base_datos import RUTA_BD, obtener_pool
+from metricas import metricas
+
+DIRECTORIO_EXPORTACIONES = os.environ.get("ERP_DIRECTORIO_EXPORTACIONES", "exportaciones")
+TAMANO_BLOQUE = 10_000
+FORMATOS = ("csv", "jsonl", "parquet")
+
+# conjunto -> (columnas con su tipo, consulta). Todas recorren la tabla en
+# orden de ID (clave primaria e índice de factura_id): sin ordenamientos
+# temporales
+CONJUNTOS = {
+    "clientes": (
+        (
+            ("id", "entero"),
+            ("nombre", "texto"),
+            ("correo_electronico", "texto"),
+            ("segmento_negocio", "texto"),
+        ),
+        "SELECT id, nombre, correo_electronico, segmento_negocio FROM clientes ORDER BY id",
+    ),
+    "productos": (
+        (("id", "entero"), ("nombre", "texto"), ("categoria", "texto"), ("monto", "monto")),
+        "SELECT id, nombre, categoria, monto FROM productos ORDER BY id",
+    ),
+    "facturas": (
+        (
+            ("factura_id", "entero"),
+            ("cliente_id", "entero"),
+            ("emitida_en", "texto"),
+            ("descuento_bp", "entero"),
+            ("impuesto_bp", "entero"),
+            ("total", "monto"),
+            ("producto_id", "entero"),
+            ("cantidad", "entero"),
+            ("monto", "monto"),
+        ),
+        """
+        SELECT f.id, f.cliente_id, f.emitida_en, f.descuento_bp, f.impuesto_bp, f.total,
+               fp.producto_id, fp.cantidad, fp.monto
+        FROM facturas f
+        LEFT JOIN factura_productos fp ON fp.factura_id = f.id
+        ORDER BY f.id, fp.id
+        """,
+    ),
+}
+
+
+def columnas(conjunto):
+    return [nombre for nombre, _ in CONJUNTOS[conjunto][0]]
+
+
+def leer_bloques(pool, conjunto, tamano_bloque=TAMANO_BLOQUE):
+    """Genera listas de hasta `tamano_bloque` tuplas del conjunto.
+
+    Ocupa una conexión de lectura del pool hasta agotarse (o cerrarse).
+    """
+    if conjunto not in CONJUNTOS:
+        raise ValueError(f"Conjunto desconocido: {conjunto}")
+    with pool.lectura() as conn:
+        cursor = conn.execute(CONJUNTOS[conjunto][1])
+        try:
+            while True:
+                bloque = cursor.fetchmany(tamano_bloque)
+                if not bloque:
+                    break
+                yield bloque
+        finally:
+            cursor.close()
+
+
+def trozos_csv(nombres, bloques):
+    # Un str por bloque, con el encabezado en el primero
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(nombres)
+    for bloque in bloques:
+        escritor.writerows(bloque)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def trozos_jsonl(nombres, bloques):
+    for bloque in bloques:
+        yield "".join(
+            json.dumps(dict(zip(nombres, fila)), ensure_ascii=False) + "\n" for fila in bloque
+        )
+
+
+def _escribir_texto(trozos, destino):
+    for trozo in trozos:
+        destino.write(trozo.encode("utf-8"))
+
+
+def _escribir_parquet(conjunto, bloques, destino):
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except ImportError as e:
+        raise RuntimeError("Para exportar Parquet hay que instalar pyarrow") from e
+
+    tipos = {"entero": pa.int64(), "texto": pa.string(), "monto": pa.float64()}
+    esquema = pa.schema([(nombre, tipos[tipo]) for nombre, tipo in CONJUNTOS[conjunto][0]])
+    # Un row group por bloque
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for bloque in bloques:
+            escritor.write_batch(
+                pa.RecordBatch.from_arrays(
+                    [pa.array(valores, tipo) for valores, tipo in zip(zip(*bloque), esquema.types)],
+                    schema=esquema,
+                )
+            )
+
+
+def _contar(bloques, conteo):
+    for bloque in bloques:
+        conteo["filas"] += len(bloque)
+        yield bloque
+
+
+@metricas.instrumentar(filas=lambda resumen: resumen["filas"])
+def exportar(pool, conjunto, formato, destino, tamano_bloque=TAMANO_BLOQUE):
+    """Escribe el conjunto en `destino` (ruta o archivo binario abierto).
+
+    Devuelve un dict con filas, segundos y filas por segundo.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato}")
+    inicio = time.perf_counter()
+    conteo = {"filas": 0}
+    bloques = _contar(leer_bloques(pool, conjunto, tamano_bloque), conteo)
+    try:
+        if formato == "parquet":
+            _escribir_parquet(conjunto, bloques, destino)
+        else:
+            trozos = (trozos_csv if formato == "csv" else trozos_jsonl)(columnas(conjunto), bloques)
+            if isinstance(destino, (str, os.PathLike)):
+                with open(destino, "wb") as f:
+                    _escribir_texto(trozos, f)
+            else:
+                _escribir_texto(trozos, destino)
+    finally:
+        # Devuelve la conexión al pool aunque la escritura falle a medias
+        bloques.close()
+    segundos = time.perf_counter() - inicio
+    return {
+        "filas": conteo["filas"],
+        "segundos": segundos,
+        "filas_por_segundo": conteo["filas"] / segundos if segundos else 0.0,
+    }
+
+
+def exportar_a_archivo(pool, conjunto, formato, directorio=DIRECTORIO_EXPORTACIONES,
+                       tamano_bloque=TAMANO_BLOQUE):
+    """Exporta a `directorio`/<conjunto>-AAAAMMDD-HHMMSS.<formato>.
+
+    Devuelve (ruta, resumen). El archivo aparece completo o no aparece: se
+    escribe con otro nombre y se renombra al terminar.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    marca = datetime.now().strftime("%Y%m%d-%H%M%S")
+    ruta = os.path.join(directorio, f"{conjunto}-{marca}.{formato}")
+    temporal = f"{ruta}.tmp"
+    try:
+        resumen = exportar(pool, conjunto, formato, temporal, tamano_bloque)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    os.replace(temporal, ruta)
+    return ruta, resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportación de datos del ERP")
+    parser.add_argument("--bd", default=RUTA_BD)
+    parser.add_argument("--conjunto", choices=sorted(CONJUNTOS), required=True)
+    parser.add_argument("--formato", choices=FORMATOS, default="csv")
+    parser.add_argument("--salida", help="archivo destino (por defecto, en --directorio)")
+    parser.add_argument("--directorio", default=DIRECTORIO_EXPORTACIONES)
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE)
+    args = parser.parse_args()
+
+    pool = obtener_pool(args.bd)
+    if args.salida:
+        ruta = args.salida
+        resumen = exportar(pool, args.conjunto, args.formato, ruta, args.bloque)
+    else:
+        ruta, resumen = exportar_a_archivo(
+            pool, args.conjunto, args.formato, args.directorio, args.bloque
+        )
+    print(
+        f"{resumen['filas']} filas en {resumen['segundos']:.2f} s "
+        f"({resumen['filas_por_segundo']:.0f} filas/s): {ruta}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Registro de facturas en una sola transacción.
+
+El encabezado y todas las líneas se escriben juntos: o queda la factura
+completa o no queda nada. `registrar_facturas` hace lo mismo para un lote
+entero de facturas. Los montos se guardan en céntimos (ver precios.py).
+"""
+
+from itertools import groupby
+
+from analitica import actualizar_agregados, sumar_lineas_desde, ultima_linea
+from cambios import ALTA, registrar
+from cola_facturas import datos_factura
+from metricas import metricas
+from precios import a_centimos, a_colones, liquidar
+
+
+def calcular_total(lineas, descuento_bp=0, impuesto_bp=0):
+    # En colones, para mostrar; lo que se guarda es liquidar(...)["total"]
+    return a_colones(liquidar(lineas, descuento_bp, impuesto_bp)["total"])
+
+
+INSERTAR_FACTURA = (
+    "INSERT INTO facturas (cliente_id, total_centimos, descuento_bp, impuesto_bp, emitida_en) "
+    "VALUES (?, ?, ?, ?, COALESCE(?, datetime('now')))"
+)
+INSERTAR_LINEA = (
+    "INSERT INTO factura_productos (factura_id, producto_id, cantidad, precio_centimos) "
+    "VALUES (?, ?, ?, ?)"
+)
+
+
+def _filas_lineas(factura_id, lineas):
+    return [
+        (factura_id, int(linea["producto_id"]), int(linea["cantidad"]), a_centimos(linea["monto"]))
+        for linea in lineas
+    ]
+
+
+def _fila_factura(cliente_id, lineas, descuento_bp, impuesto_bp, emitida_en):
+    total = liquidar(lineas, descuento_bp, impuesto_bp)["total"]
+    return (int(cliente_id), total, descuento_bp, impuesto_bp, emitida_en)
+
+
+@metricas.instrumentar(filas=lambda factura_id: 1)
+def registrar_factura(pool, cliente_id, lineas, emitida_en=None, descuento_bp=0, impuesto_bp=0):
+    """Guarda la factura y sus líneas; devuelve el ID de la factura.
+
+    Cada línea es un dict con "producto_id", "cantidad" y "monto" (precio
+    unitario en colones, el mismo formato de st.session_state.productos_temp).
+    Los IDs que vienen de pandas son numpy.int64, que sqlite3 no sabe
+    enlazar, así que se convierten aquí. `emitida_en` ("AAAA-MM-DD HH:MM:SS",
+    UTC) es por defecto el momento actual; descuento e impuesto van en puntos
+    básicos. Los resúmenes de ventas se actualizan en la misma transacción.
+    """
+    if not lineas:
+        raise ValueError("La factura no tiene productos")
+
+    fila = _fila_factura(cliente_id, lineas, descuento_bp, impuesto_bp, emitida_en)
+    with pool.escritura() as conn:
+        factura_id = conn.execute(INSERTAR_FACTURA, fila).lastrowid
+        conn.executemany(INSERTAR_LINEA, _filas_lineas(factura_id, lineas))
+        actualizar_agregados(conn, factura_id)
+        registrar(conn, "facturas", ALTA, [factura_id])
+    return factura_id
+
+
+@metricas.instrumentar()
+def registrar_facturas(pool, facturas, emitida_en=None, descuento_bp=0, impuesto_bp=0):
+    """Guarda un lote de (cliente_id, lineas) en una sola transacción.
+
+    Devuelve los IDs en el mismo orden. Si alguna factura falla (sin líneas,
+    cliente o producto inexistente) no se guarda ninguna.
+    """
+    facturas = list(facturas)
+    if any(not lineas for _, lineas in facturas):
+        raise ValueError("Hay facturas sin productos")
+
+    # Los totales se calculan antes de abrir la transacción de escritura
+    filas_facturas = [
+        _fila_factura(cliente_id, lineas, descuento_bp, impuesto_bp, emitida_en)
+        for cliente_id, lineas in facturas
+    ]
+    ids = []
+    filas_lineas = []
+    with pool.escritura() as conn:
+        desde_linea = ultima_linea(conn)
+        for fila, (_, lineas) in zip(filas_facturas, facturas):
+            factura_id = conn.execute(INSERTAR_FACTURA, fila).lastrowid
+            ids.append(factura_id)
+            filas_lineas.extend(_filas_lineas(factura_id, lineas))
+        conn.executemany(INSERTAR_LINEA, filas_lineas)
+        # Un solo recorrido de los resúmenes para todo el lote
+        sumar_lineas_desde(conn, desde_linea)
+        registrar(conn, "facturas", ALTA, ids)
+    return ids
+
+
+def datos_facturas(pool, factura_ids=None):
+    """Genera el dict de cada factura guardada, listo para renderizar su PDF.
+
+    Sin `factura_ids` recorre todas las facturas en orden de ID.
+    """
+    sql = """
+        SELECT f.id, c.nombre, p.nombre, fp.cantidad, fp.monto, f.descuento_bp, f.impuesto_bp
+        FROM facturas f
+        JOIN clientes c ON c.id = f.cliente_id
+        JOIN factura_productos fp ON fp.factura_id = f.id
+        JOIN productos p ON p.id = fp.producto_id
+        {where}
+        ORDER BY f.id, fp.id
+    """
+    if factura_ids is None:
+        consultas = [(sql.format(where=""), ())]
+    else:
+        factura_ids = list(factura_ids)
+        consultas = []
+        for i in range(0, len(factura_ids), 500):
+            bloque = factura_ids[i:i + 500]
+            marcadores = ", ".join("?" for _ in bloque)
+            consultas.append(
+                (sql.format(where=f"WHERE f.id IN ({marcadores})"), tuple(bloque))
+            )
+
+    for consulta, parametros in consultas:
+        with pool.lectura() as conn:
+            filas = conn.execute(consulta, parametros).fetchall()
+        for factura_id, lineas in groupby(filas, key=lambda fila: fila[0]):
+            lineas = list(lineas)
+            yield datos_factura(
+                factura_id,
+                lineas[0][1],
+                [
+                    {"nombre": linea[2], "cantidad": linea[3], "monto": linea[4]}
+                    for linea in lineas
+                ],
+                descuento_bp=lineas[0][5],
+                impuesto_bp=lineas[0][6],
+            )
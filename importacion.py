@@ -0,0 +1,372 @@
+"""Carga masiva de clientes, productos y facturas históricas.
+
+Los archivos se leen por bloques (CSV con el módulo csv, Parquet con pyarrow si
+está instalado) y cada bloque se inserta con executemany. Toda la importación
+corre en una sola transacción: si una fila falla no queda nada a medias.
+
+También genera datos sintéticos deterministas para pruebas de carga:
+    python importacion.py --sintetico --clientes 1000000 --productos 50000 \
+        --facturas 2000000 --diferir-indices
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from analitica import sumar_lineas_desde, ultima_linea
+from base_datos import RUTA_BD, obtener_pool
+from busqueda import indexacion_diferida
+from cambios import TABLAS as TABLAS_CAMBIOS, TODO, registrar
+from metricas import metricas
+from precios import a_centimos
+
+TAMANO_BLOQUE = 10_000
+
+# Columnas aceptadas por tabla; "id" es opcional y sirve para enlazar facturas
+# históricas con sus líneas, "emitida_en" es "AAAA-MM-DD HH:MM:SS"
+COLUMNAS = {
+    "clientes": ("nombre", "correo_electronico", "segmento_negocio"),
+    "productos": ("nombre", "categoria", "monto"),
+    "facturas": ("id", "cliente_id", "total", "emitida_en"),
+    "factura_productos": ("factura_id", "producto_id", "cantidad", "monto"),
+}
+COLUMNAS_OPCIONALES = {"id", "emitida_en"}
+# Los archivos traen montos en colones; en la base se guardan en céntimos
+# (monto y total son columnas generadas). Las filas en tuplas ya vienen en
+# céntimos
+COLUMNAS_BD = {"monto": "precio_centimos", "total": "total_centimos"}
+CONVERSIONES = {
+    "id": int,
+    "cliente_id": int,
+    "factura_id": int,
+    "producto_id": int,
+    "cantidad": int,
+    "monto": a_centimos,
+    "total": a_centimos,
+}
+
+
+def leer_csv(archivo, tamano_bloque=TAMANO_BLOQUE):
+    # Acepta una ruta o un archivo abierto en modo binario (p. ej. st.file_uploader)
+    if isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, newline="", encoding="utf-8-sig") as f:
+            yield from _bloques_csv(f, tamano_bloque)
+    else:
+        texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+        try:
+            yield from _bloques_csv(texto, tamano_bloque)
+        finally:
+            texto.detach()
+
+
+def _bloques_csv(f, tamano_bloque):
+    lector = csv.DictReader(f)
+    bloque = []
+    for fila in lector:
+        bloque.append(fila)
+        if len(bloque) >= tamano_bloque:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def leer_parquet(archivo, tamano_bloque=TAMANO_BLOQUE):
+    try:
+        import pyarrow.parquet as pq  # type: ignore
+    except ImportError as e:
+        raise RuntimeError("Para importar Parquet hay que instalar pyarrow") from e
+
+    for lote in pq.ParquetFile(archivo).iter_batches(batch_size=tamano_bloque):
+        yield lote.to_pylist()
+
+
+def leer_archivo(archivo, nombre=None, tamano_bloque=TAMANO_BLOQUE):
+    nombre = nombre or str(archivo)
+    if nombre.lower().endswith(".parquet"):
+        return leer_parquet(archivo, tamano_bloque)
+    return leer_csv(archivo, tamano_bloque)
+
+
+def _a_tuplas(tabla, bloque):
+    columnas = COLUMNAS[tabla]
+    presentes = [c for c in columnas if c not in COLUMNAS_OPCIONALES or c in bloque[0]]
+    filas = []
+    for fila in bloque:
+        filas.append(
+            tuple(
+                CONVERSIONES.get(c, str)(fila[c]) if fila[c] not in (None, "") else None
+                for c in presentes
+            )
+        )
+    return presentes, filas
+
+
+def _obligatorias(tabla):
+    return [c for c in COLUMNAS[tabla] if c not in COLUMNAS_OPCIONALES]
+
+
+@contextmanager
+def indices_diferidos(conn, tablas):
+    """Elimina los índices secundarios de `tablas` y los recrea al salir.
+
+    Cargar primero y construir el índice después es bastante más rápido que
+    mantenerlo fila a fila. Debe usarse dentro de una transacción abierta.
+    """
+    indices = []
+    for tabla in tablas:
+        indices += conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (tabla,),
+        ).fetchall()
+    for nombre, _ in indices:
+        conn.execute(f'DROP INDEX "{nombre}"')
+    yield
+    for _, sql in indices:
+        conn.execute(sql)
+
+
+def importar_bloques(conn, tabla, bloques, columnas=None):
+    """Inserta en `tabla` los bloques de filas; devuelve cuántas insertó.
+
+    Cada bloque es una lista de dicts (como salen de leer_archivo) o de tuplas
+    con las `columnas` indicadas (por defecto, las obligatorias de la tabla),
+    con los montos ya en céntimos. Debe llamarse dentro de una transacción
+    abierta.
+    """
+    if tabla not in COLUMNAS:
+        raise ValueError(f"Tabla desconocida: {tabla}")
+
+    total = 0
+    for bloque in bloques:
+        if not bloque:
+            continue
+        if isinstance(bloque[0], dict):
+            nombres, filas = _a_tuplas(tabla, bloque)
+        else:
+            nombres, filas = columnas or _obligatorias(tabla), bloque
+        marcadores = ", ".join("?" for _ in nombres)
+        destino = ", ".join(COLUMNAS_BD.get(nombre, nombre) for nombre in nombres)
+        conn.executemany(
+            f"INSERT INTO {tabla} ({destino}) VALUES ({marcadores})",
+            filas,
+        )
+        total += len(filas)
+    return total
+
+
+def ultimos_ids(conn, tabla, cantidad):
+    # IDs de las últimas `cantidad` filas insertadas, en orden de inserción.
+    # Dentro de la transacción de escritura nadie más pudo insertar entre medio.
+    filas = conn.execute(f"SELECT id FROM {tabla} ORDER BY id DESC LIMIT ?", (cantidad,))
+    return [fila[0] for fila in filas][::-1]
+
+
+def _resumen(filas, inicio):
+    segundos = time.perf_counter() - inicio
+    total = sum(filas.values())
+    return {
+        "filas": filas,
+        "segundos": segundos,
+        "filas_por_segundo": total / segundos if segundos else 0.0,
+    }
+
+
+@metricas.instrumentar(filas=lambda resumen: sum(resumen["filas"].values()))
+def importar(pool, cargas, diferir_indices=False):
+    """Importa varias tablas en una sola transacción.
+
+    `cargas` es una lista de (tabla, bloques) en el orden en que deben
+    insertarse (clientes y productos antes que facturas). Devuelve un dict con
+    filas por tabla, segundos y filas por segundo.
+    """
+    inicio = time.perf_counter()
+    filas = {}
+    tablas = [tabla for tabla, _ in cargas] if diferir_indices else []
+    with pool.escritura() as conn, indices_diferidos(conn, tablas), indexacion_diferida(
+        conn, tablas
+    ):
+        desde_linea = ultima_linea(conn)
+        for tabla, bloques in cargas:
+            filas[tabla] = filas.get(tabla, 0) + importar_bloques(conn, tabla, bloques)
+        # Las líneas nuevas entran a los resúmenes de ventas en la misma transacción
+        sumar_lineas_desde(conn, desde_linea)
+        # Una carga masiva es un solo evento por tabla, no uno por fila
+        for tabla in filas:
+            if tabla in TABLAS_CAMBIOS and filas[tabla]:
+                registrar(conn, tabla, TODO)
+    return _resumen(filas, inicio)
+
+
+# Datos sintéticos deterministas: la misma semilla produce siempre las mismas
+# filas, así los resultados de las pruebas de carga se pueden comparar
+SEGMENTOS = [
+    "Corporativo", "Pequeño Negocio", "Tecnología", "Diseño Gráfico", "Consultoría",
+    "Servicios", "Papelería", "Impresión", "Importación", "Retail",
+]
+# Las fechas sintéticas caen en los dos años siguientes a esta fecha fija, para
+# que no dependan del día en que se generan
+FECHA_BASE_SINTETICA = datetime(2023, 1, 1)
+SEGUNDOS_RANGO_SINTETICO = 2 * 365 * 24 * 3600
+
+CATEGORIAS = [
+    "Tarjetas Madre", "Memoria RAM", "Fuentes de Poder", "Procesadores",
+    "Almacenamiento", "Enfriamiento Líquido", "Ventiladores", "Gabinetes",
+]
+
+
+def _por_bloques(filas, tamano_bloque):
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) >= tamano_bloque:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def clientes_sinteticos(cantidad, semilla=0, tamano_bloque=TAMANO_BLOQUE):
+    rnd = random.Random(f"clientes-{semilla}")
+    filas = (
+        (f"Cliente {i}", f"cliente{i}@example.com", rnd.choice(SEGMENTOS))
+        for i in range(1, cantidad + 1)
+    )
+    return _por_bloques(filas, tamano_bloque)
+
+
+def productos_sinteticos(cantidad, semilla=0, tamano_bloque=TAMANO_BLOQUE):
+    rnd = random.Random(f"productos-{semilla}")
+    filas = (
+        (f"Producto {i}", rnd.choice(CATEGORIAS), rnd.randrange(1_000, 700_000, 100) * 100)
+        for i in range(1, cantidad + 1)
+    )
+    return _por_bloques(filas, tamano_bloque)
+
+
+def facturas_sinteticas(
+    cantidad, clientes_ids, productos_ids, lineas_por_factura=3, semilla=0, primer_id=1,
+    tamano_bloque=TAMANO_BLOQUE,
+):
+    """Genera bloques (facturas, lineas) que referencian los IDs dados.
+
+    Las líneas se calculan junto con su factura para que el total cuadre (sin
+    descuento ni impuesto, en céntimos); los IDs de factura son explícitos a
+    partir de `primer_id`.
+    """
+    rnd = random.Random(f"facturas-{semilla}")
+    facturas = []
+    lineas = []
+    for factura_id in range(primer_id, primer_id + cantidad):
+        total = 0
+        for _ in range(rnd.randint(1, 2 * lineas_por_factura - 1)):
+            cantidad_linea = rnd.randint(1, 5)
+            precio = rnd.randrange(1_000, 700_000, 100) * 100
+            lineas.append((factura_id, rnd.choice(productos_ids), cantidad_linea, precio))
+            total += precio * cantidad_linea
+        emitida_en = FECHA_BASE_SINTETICA + timedelta(
+            seconds=rnd.randrange(SEGUNDOS_RANGO_SINTETICO)
+        )
+        facturas.append(
+            (
+                factura_id,
+                rnd.choice(clientes_ids),
+                total,
+                emitida_en.strftime("%Y-%m-%d %H:%M:%S"),
+            )
+        )
+        if len(facturas) >= tamano_bloque:
+            yield facturas, lineas
+            facturas, lineas = [], []
+    if facturas:
+        yield facturas, lineas
+
+
+def _ids(conn, tabla):
+    # array de enteros de 64 bits: un millón de IDs ocupa ~8 MB
+    return array("q", (fila[0] for fila in conn.execute(f"SELECT id FROM {tabla}")))
+
+
+@metricas.instrumentar(filas=lambda resumen: sum(resumen["filas"].values()))
+def poblar_sintetico(
+    pool, clientes=0, productos=0, facturas=0, lineas_por_factura=3, semilla=0,
+    diferir_indices=True, tamano_bloque=TAMANO_BLOQUE,
+):
+    """Agrega datos sintéticos en una sola transacción; devuelve el resumen."""
+    inicio = time.perf_counter()
+    filas = {}
+    tablas = list(COLUMNAS) if diferir_indices else []
+    with pool.escritura() as conn, indices_diferidos(conn, tablas), indexacion_diferida(
+        conn, tablas
+    ):
+        filas["clientes"] = importar_bloques(
+            conn, "clientes", clientes_sinteticos(clientes, semilla, tamano_bloque)
+        )
+        filas["productos"] = importar_bloques(
+            conn, "productos", productos_sinteticos(productos, semilla, tamano_bloque)
+        )
+        if facturas:
+            clientes_ids = _ids(conn, "clientes")
+            productos_ids = _ids(conn, "productos")
+            if not clientes_ids or not productos_ids:
+                raise ValueError("Se necesitan clientes y productos para generar facturas")
+            primer_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM facturas").fetchone()[0]
+            desde_linea = ultima_linea(conn)
+            filas["facturas"] = filas["factura_productos"] = 0
+            for bloque_facturas, bloque_lineas in facturas_sinteticas(
+                facturas, clientes_ids, productos_ids, lineas_por_factura, semilla,
+                primer_id, tamano_bloque,
+            ):
+                filas["facturas"] += importar_bloques(
+                    conn, "facturas", [bloque_facturas], COLUMNAS["facturas"]
+                )
+                filas["factura_productos"] += importar_bloques(
+                    conn, "factura_productos", [bloque_lineas]
+                )
+            sumar_lineas_desde(conn, desde_linea)
+        for tabla in TABLAS_CAMBIOS:
+            if filas.get(tabla):
+                registrar(conn, tabla, TODO)
+    return _resumen(filas, inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga masiva de datos del ERP")
+    parser.add_argument("--bd", default=RUTA_BD)
+    parser.add_argument("--tabla", choices=sorted(COLUMNAS), help="tabla destino del archivo")
+    parser.add_argument("--archivo", help="CSV o Parquet a importar")
+    parser.add_argument("--sintetico", action="store_true")
+    parser.add_argument("--clientes", type=int, default=0)
+    parser.add_argument("--productos", type=int, default=0)
+    parser.add_argument("--facturas", type=int, default=0)
+    parser.add_argument("--lineas-por-factura", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE)
+    parser.add_argument("--diferir-indices", action="store_true")
+    args = parser.parse_args()
+
+    pool = obtener_pool(args.bd)
+    if args.sintetico:
+        resumen = poblar_sintetico(
+            pool, args.clientes, args.productos, args.facturas,
+            args.lineas_por_factura, args.semilla, args.diferir_indices, args.bloque,
+        )
+    elif args.archivo and args.tabla:
+        bloques = leer_archivo(args.archivo, tamano_bloque=args.bloque)
+        resumen = importar(pool, [(args.tabla, bloques)], args.diferir_indices)
+    else:
+        parser.error("indica --sintetico o --tabla y --archivo")
+    print(
+        f"{sum(resumen['filas'].values())} filas en {resumen['segundos']:.2f} s "
+        f"({resumen['filas_por_segundo']:.0f} filas/s): {resumen['filas']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
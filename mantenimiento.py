@@ -0,0 +1,198 @@
+"""Respaldo y vaciado de la base de datos para ventanas de mantenimiento.
+
+`respaldar` copia la base a un archivo con fecha usando la API de backup de
+SQLite, sin detener la aplicación. `vaciar` deja las tablas de datos vacías
+de dos maneras:
+
+- "recrear": borra y vuelve a crear las tablas (con sus índices) en una sola
+  transacción corta. Con las claves foráneas activas un DELETE sin WHERE
+  revisa fila por fila; un DROP de las tablas hijas primero no.
+- "bloques": borra en transacciones de `tamano_bloque` filas, así otras
+  sesiones pueden escribir entre bloque y bloque, e informa el progreso.
+
+En ambos casos los contadores AUTOINCREMENT se conservan: un ID de factura
+nunca se reutiliza (los PDFs se guardan por ID). Los años archivados
+(particiones.py) dejan de consultarse, pero sus archivos quedan en disco.
+Después, `compactar` devuelve el espacio al sistema con VACUUM.
+
+Uso:
+    python mantenimiento.py --respaldar --vaciar recrear --vacuum
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from analitica import DIMENSIONES, reconstruir_en
+from busqueda import vaciar_indices
+from cache_datos import obtener_cache
+from cambios import TABLAS as TABLAS_CAMBIOS, TODO, registrar
+from particiones import TABLA_REGISTRO
+
+DIRECTORIO_RESPALDOS = os.environ.get("ERP_DIRECTORIO_RESPALDOS", "respaldos")
+# Hijas antes que padres: así ningún borrado tiene que revisar claves foráneas
+TABLAS = ("factura_productos", "facturas", "productos", "clientes")
+MODOS = ("recrear", "bloques")
+TAMANO_BLOQUE = 50_000
+PAGINAS_POR_PASO = 4096
+
+
+def respaldar(pool, directorio=DIRECTORIO_RESPALDOS, progreso=None):
+    """Copia la base a `directorio`/<nombre>-AAAAMMDD-HHMMSS.db; devuelve la ruta.
+
+    La copia avanza de a PAGINAS_POR_PASO páginas; `progreso(restantes,
+    total)` se llama después de cada paso. Si otra conexión escribe mientras
+    tanto, SQLite reinicia la copia, así que el archivo siempre es consistente.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    nombre = os.path.splitext(os.path.basename(pool.ruta))[0]
+    marca = datetime.now().strftime("%Y%m%d-%H%M%S")
+    ruta = os.path.join(directorio, f"{nombre}-{marca}.db")
+    temporal = f"{ruta}.tmp"
+
+    def avance(estado, restantes, total):
+        if progreso is not None:
+            progreso(restantes, total)
+
+    destino = sqlite3.connect(temporal)
+    try:
+        with pool.lectura() as conn:
+            conn.backup(destino, pages=PAGINAS_POR_PASO, progress=avance)
+    finally:
+        destino.close()
+    os.replace(temporal, ruta)  # un respaldo a medias nunca tiene el nombre final
+    return ruta
+
+
+def _secuencias(conn):
+    marcadores = ", ".join("?" for _ in TABLAS)
+    return dict(
+        conn.execute(
+            f"SELECT name, seq FROM sqlite_sequence WHERE name IN ({marcadores})", TABLAS
+        ).fetchall()
+    )
+
+
+def _recrear(pool):
+    with pool.escritura() as conn:
+        secuencias = _secuencias(conn)
+        # Definiciones actuales (ya migradas) de cada tabla, sus índices y triggers
+        sentencias = {
+            tabla: [
+                fila[0]
+                for fila in conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL "
+                    "ORDER BY type != 'table'",
+                    (tabla,),
+                )
+            ]
+            for tabla in TABLAS
+        }
+        for tabla in TABLAS:
+            conn.execute(f"DROP TABLE {tabla}")
+        for tabla in reversed(TABLAS):
+            for sql in sentencias[tabla]:
+                conn.execute(sql)
+        conn.executemany(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", secuencias.items()
+        )
+        for tabla, _ in DIMENSIONES.values():
+            conn.execute(f"DELETE FROM {tabla}")
+        # DROP TABLE no dispara los triggers que mantienen la búsqueda
+        vaciar_indices(conn)
+        conn.execute(f"DELETE FROM {TABLA_REGISTRO}")
+        for tabla in TABLAS_CAMBIOS:
+            registrar(conn, tabla, TODO)
+
+
+def _por_bloques(pool, tamano_bloque, progreso):
+    for tabla in TABLAS:
+        with pool.lectura() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+        borradas = 0
+        while True:
+            with pool.escritura() as conn:
+                cantidad = conn.execute(
+                    f"DELETE FROM {tabla} WHERE id IN "
+                    f"(SELECT id FROM {tabla} ORDER BY id LIMIT ?)",
+                    (tamano_bloque,),
+                ).rowcount
+                if cantidad and tabla in TABLAS_CAMBIOS:
+                    registrar(conn, tabla, TODO)
+            borradas += cantidad
+            if progreso is not None:
+                progreso(tabla, borradas, max(total, borradas))
+            if cantidad < tamano_bloque:
+                break
+    # Lo que se haya facturado mientras se borraba sigue contando
+    with pool.escritura() as conn:
+        conn.execute(f"DELETE FROM {TABLA_REGISTRO}")
+        reconstruir_en(conn)
+
+
+def vaciar(pool, modo="recrear", tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    """Deja vacías clientes, productos, facturas y sus líneas; devuelve segundos.
+
+    `progreso(tabla, borradas, total)` solo se usa en modo "bloques".
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconocido: {modo} (válidos: {', '.join(MODOS)})")
+    inicio = time.perf_counter()
+    try:
+        if modo == "recrear":
+            _recrear(pool)
+        else:
+            _por_bloques(pool, tamano_bloque, progreso)
+    finally:
+        obtener_cache(pool).invalidar("clientes", "productos")
+    return time.perf_counter() - inicio
+
+
+def compactar(pool):
+    """VACUUM y checkpoint del WAL; devuelve los bytes liberados en disco."""
+    antes = _tamano_en_disco(pool.ruta)
+    with pool.exclusiva() as conn:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return antes - _tamano_en_disco(pool.ruta)
+
+
+def _tamano_en_disco(ruta):
+    return sum(
+        os.path.getsize(r) for r in (ruta, f"{ruta}-wal") if os.path.exists(r)
+    )
+
+
+def main():
+    from base_datos import RUTA_BD, obtener_pool
+
+    parser = argparse.ArgumentParser(description="Respaldo y vaciado de la base del ERP")
+    parser.add_argument("--bd", default=RUTA_BD)
+    parser.add_argument("--respaldar", action="store_true")
+    parser.add_argument("--directorio", default=DIRECTORIO_RESPALDOS)
+    parser.add_argument("--vaciar", choices=MODOS)
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE)
+    parser.add_argument("--vacuum", action="store_true")
+    args = parser.parse_args()
+
+    pool = obtener_pool(args.bd)
+    if args.respaldar:
+        inicio = time.perf_counter()
+        ruta = respaldar(pool, args.directorio)
+        print(f"Respaldo en {ruta} ({time.perf_counter() - inicio:.2f} s)")
+    if args.vaciar:
+        segundos = vaciar(
+            pool,
+            args.vaciar,
+            args.tamano_bloque,
+            lambda tabla, borradas, total: print(f"{tabla}: {borradas}/{total}"),
+        )
+        print(f"Tablas vaciadas en {segundos:.2f} s")
+    if args.vacuum:
+        print(f"VACUUM liberó {compactar(pool) / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Latencias de las operaciones del ERP, agregadas en memoria.
+
+Cada operación instrumentada (helpers de base de datos, sentencias SQL,
+llamadas HTTP y reruns de Streamlit) suma su duración a un histograma con
+cubetas fijas, estilo Prometheus, y guarda las últimas muestras para calcular
+p50/p95/p99. Igual que el caché de lecturas, vive en el módulo y lo comparten
+todas las sesiones del proceso.
+
+Las sentencias SQL se agrupan por su texto normalizado (sin literales, con las
+listas de marcadores colapsadas), así cada consulta tiene su serie sin que
+los valores la partan en miles. Con ERP_UMBRAL_LENTA_MS se registran en el log las sentencias SQL que tardan
+más que ese umbral, con su texto (nunca con los parámetros).
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+
+logger = logging.getLogger("erp.consultas_lentas")
+
+# Límites superiores de las cubetas, en segundos (la última es +Inf)
+CUBETAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+MUESTRAS_POR_OPERACION = 2048
+LARGO_MAXIMO_SQL = 160
+ARCHIVO_PROMETHEUS = os.environ.get("ERP_METRICAS_ARCHIVO", "metricas.prom")
+
+
+def _umbral_por_defecto():
+    valor = os.environ.get("ERP_UMBRAL_LENTA_MS")
+    return float(valor) / 1000 if valor else None
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return None
+    indice = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[indice]
+
+
+class _Serie:
+    __slots__ = ("cuenta", "suma", "maximo", "filas", "cubetas", "muestras")
+
+    def __init__(self):
+        self.cuenta = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        self.filas = 0
+        self.cubetas = [0] * (len(CUBETAS) + 1)
+        # Solo las últimas muestras: los percentiles reflejan el uso reciente
+        self.muestras = deque(maxlen=MUESTRAS_POR_OPERACION)
+
+
+class Metricas:
+    def __init__(self, umbral_lenta=None):
+        # Segundos a partir de los cuales una sentencia SQL va al log (None: nunca)
+        self.umbral_lenta = umbral_lenta
+        self.consultas_lentas = 0
+        self._lock = threading.Lock()
+        self._series = {}
+        self._ultima_exportacion = 0.0
+
+    def registrar(self, operacion, segundos, filas=None):
+        with self._lock:
+            serie = self._series.get(operacion)
+            if serie is None:
+                serie = self._series[operacion] = _Serie()
+            serie.cuenta += 1
+            serie.suma += segundos
+            serie.maximo = max(serie.maximo, segundos)
+            if filas is not None and filas > 0:
+                serie.filas += filas
+            for i, limite in enumerate(CUBETAS):
+                if segundos <= limite:
+                    serie.cubetas[i] += 1
+                    break
+            else:
+                serie.cubetas[-1] += 1
+            serie.muestras.append(segundos)
+
+    def sumar_filas(self, operacion, filas):
+        # Filas que se leen después de medir la operación (los SELECT)
+        with self._lock:
+            serie = self._series.get(operacion)
+            if serie is not None and filas > 0:
+                serie.filas += filas
+
+    def registrar_sql(self, sql, segundos, filas=None):
+        """Registra una sentencia; devuelve el nombre de su serie."""
+        operacion = f"sql.{normalizar_sql(sql)}"
+        self.registrar(operacion, segundos, filas)
+        if self.umbral_lenta is not None and segundos >= self.umbral_lenta:
+            with self._lock:
+                self.consultas_lentas += 1
+            logger.warning("Consulta lenta (%.1f ms): %s", segundos * 1000, " ".join(sql.split()))
+        return operacion
+
+    @contextmanager
+    def medir(self, operacion):
+        """Mide el bloque; se puede indicar las filas con resultado["filas"]."""
+        resultado = {"filas": None}
+        inicio = time.perf_counter()
+        try:
+            yield resultado
+        finally:
+            self.registrar(operacion, time.perf_counter() - inicio, resultado["filas"])
+
+    def instrumentar(self, operacion=None, filas=None):
+        """Decorador que mide cada llamada a la función.
+
+        `filas` recibe el resultado y devuelve cuántas filas representa; por
+        defecto se cuenta len() de listas y DataFrames.
+        """
+        contar = filas or _contar_filas
+
+        def decorador(funcion):
+            nombre = operacion or funcion.__name__
+
+            @wraps(funcion)
+            def envoltura(*args, **kwargs):
+                inicio = time.perf_counter()
+                valor = funcion(*args, **kwargs)
+                self.registrar(nombre, time.perf_counter() - inicio, contar(valor))
+                return valor
+
+            return envoltura
+
+        return decorador
+
+    def resumen(self):
+        """Devuelve una lista de dicts por operación, ordenada por tiempo total."""
+        with self._lock:
+            copias = [
+                (nombre, serie.cuenta, serie.suma, serie.maximo, serie.filas, sorted(serie.muestras))
+                for nombre, serie in self._series.items()
+            ]
+        filas = []
+        for nombre, cuenta, suma, maximo, total_filas, muestras in copias:
+            filas.append(
+                {
+                    "operacion": nombre,
+                    "llamadas": cuenta,
+                    "total_ms": suma * 1000,
+                    "p50_ms": percentil(muestras, 50) * 1000,
+                    "p95_ms": percentil(muestras, 95) * 1000,
+                    "p99_ms": percentil(muestras, 99) * 1000,
+                    "max_ms": maximo * 1000,
+                    "filas": total_filas,
+                }
+            )
+        filas.sort(key=lambda f: f["total_ms"], reverse=True)
+        return filas
+
+    def exportar_prometheus(self):
+        """Texto en el formato de exposición de Prometheus."""
+        with self._lock:
+            series = [
+                (nombre, serie.cuenta, serie.suma, serie.filas, list(serie.cubetas))
+                for nombre, serie in sorted(self._series.items())
+            ]
+        lineas = [
+            "# HELP erp_duracion_segundos Duración de las operaciones instrumentadas.",
+            "# TYPE erp_duracion_segundos histogram",
+        ]
+        for nombre, cuenta, suma, _, cubetas in series:
+            etiqueta = _etiqueta(nombre)
+            acumulado = 0
+            for limite, cantidad in zip((*CUBETAS, "+Inf"), cubetas):
+                acumulado += cantidad
+                lineas.append(
+                    f'erp_duracion_segundos_bucket{{operacion="{etiqueta}",le="{limite}"}} {acumulado}'
+                )
+            lineas.append(f'erp_duracion_segundos_sum{{operacion="{etiqueta}"}} {suma:.6f}')
+            lineas.append(f'erp_duracion_segundos_count{{operacion="{etiqueta}"}} {cuenta}')
+        lineas += [
+            "# HELP erp_filas_total Filas devueltas o modificadas por operación.",
+            "# TYPE erp_filas_total counter",
+        ]
+        for nombre, _, _, filas, _ in series:
+            lineas.append(f'erp_filas_total{{operacion="{_etiqueta(nombre)}"}} {filas}')
+        lineas += [
+            "# HELP erp_consultas_lentas_total Sentencias SQL sobre el umbral de lentitud.",
+            "# TYPE erp_consultas_lentas_total counter",
+            f"erp_consultas_lentas_total {self.consultas_lentas}",
+        ]
+        return "\n".join(lineas) + "\n"
+
+    def escribir_prometheus(self, ruta=ARCHIVO_PROMETHEUS, cada=None):
+        """Escribe el archivo para el textfile collector de node_exporter.
+
+        Con `cada` (segundos) no escribe si la última exportación es más reciente.
+        """
+        ahora = time.monotonic()
+        if cada is not None and ahora - self._ultima_exportacion < cada:
+            return False
+        self._ultima_exportacion = ahora
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(self.exportar_prometheus())
+        os.replace(temporal, ruta)  # el collector nunca lee un archivo a medias
+        return True
+
+    def limpiar(self):
+        with self._lock:
+            self._series.clear()
+            self.consultas_lentas = 0
+
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_LISTA_MARCADORES = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+@lru_cache(maxsize=1024)
+def normalizar_sql(sql):
+    """Texto de la sentencia sin literales, para usarlo como nombre de serie.
+
+    `WHERE id IN (?, ?, ?)` y `WHERE id IN (?, ?)` quedan iguales, igual que
+    `LIMIT 51` y `LIMIT 100`; los textos largos se cortan.
+    """
+    texto = " ".join(sql.split())
+    if not texto:
+        return "vacia"
+    texto = _LITERAL_TEXTO.sub("?", texto)
+    texto = _LITERAL_NUMERO.sub("?", texto)
+    texto = _LISTA_MARCADORES.sub("?, ...", texto)
+    if len(texto) > LARGO_MAXIMO_SQL:
+        texto = texto[:LARGO_MAXIMO_SQL - 1] + "…"
+    return texto
+
+
+def _contar_filas(valor):
+    if isinstance(valor, list) or hasattr(valor, "memory_usage"):
+        return len(valor)
+    return None
+
+
+def _etiqueta(valor):
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metricas = Metricas(umbral_lenta=_umbral_por_defecto())
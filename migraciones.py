@@ -0,0 +1,602 @@
+"""Migraciones versionadas del esquema.
+
+La tabla schema_version guarda qué migraciones ya se aplicaron. Cada
+migración corre en su propia transacción y solo una vez por base de datos;
+base_datos.obtener_pool las ejecuta al crear el pool, es decir, una vez por
+proceso y no en cada rerun de Streamlit.
+
+Para revisar que las consultas críticas usan índices:
+    python migraciones.py --verificar [--bd erp_app.db]
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Tablas de resumen de ventas y la expresión de su clave sobre el join de una
+# línea, tal como las crearon las migraciones 4 y 9. Son una copia fija: las
+# migraciones no leen nada de los módulos de la aplicación, que pueden cambiar
+_RESUMENES = (
+    ("ventas_por_segmento", "c.segmento_negocio"),
+    ("ventas_por_categoria", "p.categoria"),
+    ("ventas_por_producto", "fp.producto_id"),
+    ("ventas_por_cliente", "f.cliente_id"),
+)
+
+# (versión, descripción, pasos) en orden; cada paso es una sentencia SQL o una
+# función que recibe la conexión. Nunca se edita una migración ya publicada,
+# se agrega una nueva. Por eso cada paso lleva su SQL escrito aquí, no
+# generado con código de otros módulos
+MIGRACIONES = [
+    (
+        1,
+        "Esquema base",
+        [
+            """
+CREATE TABLE IF NOT EXISTS clientes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    correo_electronico TEXT NOT NULL,
+    segmento_negocio TEXT NOT NULL
+)
+""",
+            """
+CREATE TABLE IF NOT EXISTS facturas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cliente_id INTEGER NOT NULL,
+    total REAL NOT NULL,
+    FOREIGN KEY(cliente_id) REFERENCES clientes(id)
+)
+""",
+            """
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    monto REAL NOT NULL
+)
+""",
+            """
+CREATE TABLE IF NOT EXISTS factura_productos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    factura_id INTEGER NOT NULL,
+    producto_id INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    monto REAL NOT NULL,
+    FOREIGN KEY(factura_id) REFERENCES facturas(id),
+    FOREIGN KEY(producto_id) REFERENCES productos(id)
+)
+""",
+        ],
+    ),
+    (
+        2,
+        "Índices de nombre para listados paginados",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_clientes_nombre ON clientes(nombre COLLATE NOCASE)",
+            "CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos(nombre COLLATE NOCASE)",
+        ],
+    ),
+    (
+        3,
+        "Índices de claves foráneas y filtros",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_facturas_cliente ON facturas(cliente_id)",
+            "CREATE INDEX IF NOT EXISTS idx_factura_productos_factura ON factura_productos(factura_id)",
+            "CREATE INDEX IF NOT EXISTS idx_factura_productos_producto ON factura_productos(producto_id)",
+            "CREATE INDEX IF NOT EXISTS idx_clientes_segmento ON clientes(segmento_negocio)",
+            "CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(categoria)",
+        ],
+    ),
+    (
+        4,
+        "Fecha de emisión y resúmenes de ventas",
+        [
+            "ALTER TABLE facturas ADD COLUMN emitida_en TEXT",
+            *[
+                f"""
+CREATE TABLE IF NOT EXISTS {tabla} (
+    periodo TEXT NOT NULL,
+    clave NOT NULL,
+    ingreso REAL NOT NULL,
+    cantidad INTEGER NOT NULL,
+    lineas INTEGER NOT NULL,
+    PRIMARY KEY (periodo, clave)
+) WITHOUT ROWID
+"""
+                for tabla, _ in _RESUMENES
+            ],
+            lambda conn: resumenes_reales(conn),
+        ],
+    ),
+    (
+        5,
+        "Montos en céntimos enteros",
+        # factura_productos.monto pasa a ser el precio unitario (precio_centimos).
+        # Los datos de ejemplo viejos guardaban ahí el total de la línea; la
+        # migración 11 corrige esas líneas
+        [
+            lambda conn: reconstruir_tabla(
+                conn,
+                "productos",
+                """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    precio_centimos INTEGER NOT NULL,
+    monto REAL GENERATED ALWAYS AS (precio_centimos / 100.0) VIRTUAL
+""",
+                "id, nombre, categoria, precio_centimos",
+                "SELECT id, nombre, categoria, CAST(ROUND(monto * 100) AS INTEGER) FROM productos",
+            ),
+            lambda conn: reconstruir_tabla(
+                conn,
+                "facturas",
+                """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cliente_id INTEGER NOT NULL,
+    total_centimos INTEGER NOT NULL,
+    descuento_bp INTEGER NOT NULL DEFAULT 0,
+    impuesto_bp INTEGER NOT NULL DEFAULT 0,
+    emitida_en TEXT,
+    total REAL GENERATED ALWAYS AS (total_centimos / 100.0) VIRTUAL,
+    FOREIGN KEY(cliente_id) REFERENCES clientes(id)
+""",
+                "id, cliente_id, total_centimos, emitida_en",
+                "SELECT id, cliente_id, CAST(ROUND(total * 100) AS INTEGER), emitida_en FROM facturas",
+            ),
+            lambda conn: reconstruir_tabla(
+                conn,
+                "factura_productos",
+                """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    factura_id INTEGER NOT NULL,
+    producto_id INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    precio_centimos INTEGER NOT NULL,
+    monto REAL GENERATED ALWAYS AS (precio_centimos / 100.0) VIRTUAL,
+    FOREIGN KEY(factura_id) REFERENCES facturas(id),
+    FOREIGN KEY(producto_id) REFERENCES productos(id)
+""",
+                "id, factura_id, producto_id, cantidad, precio_centimos",
+                "SELECT id, factura_id, producto_id, cantidad, CAST(ROUND(monto * 100) AS INTEGER) "
+                "FROM factura_productos",
+            ),
+        ],
+    ),
+    (
+        6,
+        "Búsqueda de texto completo de clientes y productos",
+        [
+            # Prefijos de 2 a 8 caracteres indexados aparte (el índice ocupa el
+            # doble): sin ellos "cliente"* recorre cada término que empieza
+            # así, y cada correo (cliente123@...) aporta uno distinto
+            """
+CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5(
+    nombre, correo_electronico, content='clientes', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8'
+)
+""",
+            "INSERT INTO clientes_fts (clientes_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+            "CREATE TRIGGER IF NOT EXISTS clientes_fts_ai AFTER INSERT ON clientes BEGIN "
+            "INSERT INTO clientes_fts (rowid, nombre, correo_electronico) "
+            "VALUES (new.id, new.nombre, new.correo_electronico); END",
+            "CREATE TRIGGER IF NOT EXISTS clientes_fts_ad AFTER DELETE ON clientes BEGIN "
+            "INSERT INTO clientes_fts (clientes_fts, rowid, nombre, correo_electronico) "
+            "VALUES ('delete', old.id, old.nombre, old.correo_electronico); END",
+            "CREATE TRIGGER IF NOT EXISTS clientes_fts_au AFTER UPDATE OF nombre, correo_electronico "
+            "ON clientes BEGIN "
+            "INSERT INTO clientes_fts (clientes_fts, rowid, nombre, correo_electronico) "
+            "VALUES ('delete', old.id, old.nombre, old.correo_electronico); "
+            "INSERT INTO clientes_fts (rowid, nombre, correo_electronico) "
+            "VALUES (new.id, new.nombre, new.correo_electronico); END",
+            "INSERT INTO clientes_fts (clientes_fts) VALUES ('rebuild')",
+            """
+CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+    nombre, categoria, content='productos', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8'
+)
+""",
+            "INSERT INTO productos_fts (productos_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0)')",
+            "CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN "
+            "INSERT INTO productos_fts (rowid, nombre, categoria) "
+            "VALUES (new.id, new.nombre, new.categoria); END",
+            "CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN "
+            "INSERT INTO productos_fts (productos_fts, rowid, nombre, categoria) "
+            "VALUES ('delete', old.id, old.nombre, old.categoria); END",
+            "CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre, categoria "
+            "ON productos BEGIN "
+            "INSERT INTO productos_fts (productos_fts, rowid, nombre, categoria) "
+            "VALUES ('delete', old.id, old.nombre, old.categoria); "
+            "INSERT INTO productos_fts (rowid, nombre, categoria) "
+            "VALUES (new.id, new.nombre, new.categoria); END",
+            "INSERT INTO productos_fts (productos_fts) VALUES ('rebuild')",
+        ],
+    ),
+    (
+        7,
+        "Índice de fecha de emisión y registro de años archivados",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_facturas_emitida ON facturas(emitida_en)",
+            """
+CREATE TABLE IF NOT EXISTS particiones_facturas (
+    anio INTEGER PRIMARY KEY,
+    ruta TEXT NOT NULL,
+    facturas INTEGER NOT NULL,
+    lineas INTEGER NOT NULL,
+    id_min INTEGER,
+    id_max INTEGER,
+    archivada_en TEXT NOT NULL
+)
+""",
+        ],
+    ),
+    (
+        8,
+        "Registro de cambios para invalidar cachés entre procesos",
+        [
+            """
+CREATE TABLE IF NOT EXISTS cambios (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabla TEXT NOT NULL,
+    fila_id INTEGER,
+    op TEXT NOT NULL,
+    origen INTEGER NOT NULL,
+    registrado_en REAL NOT NULL
+)
+""",
+        ],
+    ),
+    (
+        9,
+        "Ingreso de los resúmenes de ventas en céntimos, con descuento e impuesto",
+        [lambda conn: resumenes_en_centimos(conn)],
+    ),
+    (
+        10,
+        "Índices para ordenar productos por precio y los listados filtrados por nombre",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_productos_precio ON productos(precio_centimos, id)",
+            "CREATE INDEX IF NOT EXISTS idx_productos_categoria_nombre "
+            "ON productos(categoria, nombre COLLATE NOCASE, id)",
+            "CREATE INDEX IF NOT EXISTS idx_productos_categoria_precio "
+            "ON productos(categoria, precio_centimos, id)",
+            "CREATE INDEX IF NOT EXISTS idx_clientes_segmento_nombre "
+            "ON clientes(segmento_negocio, nombre COLLATE NOCASE, id)",
+        ],
+    ),
+    (
+        11,
+        "Precio unitario en las líneas que guardaban el total de la línea",
+        [lambda conn: lineas_a_precio_unitario(conn)],
+    ),
+]
+
+# Migraciones que reconstruyen tablas con claves foráneas: corren con
+# foreign_keys=OFF, como pide el procedimiento de SQLite para cambiar una
+# tabla (con las claves activas, DROP TABLE de un padre falla)
+RECONSTRUCCIONES = {5}
+
+
+def reconstruir_tabla(conn, tabla, definicion, columnas, seleccion):
+    """Cambia la definición de `tabla` conservando filas, índices y AUTOINCREMENT.
+
+    `seleccion` es un SELECT sobre la tabla vieja que devuelve `columnas` de
+    la nueva. Los índices se recrean con su SQL original.
+    """
+    nueva = f"{tabla}_nueva"
+    indices = [
+        fila[0]
+        for fila in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (tabla,),
+        )
+    ]
+    conn.execute(f"CREATE TABLE {nueva} ({definicion})")
+    conn.execute(f"INSERT INTO {nueva} ({columnas}) {seleccion}")
+    # El contador de AUTOINCREMENT pasa a la tabla nueva: los IDs borrados
+    # tampoco se reutilizan después de la migración
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (nueva,))
+    conn.execute("UPDATE sqlite_sequence SET name = ? WHERE name = ?", (nueva, tabla))
+    conn.execute(f"DROP TABLE {tabla}")
+    conn.execute(f"ALTER TABLE {nueva} RENAME TO {tabla}")
+    for sql in indices:
+        conn.execute(sql)
+
+
+def resumenes_reales(conn):
+    # Llenado de la migración 4 tal como se publicó (ingreso REAL bruto, con
+    # el esquema de entonces); la migración 9 lo pasa a céntimos
+    periodo_mes = "COALESCE(substr(f.emitida_en, 1, 7), 'sin fecha')"
+    for tabla, clave in _RESUMENES:
+        for periodo in (periodo_mes, "'*'"):
+            conn.execute(
+                f"""
+                INSERT INTO {tabla} (periodo, clave, ingreso, cantidad, lineas)
+                SELECT {periodo}, {clave}, SUM(fp.cantidad * fp.monto),
+                       SUM(fp.cantidad), COUNT(*)
+                FROM factura_productos fp
+                JOIN facturas f ON f.id = fp.factura_id
+                JOIN clientes c ON c.id = f.cliente_id
+                JOIN productos p ON p.id = fp.producto_id
+                GROUP BY 1, 2
+                ON CONFLICT (periodo, clave) DO UPDATE SET
+                    ingreso = ingreso + excluded.ingreso,
+                    cantidad = cantidad + excluded.cantidad,
+                    lineas = lineas + excluded.lineas
+                """
+            )
+
+
+def resumenes_en_centimos(conn):
+    """Paso de la migración 9: ingreso REAL bruto -> céntimos con descuento e impuesto.
+
+    Los periodos de la base activa se recalculan desde sus líneas con la
+    liquidación de precios.py de entonces; los de años archivados ya no tienen
+    líneas aquí (y una migración no adjunta sus archivos), así que conservan
+    su ingreso bruto, redondeado a céntimos.
+    """
+    anios = [str(fila[0]) for fila in conn.execute("SELECT anio FROM particiones_facturas")]
+    marcadores = ", ".join("?" for _ in anios)
+    bruto = "(fp.precio_centimos * fp.cantidad)"
+    descuento = f"(({bruto} * f.descuento_bp + 5000) / 10000)"
+    total_linea = f"({bruto} - {descuento} + (({bruto} - {descuento}) * f.impuesto_bp + 5000) / 10000)"
+    for tabla, clave in _RESUMENES:
+        conn.execute(f"ALTER TABLE {tabla} RENAME TO {tabla}_viejo")
+        conn.execute(
+            f"""
+CREATE TABLE IF NOT EXISTS {tabla} (
+    periodo TEXT NOT NULL,
+    clave NOT NULL,
+    ingreso_centimos INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    lineas INTEGER NOT NULL,
+    PRIMARY KEY (periodo, clave)
+) WITHOUT ROWID
+"""
+        )
+        if anios:
+            archivados = f"FROM {tabla}_viejo WHERE substr(periodo, 1, 4) IN ({marcadores})"
+            conn.execute(
+                f"INSERT INTO {tabla} (periodo, clave, ingreso_centimos, cantidad, lineas) "
+                f"SELECT periodo, clave, CAST(ROUND(ingreso * 100) AS INTEGER), cantidad, lineas "
+                f"{archivados}",
+                anios,
+            )
+            conn.execute(
+                f"INSERT INTO {tabla} (periodo, clave, ingreso_centimos, cantidad, lineas) "
+                f"SELECT '*', clave, SUM(CAST(ROUND(ingreso * 100) AS INTEGER)), "
+                f"SUM(cantidad), SUM(lineas) {archivados} GROUP BY clave",
+                anios,
+            )
+        conn.execute(f"DROP TABLE {tabla}_viejo")
+        for periodo in ("COALESCE(substr(f.emitida_en, 1, 7), 'sin fecha')", "'*'"):
+            conn.execute(
+                f"""
+                INSERT INTO {tabla} (periodo, clave, ingreso_centimos, cantidad, lineas)
+                SELECT {periodo}, {clave}, SUM({total_linea}), SUM(fp.cantidad), COUNT(*)
+                FROM factura_productos fp
+                JOIN facturas f ON f.id = fp.factura_id
+                JOIN clientes c ON c.id = f.cliente_id
+                JOIN productos p ON p.id = fp.producto_id
+                GROUP BY 1, 2
+                ON CONFLICT (periodo, clave) DO UPDATE SET
+                    ingreso_centimos = ingreso_centimos + excluded.ingreso_centimos,
+                    cantidad = cantidad + excluded.cantidad,
+                    lineas = lineas + excluded.lineas
+                """
+            )
+
+
+def lineas_a_precio_unitario(conn):
+    """Paso de la migración 11: divide por la cantidad las líneas con el total guardado.
+
+    Antes de la migración 5 los datos de ejemplo guardaban en
+    factura_productos.monto el total de la línea y la pestaña Facturar el
+    precio unitario; la migración 5 tomó ambos como precio unitario. Se
+    corrigen las líneas de más de una unidad cuyo precio es exactamente el
+    del producto por la cantidad, y sus resúmenes de ventas. Los totales
+    guardados de las facturas no se tocan (`python precios.py --verificar`
+    los compara con las líneas).
+    """
+    conn.execute(
+        """
+        CREATE TEMP TABLE lineas_con_total AS
+        SELECT fp.id FROM factura_productos fp
+        JOIN productos p ON p.id = fp.producto_id
+        WHERE fp.cantidad > 1 AND fp.precio_centimos = p.precio_centimos * fp.cantidad
+        """
+    )
+    bruto = "(fp.precio_centimos * fp.cantidad)"
+    descuento = f"(({bruto} * f.descuento_bp + 5000) / 10000)"
+    total_linea = f"({bruto} - {descuento} + (({bruto} - {descuento}) * f.impuesto_bp + 5000) / 10000)"
+
+    def sumar_resumenes(signo):
+        for tabla, clave in _RESUMENES:
+            for periodo in ("COALESCE(substr(f.emitida_en, 1, 7), 'sin fecha')", "'*'"):
+                conn.execute(
+                    f"""
+                    INSERT INTO {tabla} (periodo, clave, ingreso_centimos, cantidad, lineas)
+                    SELECT {periodo}, {clave}, {signo} * SUM({total_linea}),
+                           {signo} * SUM(fp.cantidad), {signo} * COUNT(*)
+                    FROM factura_productos fp
+                    JOIN facturas f ON f.id = fp.factura_id
+                    JOIN clientes c ON c.id = f.cliente_id
+                    JOIN productos p ON p.id = fp.producto_id
+                    WHERE fp.id IN (SELECT id FROM temp.lineas_con_total)
+                    GROUP BY 1, 2
+                    ON CONFLICT (periodo, clave) DO UPDATE SET
+                        ingreso_centimos = ingreso_centimos + excluded.ingreso_centimos,
+                        cantidad = cantidad + excluded.cantidad,
+                        lineas = lineas + excluded.lineas
+                    """
+                )
+
+    # Se resta lo que las líneas sumaron con el precio equivocado y se suma de nuevo
+    sumar_resumenes(-1)
+    conn.execute(
+        "UPDATE factura_productos SET precio_centimos = precio_centimos / cantidad "
+        "WHERE id IN (SELECT id FROM temp.lineas_con_total)"
+    )
+    sumar_resumenes(1)
+    conn.execute("DROP TABLE temp.lineas_con_total")
+
+
+def version_actual(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, descripcion TEXT NOT NULL, aplicada_en REAL NOT NULL)"
+    )
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrar(pool, migraciones=MIGRACIONES):
+    """Aplica las migraciones pendientes; devuelve las versiones aplicadas."""
+    aplicadas = []
+    for version, descripcion, pasos in migraciones:
+        if version in RECONSTRUCCIONES:
+            # PRAGMA foreign_keys no tiene efecto dentro de una transacción
+            with pool.exclusiva() as conn:
+                conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            with pool.escritura() as conn:
+                # Se vuelve a leer dentro de la transacción por si otro proceso
+                # migró la misma base mientras tanto
+                if version <= version_actual(conn):
+                    continue
+                for paso in pasos:
+                    if callable(paso):
+                        paso(conn)
+                    else:
+                        conn.execute(paso)
+                conn.execute(
+                    "INSERT INTO schema_version (version, descripcion, aplicada_en) VALUES (?, ?, ?)",
+                    (version, descripcion, time.time()),
+                )
+        finally:
+            if version in RECONSTRUCCIONES:
+                with pool.exclusiva() as conn:
+                    conn.execute("PRAGMA foreign_keys = ON")
+        logger.info("Migración %s aplicada: %s", version, descripcion)
+        aplicadas.append(version)
+
+    if aplicadas:
+        # foreign_keys solo valida las filas nuevas; avisamos si ya había huérfanas
+        with pool.lectura() as conn:
+            huerfanas = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if huerfanas:
+            logger.warning(
+                "%s filas violan claves foráneas (p. ej. %s)", len(huerfanas), huerfanas[0]
+            )
+    return aplicadas
+
+
+# Consultas de la aplicación que deben resolverse con índices
+CONSULTAS_CRITICAS = {
+    "facturas por cliente": ("SELECT id, total FROM facturas WHERE cliente_id = ?", (1,)),
+    "líneas por factura": ("SELECT * FROM factura_productos WHERE factura_id = ?", (1,)),
+    "líneas por producto": ("SELECT * FROM factura_productos WHERE producto_id = ?", (1,)),
+    "clientes por segmento": (
+        "SELECT id, nombre FROM clientes WHERE segmento_negocio = ? ORDER BY id LIMIT 51",
+        ("Retail",),
+    ),
+    "productos por categoría": (
+        "SELECT id, nombre FROM productos WHERE categoria = ? ORDER BY id LIMIT 51",
+        ("Memoria RAM",),
+    ),
+    "clientes por nombre": (
+        "SELECT id, nombre FROM clientes WHERE (nombre COLLATE NOCASE, id) > (?, ?) "
+        "ORDER BY nombre COLLATE NOCASE, id LIMIT 51",
+        ("M", 0),
+    ),
+    "productos por nombre": (
+        "SELECT id, nombre FROM productos ORDER BY nombre COLLATE NOCASE, id LIMIT 51",
+        (),
+    ),
+    "productos por precio": (
+        "SELECT id, nombre FROM productos WHERE (precio_centimos, id) < (?, ?) "
+        "ORDER BY precio_centimos DESC, id DESC LIMIT 51",
+        (100000, 0),
+    ),
+    "clientes de un segmento por nombre": (
+        "SELECT id, nombre FROM clientes WHERE segmento_negocio = ? "
+        "AND (nombre COLLATE NOCASE, id) > (?, ?) ORDER BY nombre COLLATE NOCASE, id LIMIT 51",
+        ("Retail", "M", 0),
+    ),
+    "productos de una categoría por nombre": (
+        "SELECT id, nombre FROM productos WHERE categoria = ? "
+        "ORDER BY nombre COLLATE NOCASE, id LIMIT 51",
+        ("Memoria RAM",),
+    ),
+    "productos de una categoría por precio": (
+        "SELECT id, nombre FROM productos WHERE categoria = ? "
+        "ORDER BY precio_centimos, id LIMIT 51",
+        ("Memoria RAM",),
+    ),
+    "facturas del mes": (
+        "SELECT id, total FROM facturas WHERE emitida_en >= ? AND emitida_en < ? "
+        "ORDER BY emitida_en DESC, id DESC LIMIT 100",
+        ("2024-05-01", "2024-06-01"),
+    ),
+    "segmentos distintos": ("SELECT DISTINCT segmento_negocio FROM clientes", ()),
+    "categorías distintas": ("SELECT DISTINCT categoria FROM productos", ()),
+    "ventas por segmento": (
+        "SELECT clave, ingreso_centimos FROM ventas_por_segmento WHERE periodo = ?",
+        ("*",),
+    ),
+}
+
+
+def plan_consulta(conn, sql, parametros=()):
+    return [fila[3] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)]
+
+
+def usa_indices(plan):
+    # Un SCAN sin índice recorre la tabla completa; ordenar con un B-tree
+    # temporal también delata un índice faltante
+    for paso in plan:
+        if paso.startswith("SCAN") and "INDEX" not in paso:
+            return False
+        if "USE TEMP B-TREE" in paso:
+            return False
+    return True
+
+
+def verificar_planes(pool, consultas=None):
+    """Devuelve {nombre: plan} de las consultas críticas que no usan índices."""
+    fallas = {}
+    with pool.lectura() as conn:
+        for nombre, (sql, parametros) in (consultas or CONSULTAS_CRITICAS).items():
+            plan = plan_consulta(conn, sql, parametros)
+            if not usa_indices(plan):
+                fallas[nombre] = plan
+    return fallas
+
+
+def main():
+    from base_datos import RUTA_BD, obtener_pool
+
+    parser = argparse.ArgumentParser(description="Migraciones del esquema del ERP")
+    parser.add_argument("--bd", default=RUTA_BD)
+    parser.add_argument("--verificar", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    pool = obtener_pool(args.bd)
+    with pool.lectura() as conn:
+        print(f"Versión del esquema: {version_actual(conn)}")
+
+    if args.verificar:
+        fallas = verificar_planes(pool)
+        for nombre, plan in fallas.items():
+            print(f"SIN ÍNDICE: {nombre}: {' | '.join(plan)}")
+        if fallas:
+            sys.exit(1)
+        print(f"Las {len(CONSULTAS_CRITICAS)} consultas críticas usan índices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Listados paginados de clientes y productos.
+
+Usa paginación por llave (keyset): en vez de OFFSET, cada página pide las filas
+que vienen después de la última fila vista según el orden elegido. Así pedir
+la página 1 o la 20.000 cuesta lo mismo, y la interfaz solo trae una página.
+"""
+
+from metricas import metricas
+
+CLIENTES = {
+    "tabla": "clientes",
+    "columnas": ("id", "nombre", "correo_electronico", "segmento_negocio"),
+    "filtro": "segmento_negocio",
+    "ordenes": {"id": "id", "nombre": "nombre COLLATE NOCASE"},
+}
+PRODUCTOS = {
+    "tabla": "productos",
+    "columnas": ("id", "nombre", "categoria", "monto"),
+    "filtro": "categoria",
+    "ordenes": {"id": "id", "nombre": "nombre COLLATE NOCASE", "monto": "precio_centimos"},
+}
+
+
+def _escapar_like(texto):
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@metricas.instrumentar(filas=lambda resultado: len(resultado[0]))
+def pagina(
+    pool, listado, tamano=50, despues=None, orden="id", descendente=False,
+    filtro=None, prefijo=None,
+):
+    """Devuelve (filas, cursor_siguiente) de una página del listado.
+
+    `despues` es el cursor que devolvió la página anterior (None para la
+    primera); `cursor_siguiente` es None cuando ya no hay más filas. `filtro`
+    compara por igualdad contra la columna de segmento/categoría y `prefijo`
+    busca nombres que empiecen con ese texto, sin distinguir mayúsculas.
+    """
+    if orden not in listado["ordenes"]:
+        raise ValueError(f"No se puede ordenar por {orden}")
+    expresion = listado["ordenes"][orden]
+    comparador = "<" if descendente else ">"
+    direccion = "DESC" if descendente else "ASC"
+
+    condiciones = []
+    parametros = []
+    if filtro:
+        condiciones.append(f"{listado['filtro']} = ?")
+        parametros.append(filtro)
+    if prefijo:
+        condiciones.append("nombre LIKE ? ESCAPE '\\'")
+        parametros.append(_escapar_like(prefijo) + "%")
+    if despues is not None:
+        if orden == "id":
+            condiciones.append(f"id {comparador} ?")
+            parametros.append(despues[1])
+        else:
+            # El id desempata filas con el mismo valor de orden
+            condiciones.append(f"({expresion}, id) {comparador} (?, ?)")
+            parametros.extend(despues)
+
+    orden_sql = f"id {direccion}" if orden == "id" else f"{expresion} {direccion}, id {direccion}"
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    # El valor de orden va como última columna: el cursor lo necesita tal cual
+    # lo compara el índice (p. ej. precio_centimos, no el monto en colones)
+    columnas = (*listado["columnas"], expresion)
+    # Pedimos una fila de más para saber si hay página siguiente
+    sql = (
+        f"SELECT {', '.join(columnas)} FROM {listado['tabla']} "
+        f"{where} ORDER BY {orden_sql} LIMIT ?"
+    )
+    with pool.lectura() as conn:
+        filas = conn.execute(sql, (*parametros, tamano + 1)).fetchall()
+
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        siguiente = (filas[-1][-1], filas[-1][0])
+    return [fila[:-1] for fila in filas], siguiente
+
+
+@metricas.instrumentar()
+def valores_filtro(pool, listado):
+    # Valores distintos de segmento/categoría para poblar los filtros
+    columna = listado["filtro"]
+    with pool.lectura() as conn:
+        return [
+            fila[0]
+            for fila in conn.execute(
+                f"SELECT DISTINCT {columna} FROM {listado['tabla']} ORDER BY {columna}"
+            )
+        ]
@@ -0,0 +1,389 @@
+"""Facturas de años cerrados en archivos SQLite aparte, de solo lectura.
+
+La base activa guarda los años recientes. `archivar(pool, anio)` mueve las
+facturas emitidas ese año (según facturas.emitida_en) y sus líneas a un
+archivo propio y las borra de la base activa. El archivo no se vuelve a
+escribir (queda con permisos de solo lectura), así que se respalda una vez y
+los respaldos y VACUUM de la base activa ya no recorren todo el historial.
+
+El movimiento tiene dos pasos: primero se copia al archivo nuevo (ATTACH e
+INSERT ... SELECT) y se confirma; después, en una transacción que solo
+escribe en la base activa, se borran las facturas copiadas y se anota el
+archivo en particiones_facturas. Con WAL una transacción sobre varias bases
+no es atómica en conjunto, por eso no se mezclan: si el proceso muere entre
+los dos pasos queda un archivo sin registrar, que se ignora, y nada se pierde.
+
+Las consultas (`facturas_entre`, `lineas_factura`) recorren la base activa y
+solo los archivos de los años que se cruzan con el rango pedido, adjuntando
+uno a la vez. Los resúmenes de analitica.py no se tocan: los reportes siguen
+incluyendo los años archivados sin abrir sus archivos.
+
+Uso:
+    python particiones.py --archivar-antes 2024
+    python particiones.py --listar
+"""
+
+import argparse
+import os
+import stat
+from contextlib import contextmanager
+from datetime import datetime
+
+from cambios import TODO, registrar
+from metricas import metricas
+
+DIRECTORIO_ARCHIVO = os.environ.get("ERP_DIRECTORIO_ARCHIVO", "archivo")
+TABLA_REGISTRO = "particiones_facturas"
+# Años que se quedan siempre en la base activa, contando el actual
+ANIOS_ACTIVOS = 2
+
+COLUMNAS_FACTURAS = ("id", "cliente_id", "total_centimos", "descuento_bp", "impuesto_bp", "emitida_en")
+COLUMNAS_LINEAS = ("id", "factura_id", "producto_id", "cantidad", "precio_centimos")
+
+# Mismas columnas que en la base activa, sin claves foráneas (SQLite no las
+# valida entre bases distintas)
+ESQUEMA_ARCHIVO = [
+    """
+CREATE TABLE archivo.facturas (
+    id INTEGER PRIMARY KEY,
+    cliente_id INTEGER NOT NULL,
+    total_centimos INTEGER NOT NULL,
+    descuento_bp INTEGER NOT NULL DEFAULT 0,
+    impuesto_bp INTEGER NOT NULL DEFAULT 0,
+    emitida_en TEXT,
+    total REAL GENERATED ALWAYS AS (total_centimos / 100.0) VIRTUAL
+)
+""",
+    """
+CREATE TABLE archivo.factura_productos (
+    id INTEGER PRIMARY KEY,
+    factura_id INTEGER NOT NULL,
+    producto_id INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    precio_centimos INTEGER NOT NULL,
+    monto REAL GENERATED ALWAYS AS (precio_centimos / 100.0) VIRTUAL
+)
+""",
+]
+# Se crean después de copiar las filas: construirlos al final es más rápido
+INDICES_ARCHIVO = [
+    "CREATE INDEX archivo.idx_facturas_emitida ON facturas(emitida_en)",
+    "CREATE INDEX archivo.idx_facturas_cliente ON facturas(cliente_id)",
+    "CREATE INDEX archivo.idx_factura_productos_factura ON factura_productos(factura_id)",
+]
+
+CONSULTA_FACTURAS = """
+SELECT f.id, COALESCE(c.nombre, 'Cliente ' || f.cliente_id), f.emitida_en, f.total
+FROM {esquema}.facturas f
+LEFT JOIN main.clientes c ON c.id = f.cliente_id
+WHERE {condicion}
+ORDER BY f.emitida_en DESC, f.id DESC
+LIMIT ?
+"""
+CONSULTA_LINEAS = """
+SELECT fp.producto_id, COALESCE(p.nombre, 'Producto ' || fp.producto_id), fp.cantidad, fp.monto
+FROM {esquema}.factura_productos fp
+LEFT JOIN main.productos p ON p.id = fp.producto_id
+WHERE fp.factura_id = ?
+ORDER BY fp.id
+"""
+
+
+
+def limites(anio):
+    # emitida_en es "AAAA-MM-DD HH:MM:SS": el año entero es [desde, hasta)
+    return f"{anio:04d}-01-01", f"{anio + 1:04d}-01-01"
+
+
+def registradas(conn):
+    """[(anio, ruta, facturas, lineas, id_min, id_max)] del año más reciente al más viejo."""
+    return conn.execute(
+        f"SELECT anio, ruta, facturas, lineas, id_min, id_max FROM {TABLA_REGISTRO} "
+        "ORDER BY anio DESC"
+    ).fetchall()
+
+
+@contextmanager
+def _adjunto(conn, ruta, alias="archivo"):
+    # ATTACH y DETACH no se permiten dentro de una transacción: la conexión
+    # tiene que llegar sin ninguna abierta
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (ruta,))
+    try:
+        yield conn
+    finally:
+        conn.execute(f"DETACH DATABASE {alias}")
+
+
+@contextmanager
+def _lectura_archivo(conn, ruta):
+    # ATTACH crearía un archivo vacío si el de la partición ya no está
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(f"Falta el archivo de facturas {ruta}")
+    with _adjunto(conn, ruta):
+        yield conn
+
+
+def _copiar(conn, origen, condicion="1", parametros=()):
+    # Facturas de `origen` que cumplen `condicion` (sobre f) y sus líneas
+    conn.execute(
+        f"INSERT INTO archivo.facturas ({', '.join(COLUMNAS_FACTURAS)}) "
+        f"SELECT {', '.join(COLUMNAS_FACTURAS)} FROM {origen}.facturas f WHERE {condicion}",
+        parametros,
+    )
+    conn.execute(
+        f"INSERT INTO archivo.factura_productos ({', '.join(COLUMNAS_LINEAS)}) "
+        f"SELECT {', '.join(f'fp.{c}' for c in COLUMNAS_LINEAS)} "
+        f"FROM {origen}.factura_productos fp JOIN {origen}.facturas f ON f.id = fp.factura_id "
+        f"WHERE {condicion}",
+        parametros,
+    )
+
+
+def _borrar_archivo(ruta):
+    # Los archivos quedan de solo lectura; en Windows hay que quitarlo para borrar
+    os.chmod(ruta, stat.S_IRUSR | stat.S_IWUSR)
+    os.remove(ruta)
+
+
+def resolver(pool, ruta):
+    """Ruta absoluta de un archivo o directorio de archivo.
+
+    Las relativas (DIRECTORIO_ARCHIVO por defecto, o registros anteriores a
+    que se guardaran absolutas) se toman desde la carpeta de la base, no desde
+    el directorio de trabajo: la app y un cron pueden correr desde cualquier lado.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(pool.ruta)), ruta)
+
+
+def _ruta_nueva(pool, anio, directorio):
+    # Un nombre que no existe: el registro nunca apunta a un archivo a medio
+    # escribir y nunca se pisa uno ya registrado. Se guarda absoluta
+    directorio = resolver(pool, directorio)
+    nombre = os.path.splitext(os.path.basename(pool.ruta))[0]
+    marca = datetime.now().strftime("%Y%m%d-%H%M%S")
+    ruta = os.path.join(directorio, f"{nombre}-facturas-{anio}-{marca}.db")
+    sufijo = 1
+    while os.path.exists(ruta):
+        sufijo += 1
+        ruta = os.path.join(directorio, f"{nombre}-facturas-{anio}-{marca}-{sufijo}.db")
+    return ruta
+
+
+@metricas.instrumentar(filas=lambda resumen: resumen["facturas"])
+def archivar(pool, anio, directorio=DIRECTORIO_ARCHIVO):
+    """Mueve las facturas de `anio` y sus líneas a un archivo aparte.
+
+    Si el año ya tenía archivo, el nuevo junta sus filas con las que
+    quedaban en la base activa (p. ej. importadas después) y el viejo se
+    borra. Devuelve un dict con anio, ruta (None si no había nada que
+    mover), facturas y lineas movidas.
+    """
+    if anio > datetime.now().year - ANIOS_ACTIVOS:
+        raise ValueError(f"{anio} está entre los {ANIOS_ACTIVOS} años que quedan en la base activa")
+    desde, hasta = limites(anio)
+    os.makedirs(resolver(pool, directorio), exist_ok=True)
+    en_rango = "f.emitida_en >= ? AND f.emitida_en < ?"
+
+    ruta = None
+    registrado = False
+    try:
+        with pool.exclusiva() as conn:
+            ruta = _ruta_nueva(pool, anio, directorio)
+            fila = conn.execute(
+                f"SELECT ruta FROM {TABLA_REGISTRO} WHERE anio = ?", (anio,)
+            ).fetchone()
+            anterior = resolver(pool, fila[0]) if fila else None
+            with _adjunto(conn, ruta):
+                # Paso 1: el archivo nuevo queda completo en disco
+                if anterior:
+                    conn.execute("ATTACH DATABASE ? AS anterior", (anterior,))
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for sql in ESQUEMA_ARCHIVO:
+                        conn.execute(sql)
+                    if anterior:
+                        _copiar(conn, "anterior")
+                    _copiar(conn, "main", en_rango, (desde, hasta))
+                    for sql in INDICES_ARCHIVO:
+                        conn.execute(sql)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                finally:
+                    if anterior:
+                        conn.execute("DETACH DATABASE anterior")
+
+                # Paso 2: solo escribe en la base activa, así que es atómico
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    lineas = conn.execute(
+                        "DELETE FROM main.factura_productos "
+                        "WHERE factura_id IN (SELECT id FROM archivo.facturas)"
+                    ).rowcount
+                    facturas = conn.execute(
+                        "DELETE FROM main.facturas WHERE id IN (SELECT id FROM archivo.facturas)"
+                    ).rowcount
+                    total_facturas, id_min, id_max = conn.execute(
+                        "SELECT COUNT(*), MIN(id), MAX(id) FROM archivo.facturas"
+                    ).fetchone()
+                    total_lineas = conn.execute(
+                        "SELECT COUNT(*) FROM archivo.factura_productos"
+                    ).fetchone()[0]
+                    if facturas:
+                        registrar(conn, "facturas", TODO)
+                    if total_facturas:
+                        conn.execute(
+                            f"INSERT OR REPLACE INTO {TABLA_REGISTRO} "
+                            "(anio, ruta, facturas, lineas, id_min, id_max, archivada_en) "
+                            "VALUES (?, ?, ?, ?, ?, ?, datetime('now'))",
+                            (anio, ruta, total_facturas, total_lineas, id_min, id_max),
+                        )
+                    conn.execute("COMMIT")
+                    registrado = bool(total_facturas)
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+    except BaseException:
+        # Un archivo sin registrar no lo lee nadie; registrado, ya es la única copia
+        if ruta is not None and not registrado and os.path.exists(ruta):
+            _borrar_archivo(ruta)
+        raise
+
+    if not total_facturas:
+        _borrar_archivo(ruta)
+        return {"anio": anio, "ruta": None, "facturas": 0, "lineas": 0}
+    os.chmod(ruta, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    if anterior and os.path.exists(anterior):
+        _borrar_archivo(anterior)
+    return {"anio": anio, "ruta": ruta, "facturas": facturas, "lineas": lineas}
+
+
+def anios_activos_con_datos(pool, antes_de):
+    """Años anteriores a `antes_de` que todavía tienen facturas en la base activa.
+
+    Salta de año en año por el índice de emitida_en en vez de recorrerlo.
+    """
+    anios = []
+    desde = ""
+    with pool.lectura() as conn:
+        while True:
+            primera = conn.execute(
+                "SELECT MIN(emitida_en) FROM facturas WHERE emitida_en >= ? AND emitida_en < ?",
+                (desde, limites(antes_de)[0]),
+            ).fetchone()[0]
+            if primera is None:
+                return anios
+            anio = int(primera[:4])
+            anios.append(anio)
+            desde = limites(anio)[1]
+
+
+def archivar_anteriores(pool, antes_de=None, directorio=DIRECTORIO_ARCHIVO, progreso=None):
+    """Archiva cada año anterior a `antes_de` (por defecto, los que ya no son activos).
+
+    Devuelve la lista de resúmenes de `archivar`; `progreso(anio)` se llama
+    antes de cada año.
+    """
+    if antes_de is None:
+        antes_de = datetime.now().year - ANIOS_ACTIVOS + 1
+    resumenes = []
+    for anio in anios_activos_con_datos(pool, antes_de):
+        if progreso is not None:
+            progreso(anio)
+        resumenes.append(archivar(pool, anio, directorio))
+    return resumenes
+
+
+def _archivos_en(conn, desde, hasta):
+    # Poda: solo los años archivados que se cruzan con [desde, hasta)
+    for anio, ruta, *_ in registradas(conn):
+        inicio, fin = limites(anio)
+        if (hasta is None or inicio < hasta) and (desde is None or fin > desde):
+            yield anio, ruta
+
+
+@metricas.instrumentar()
+def facturas_entre(pool, desde=None, hasta=None, cliente_id=None, limite=100):
+    """[(id, cliente, emitida_en, total)] emitidas en [desde, hasta), de la más reciente.
+
+    `desde` y `hasta` son "AAAA-MM-DD" (o con hora). Primero consulta la base
+    activa; después los archivos del rango del más nuevo al más viejo, y deja
+    de abrirlos en cuanto ya tiene `limite` facturas más recientes que el
+    año siguiente.
+    """
+    condiciones, parametros = [], []
+    if desde is not None:
+        condiciones.append("f.emitida_en >= ?")
+        parametros.append(desde)
+    if hasta is not None:
+        condiciones.append("f.emitida_en < ?")
+        parametros.append(hasta)
+    if cliente_id is not None:
+        condiciones.append("f.cliente_id = ?")
+        parametros.append(cliente_id)
+    condicion = " AND ".join(condiciones) or "1"
+    parametros.append(limite)
+
+    with pool.lectura() as conn:
+        filas = conn.execute(
+            CONSULTA_FACTURAS.format(esquema="main", condicion=condicion), parametros
+        ).fetchall()
+        for anio, ruta in _archivos_en(conn, desde, hasta):
+            if len(filas) >= limite and (filas[-1][2] or "") >= limites(anio)[1]:
+                break
+            with _lectura_archivo(conn, resolver(pool, ruta)):
+                filas += conn.execute(
+                    CONSULTA_FACTURAS.format(esquema="archivo", condicion=condicion), parametros
+                ).fetchall()
+            filas.sort(key=lambda fila: (fila[2] or "", fila[0]), reverse=True)
+            del filas[limite:]
+    return filas
+
+
+@metricas.instrumentar()
+def lineas_factura(pool, factura_id):
+    """[(producto_id, producto, cantidad, monto)] de la factura, esté donde esté."""
+    with pool.lectura() as conn:
+        if conn.execute("SELECT 1 FROM facturas WHERE id = ?", (factura_id,)).fetchone():
+            return conn.execute(CONSULTA_LINEAS.format(esquema="main"), (factura_id,)).fetchall()
+        for _, ruta, _, _, id_min, id_max in registradas(conn):
+            if not id_min <= factura_id <= id_max:
+                continue
+            with _lectura_archivo(conn, resolver(pool, ruta)):
+                if conn.execute(
+                    "SELECT 1 FROM archivo.facturas WHERE id = ?", (factura_id,)
+                ).fetchone():
+                    return conn.execute(
+                        CONSULTA_LINEAS.format(esquema="archivo"), (factura_id,)
+                    ).fetchall()
+    return []
+
+
+def main():
+    from base_datos import RUTA_BD, obtener_pool
+
+    parser = argparse.ArgumentParser(description="Archivo de facturas por año")
+    parser.add_argument("--bd", default=RUTA_BD)
+    parser.add_argument("--directorio", default=DIRECTORIO_ARCHIVO)
+    parser.add_argument("--archivar", type=int, metavar="AÑO")
+    parser.add_argument("--archivar-antes", type=int, metavar="AÑO")
+    parser.add_argument("--listar", action="store_true")
+    args = parser.parse_args()
+
+    pool = obtener_pool(args.bd)
+    resumenes = []
+    if args.archivar is not None:
+        resumenes.append(archivar(pool, args.archivar, args.directorio))
+    if args.archivar_antes is not None:
+        resumenes += archivar_anteriores(pool, args.archivar_antes, args.directorio)
+    for resumen in resumenes:
+        print(f"{resumen['anio']}: {resumen['facturas']} facturas, {resumen['lineas']} líneas -> {resumen['ruta']}")
+    if args.listar or not resumenes:
+        with pool.lectura() as conn:
+            for anio, ruta, facturas, lineas, _, _ in registradas(conn):
+                print(f"{anio}: {facturas} facturas, {lineas} líneas en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
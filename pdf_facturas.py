@@ -0,0 +1,264 @@
+"""Renderizado local de facturas en PDF, sin red ni dependencias externas.
+
+Recibe el mismo dict que cola_facturas.datos_factura arma para la API remota y
+escribe un PDF de texto (fuentes estándar Helvetica/Courier, así no hay que
+incrustar nada). Los PDFs se cachean por una huella del contenido de la
+factura, y `renderizar_lote` reparte re-emisiones masivas (p. ej. cierre de
+mes) en un pool de procesos.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from precios import a_centimos, a_colones, liquidar
+
+DIRECTORIO_CACHE = os.environ.get(
+    "ERP_CACHE_PDF", os.path.join("facturas_pdf", "cache")
+)
+
+ANCHO_PAGINA = 595  # A4 en puntos
+ALTO_PAGINA = 842
+MARGEN = 50
+LINEAS_POR_PAGINA = 45
+ALTO_LINEA = 14
+FUENTES = {"F1": "Helvetica", "F2": "Helvetica-Bold", "F3": "Courier"}
+
+
+def huella(datos):
+    # Misma factura -> mismo JSON canónico -> misma huella
+    canonico = json.dumps(datos, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def _texto_pdf(texto):
+    # Las fuentes estándar usan WinAnsiEncoding (cubre tildes y eñes)
+    crudo = str(texto).encode("cp1252", errors="replace")
+    return crudo.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _monto(centimos, moneda):
+    return f"{moneda} {a_colones(centimos):,.2f}"
+
+
+def _lineas_factura(datos):
+    # Devuelve (fuente, tamaño, texto) por renglón; Courier para que la tabla alinee
+    moneda = datos.get("currency", "CRC")
+    renglones = [
+        ("F2", 18, f"{datos.get('from', 'FACTURA')} #{datos['number']}"),
+        ("F1", 11, ""),
+    ]
+    for linea_cliente in str(datos["to"]).splitlines():
+        renglones.append(("F1", 11, f"Cliente: {linea_cliente}"))
+    renglones += [
+        ("F1", 11, ""),
+        ("F3", 9, f"{'Producto':<44} {'Cant.':>5} {'Unitario':>18} {'Total':>18}"),
+        ("F3", 9, "-" * 88),
+    ]
+    # Todo en céntimos enteros; los totales salen de la liquidación guardada
+    # con la factura (o, en datos sin ella, de liquidar los ítems sin descuento)
+    liquidacion = datos.get("liquidacion") or liquidar(
+        [{"monto": item["unit_cost"], "cantidad": item["quantity"]} for item in datos["items"]]
+    )
+    for item in datos["items"]:
+        unitario = a_centimos(item["unit_cost"])
+        subtotal = unitario * int(item["quantity"])
+        nombre = str(item["name"])
+        if len(nombre) > 44:
+            nombre = nombre[:43] + "…"
+        renglones.append(
+            (
+                "F3",
+                9,
+                f"{nombre:<44} {item['quantity']:>5} "
+                f"{_monto(unitario, moneda):>18} {_monto(subtotal, moneda):>18}",
+            )
+        )
+    renglones.append(("F3", 9, "-" * 88))
+    if liquidacion["descuento"] or liquidacion["impuesto"]:
+        renglones += [
+            ("F3", 9, f"{'Subtotal':>69} {_monto(liquidacion['subtotal'], moneda):>18}"),
+            ("F3", 9, f"{'Descuento':>69} {_monto(-liquidacion['descuento'], moneda):>18}"),
+            ("F3", 9, f"{'Impuesto':>69} {_monto(liquidacion['impuesto'], moneda):>18}"),
+        ]
+    renglones += [
+        ("F2", 12, f"Total: {_monto(liquidacion['total'], moneda)}"),
+        ("F1", 11, ""),
+        ("F1", 10, datos.get("notes", "")),
+    ]
+    return renglones
+
+
+def renderizar_pdf(datos):
+    """Devuelve los bytes del PDF de la factura descrita por `datos`."""
+    renglones = _lineas_factura(datos)
+    paginas = [
+        renglones[i:i + LINEAS_POR_PAGINA]
+        for i in range(0, len(renglones), LINEAS_POR_PAGINA)
+    ]
+
+    objetos = []  # cuerpo de cada objeto, numerados desde 1
+
+    def agregar(cuerpo):
+        objetos.append(cuerpo)
+        return len(objetos)
+
+    catalogo = agregar(None)  # se completa cuando se conozcan las páginas
+    raiz_paginas = agregar(None)
+    fuentes = {
+        nombre: agregar(
+            f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} "
+            f"/Encoding /WinAnsiEncoding >>".encode()
+        )
+        for nombre, base in FUENTES.items()
+    }
+    recursos = b"<< /Font << " + b" ".join(
+        f"/{nombre} {numero} 0 R".encode() for nombre, numero in fuentes.items()
+    ) + b" >> >>"
+
+    ids_paginas = []
+    for numero_pagina, renglones_pagina in enumerate(paginas, start=1):
+        contenido = [b"BT"]
+        y = ALTO_PAGINA - MARGEN
+        contenido.append(f"1 0 0 1 {MARGEN} {y} Tm".encode())
+        for fuente, tamano, texto in renglones_pagina:
+            contenido.append(f"/{fuente} {tamano} Tf".encode())
+            contenido.append(b"(" + _texto_pdf(texto) + b") Tj")
+            contenido.append(f"0 -{ALTO_LINEA} Td".encode())
+        contenido.append(b"ET")
+        if len(paginas) > 1:
+            contenido.append(
+                f"BT /F1 8 Tf {ANCHO_PAGINA - MARGEN - 40} {MARGEN // 2} Td (".encode()
+                + _texto_pdf(f"Pág. {numero_pagina}/{len(paginas)}")
+                + b") Tj ET"
+            )
+        flujo = b"\n".join(contenido)
+        id_contenido = agregar(
+            f"<< /Length {len(flujo)} >>\nstream\n".encode() + flujo + b"\nendstream"
+        )
+        ids_paginas.append(
+            agregar(
+                f"<< /Type /Page /Parent {raiz_paginas} 0 R "
+                f"/MediaBox [0 0 {ANCHO_PAGINA} {ALTO_PAGINA}] "
+                f"/Contents {id_contenido} 0 R /Resources ".encode() + recursos + b" >>"
+            )
+        )
+
+    objetos[catalogo - 1] = f"<< /Type /Catalog /Pages {raiz_paginas} 0 R >>".encode()
+    objetos[raiz_paginas - 1] = (
+        f"<< /Type /Pages /Count {len(ids_paginas)} /Kids ["
+        + " ".join(f"{i} 0 R" for i in ids_paginas)
+        + "] >>"
+    ).encode()
+
+    salida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    posiciones = []
+    for numero, cuerpo in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        salida += f"{numero} 0 obj\n".encode() + cuerpo + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    for posicion in posiciones:
+        salida += f"{posicion:010d} 00000 n \n".encode()
+    salida += (
+        f"trailer\n<< /Size {len(objetos) + 1} /Root {catalogo} 0 R >>\n"
+        f"startxref\n{inicio_xref}\n%%EOF\n"
+    ).encode()
+    return bytes(salida)
+
+
+class CachePdf:
+    # PDFs ya renderizados en disco, indexados por la huella de la factura
+    def __init__(self, directorio=DIRECTORIO_CACHE):
+        self.directorio = directorio
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directorio, exist_ok=True)
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.pdf")
+
+    def obtener(self, datos):
+        clave = huella(datos)
+        ruta = self.ruta(clave)
+        try:
+            with open(ruta, "rb") as f:
+                contenido = f.read()
+            self.hits += 1
+            return contenido
+        except FileNotFoundError:
+            pass
+        self.misses += 1
+        contenido = renderizar_pdf(datos)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+        return contenido
+
+
+class BackendLocal:
+    # Backend de cola_facturas que renderiza en el proceso, sin red
+    nombre = "local"
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else CachePdf()
+
+    def renderizar(self, datos):
+        return self.cache.obtener(datos)
+
+
+def _renderizar_a_archivo(argumentos):
+    datos, directorio, directorio_cache = argumentos
+    contenido = CachePdf(directorio_cache).obtener(datos)
+    ruta = os.path.join(directorio, f"factura_{datos['number']}.pdf")
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+    return ruta
+
+
+def renderizar_lote(
+    lista_datos,
+    directorio,
+    procesos=None,
+    directorio_cache=DIRECTORIO_CACHE,
+    tamano_lote=32,
+):
+    """Renderiza muchas facturas en paralelo; devuelve las rutas en el mismo orden.
+
+    Renderizar es CPU puro, así que se reparte en procesos (no hilos). Las
+    facturas que ya están en el caché solo se copian.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    argumentos = [(datos, directorio, directorio_cache) for datos in lista_datos]
+    if procesos == 1:
+        return [_renderizar_a_archivo(a) for a in argumentos]
+    with ProcessPoolExecutor(max_workers=procesos) as executor:
+        return list(executor.map(_renderizar_a_archivo, argumentos, chunksize=tamano_lote))
+
+
+def main():
+    import argparse
+    import time
+
+    from base_datos import RUTA_BD, obtener_pool
+    from facturacion import datos_facturas
+
+    parser = argparse.ArgumentParser(description="Re-emite en PDF las facturas guardadas")
+    parser.add_argument("--bd", default=RUTA_BD)
+    parser.add_argument("--directorio", default="facturas_reemitidas")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("ids", nargs="*", type=int, help="IDs de factura (todas si se omite)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    lista_datos = list(datos_facturas(obtener_pool(args.bd), args.ids or None))
+    rutas = renderizar_lote(lista_datos, args.directorio, args.procesos)
+    segundos = time.perf_counter() - inicio
+    print(f"{len(rutas)} facturas en {segundos:.2f} s en {args.directorio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Montos en céntimos enteros y liquidación de facturas.
+
+Desde la migración 5 los precios y totales se guardan como INTEGER en
+céntimos (productos.precio_centimos, factura_productos.precio_centimos,
+facturas.total_centimos); las columnas monto y total siguen existiendo como
+columnas generadas (céntimos / 100.0) para los lectores que esperan colones.
+factura_productos guarda siempre el precio unitario, no el de la línea.
+
+Cada línea se liquida así, con descuento e impuesto en puntos básicos
+(1300 = 13 %) y redondeo a la mitad hacia arriba:
+
+    bruto = precio × cantidad
+    descuento = bruto × descuento_bp / 10000
+    impuesto = (bruto − descuento) × impuesto_bp / 10000
+    total = bruto − descuento + impuesto
+
+y el total de la factura es la suma de sus líneas. TOTAL_LINEA_SQL repite la
+fórmula en SQL para recalcular y verificar millones de facturas en la base.
+
+Uso:
+    python precios.py --verificar [--recalcular] [--bd erp_app.db]
+"""
+
+import argparse
+import os
+import sys
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from cambios import TODO, registrar
+from metricas import metricas
+
+CENTIMOS_POR_COLON = 100
+PUNTOS_BASE = 10_000
+# Impuesto por defecto de las facturas nuevas, en puntos básicos
+IMPUESTO_BP = int(os.environ.get("ERP_IMPUESTO_BP", "0"))
+TAMANO_BLOQUE = 50_000
+MAX_DIFERENCIAS = 20
+
+
+def a_centimos(monto):
+    """Colones (float, str, Decimal o numpy) a céntimos enteros, sin pasar por float."""
+    return int(
+        (Decimal(str(monto)) * CENTIMOS_POR_COLON).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    )
+
+
+def a_colones(centimos):
+    return centimos / CENTIMOS_POR_COLON
+
+
+def a_puntos_base(porcentaje):
+    # 13 -> 1300, 2.5 -> 250
+    return a_centimos(porcentaje)
+
+
+def _validar(descuento_bp, impuesto_bp):
+    if not 0 <= descuento_bp <= PUNTOS_BASE:
+        raise ValueError(f"Descuento fuera de rango: {descuento_bp / 100} %")
+    if impuesto_bp < 0:
+        raise ValueError(f"Impuesto negativo: {impuesto_bp / 100} %")
+
+
+def _componentes(precio, cantidad, descuento_bp, impuesto_bp):
+    # Sirve igual para enteros de Python y para arreglos int64 de NumPy:
+    # // redondea hacia abajo y los montos nunca son negativos
+    bruto = precio * cantidad
+    descuento = (bruto * descuento_bp + PUNTOS_BASE // 2) // PUNTOS_BASE
+    impuesto = ((bruto - descuento) * impuesto_bp + PUNTOS_BASE // 2) // PUNTOS_BASE
+    return bruto, descuento, impuesto
+
+
+def componentes(precios, cantidades, descuento_bp=0, impuesto_bp=0):
+    """Devuelve (bruto, descuento, impuesto) por línea, en céntimos.
+
+    Con NumPy instalado calcula todas las líneas de una vez sobre columnas
+    int64; sin NumPy, línea por línea con los mismos enteros.
+    """
+    _validar(descuento_bp, impuesto_bp)
+    try:
+        import numpy as np  # type: ignore
+    except ImportError:
+        filas = [
+            _componentes(int(p), int(c), descuento_bp, impuesto_bp)
+            for p, c in zip(precios, cantidades)
+        ]
+        return tuple(list(columna) for columna in zip(*filas)) if filas else ([], [], [])
+    return _componentes(
+        np.asarray(precios, dtype=np.int64),
+        np.asarray(cantidades, dtype=np.int64),
+        descuento_bp,
+        impuesto_bp,
+    )
+
+
+def liquidar(lineas, descuento_bp=0, impuesto_bp=0):
+    """Desglose en céntimos de un carrito de líneas {"monto", "cantidad"}.
+
+    "monto" es el precio unitario en colones. Devuelve un dict con
+    "subtotal", "descuento", "impuesto", "total" y "lineas" (total por línea).
+    """
+    bruto, descuento, impuesto = componentes(
+        [a_centimos(linea["monto"]) for linea in lineas],
+        [linea["cantidad"] for linea in lineas],
+        descuento_bp,
+        impuesto_bp,
+    )
+    return {
+        "subtotal": int(sum(bruto)),
+        "descuento": int(sum(descuento)),
+        "impuesto": int(sum(impuesto)),
+        "total": int(sum(bruto) - sum(descuento) + sum(impuesto)),
+        "lineas": [int(b - d + i) for b, d, i in zip(bruto, descuento, impuesto)],
+    }
+
+
+# La misma liquidación en SQL, sobre factura_productos fp JOIN facturas f. En
+# SQLite la división entre enteros trunca, igual que // con montos positivos
+_BRUTO_SQL = "(fp.precio_centimos * fp.cantidad)"
+_DESCUENTO_SQL = f"(({_BRUTO_SQL} * f.descuento_bp + {PUNTOS_BASE // 2}) / {PUNTOS_BASE})"
+TOTAL_LINEA_SQL = (
+    f"({_BRUTO_SQL} - {_DESCUENTO_SQL} + "
+    f"(({_BRUTO_SQL} - {_DESCUENTO_SQL}) * f.impuesto_bp + {PUNTOS_BASE // 2}) / {PUNTOS_BASE})"
+)
+
+# Total guardado y total según las líneas de las facturas con ID en un rango
+_TOTALES = f"""
+    SELECT f.id, f.total_centimos AS guardado,
+           COALESCE(SUM({TOTAL_LINEA_SQL}), 0) AS calculado
+    FROM facturas f
+    LEFT JOIN factura_productos fp ON fp.factura_id = f.id
+    WHERE f.id BETWEEN ? AND ?
+    GROUP BY f.id
+"""
+
+
+def _rangos(pool, tamano_bloque):
+    with pool.lectura() as conn:
+        minimo, maximo = conn.execute("SELECT MIN(id), MAX(id) FROM facturas").fetchone()
+    if minimo is None:
+        return
+    for inicio in range(minimo, maximo + 1, tamano_bloque):
+        yield inicio, min(inicio + tamano_bloque - 1, maximo), maximo
+
+
+@metricas.instrumentar(filas=lambda resultado: resultado["facturas"])
+def verificar_totales(pool, tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    """Compara facturas.total_centimos con la liquidación de sus líneas.
+
+    Recorre las facturas por rangos de ID, cada uno en una consulta corta.
+    Devuelve {"facturas", "diferencias", "ejemplos", "segundos"}, donde
+    ejemplos son hasta MAX_DIFERENCIAS tuplas (id, guardado, calculado).
+    `progreso(ultimo_id, maximo_id)` se llama después de cada rango.
+    """
+    inicio = time.perf_counter()
+    facturas = diferencias = 0
+    ejemplos = []
+    for desde, hasta, maximo in _rangos(pool, tamano_bloque):
+        with pool.lectura() as conn:
+            facturas += conn.execute(
+                "SELECT COUNT(*) FROM facturas WHERE id BETWEEN ? AND ?", (desde, hasta)
+            ).fetchone()[0]
+            distintas = conn.execute(
+                f"SELECT id, guardado, calculado FROM ({_TOTALES}) WHERE guardado != calculado",
+                (desde, hasta),
+            ).fetchall()
+        diferencias += len(distintas)
+        ejemplos.extend(distintas[: MAX_DIFERENCIAS - len(ejemplos)])
+        if progreso is not None:
+            progreso(hasta, maximo)
+    return {
+        "facturas": facturas,
+        "diferencias": diferencias,
+        "ejemplos": ejemplos,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+@metricas.instrumentar()
+def recalcular_totales(pool, tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    """Reescribe facturas.total_centimos a partir de las líneas; devuelve cuántas cambió.
+
+    Para corregir datos viejos o importados. Cada rango de IDs es una
+    transacción aparte, así no bloquea la escritura de las demás sesiones.
+    """
+    corregidas = 0
+    for desde, hasta, maximo in _rangos(pool, tamano_bloque):
+        with pool.escritura() as conn:
+            cambiadas = conn.execute(
+                f"""
+                UPDATE facturas SET total_centimos = t.calculado
+                FROM ({_TOTALES}) AS t
+                WHERE facturas.id = t.id AND t.guardado != t.calculado
+                """,
+                (desde, hasta),
+            ).rowcount
+            if cambiadas:
+                # Las demás réplicas tienen que descartar los totales en caché
+                registrar(conn, "facturas", TODO)
+        corregidas += cambiadas
+        if progreso is not None:
+            progreso(hasta, maximo)
+    return corregidas
+
+
+def main():
+    from base_datos import RUTA_BD, obtener_pool
+
+    parser = argparse.ArgumentParser(description="Verificación de totales de facturas")
+    parser.add_argument("--bd", default=RUTA_BD)
+    parser.add_argument("--verificar", action="store_true")
+    parser.add_argument("--recalcular", action="store_true")
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE)
+    args = parser.parse_args()
+    if not args.verificar and not args.recalcular:
+        parser.error("indica --verificar o --recalcular")
+
+    pool = obtener_pool(args.bd)
+    if args.recalcular:
+        inicio = time.perf_counter()
+        corregidas = recalcular_totales(pool, args.bloque)
+        print(f"{corregidas} facturas corregidas en {time.perf_counter() - inicio:.2f} s")
+    if args.verificar:
+        resultado = verificar_totales(pool, args.bloque)
+        for factura_id, guardado, calculado in resultado["ejemplos"]:
+            print(
+                f"Factura {factura_id}: guardado {a_colones(guardado):.2f}, "
+                f"según líneas {a_colones(calculado):.2f}"
+            )
+        print(
+            f"{resultado['facturas']} facturas verificadas en {resultado['segundos']:.2f} s, "
+            f"{resultado['diferencias']} con diferencias"
+        )
+        if resultado["diferencias"]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
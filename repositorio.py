@@ -0,0 +1,261 @@
+"""Acceso a datos de clientes, productos y facturas, sin Streamlit.
+
+Todas las funciones reciben el pool, así las usan igual la interfaz, los
+benchmarks y los trabajos por lotes (p. ej. una importación nocturna). Las
+variantes en plural escriben todas las filas en una sola transacción con
+executemany. Las escrituras invalidan el caché de lecturas del proceso y
+dejan sus eventos en la tabla de cambios para los demás (ver cambios.py).
+
+Las lecturas devuelven tuplas por defecto; con `formato` se pueden pedir
+columnas NumPy, un DataFrame de pandas o una tabla de Arrow. Para tablas
+grandes `iterar` entrega bloques de tuplas sin cargar todo en memoria.
+"""
+
+from contextlib import nullcontext
+
+from busqueda import indexacion_diferida
+from cache_datos import obtener_cache
+from cambios import ALTA, BAJA, CAMBIO, obtener_suscriptor, registrar
+from importacion import ultimos_ids
+from mantenimiento import vaciar
+from metricas import metricas
+from precios import a_centimos
+
+COLUMNAS = {
+    "clientes": ("id", "nombre", "correo_electronico", "segmento_negocio"),
+    "productos": ("id", "nombre", "categoria", "monto"),
+}
+FORMATOS = ("tuplas", "numpy", "pandas", "arrow")
+TAMANO_BLOQUE = 10_000
+# SQLite acepta hasta 32766 parámetros por sentencia (999 en versiones viejas)
+MAX_PARAMETROS = 900
+# Desde cuántas filas un lote indexa la búsqueda al final en vez de fila por fila
+MIN_FILAS_INDEXACION_DIFERIDA = 500
+
+
+def _transponer(filas, columnas):
+    return list(zip(*filas)) if filas else [()] * len(columnas)
+
+
+def _convertir(filas, columnas, formato):
+    if formato == "tuplas":
+        return filas
+    if formato == "numpy":
+        try:
+            import numpy as np  # type: ignore
+        except ImportError as e:
+            raise RuntimeError("Para formato='numpy' hay que instalar numpy") from e
+        # Un arreglo por columna: IDs int64 y montos float64 contiguos
+        return {
+            columna: np.array(valores)
+            for columna, valores in zip(columnas, _transponer(filas, columnas))
+        }
+    if formato == "pandas":
+        import pandas as pd  # type: ignore
+
+        return pd.DataFrame.from_records(filas, columns=columnas)
+    if formato == "arrow":
+        try:
+            import pyarrow as pa  # type: ignore
+        except ImportError as e:
+            raise RuntimeError("Para formato='arrow' hay que instalar pyarrow") from e
+        return pa.table(
+            {
+                columna: list(valores)
+                for columna, valores in zip(columnas, _transponer(filas, columnas))
+            }
+        )
+    raise ValueError(f"Formato desconocido: {formato} (válidos: {', '.join(FORMATOS)})")
+
+
+def _cargar(pool, tabla, formato):
+    with pool.lectura() as conn:
+        filas = conn.execute(f"SELECT {', '.join(COLUMNAS[tabla])} FROM {tabla}").fetchall()
+    return _convertir(filas, COLUMNAS[tabla], formato)
+
+
+def iterar(pool, tabla, tamano_bloque=TAMANO_BLOQUE):
+    """Genera bloques de tuplas de `tabla` en orden de ID.
+
+    Cada bloque es una consulta corta por llave, así que no retiene una
+    conexión de lectura mientras el llamador procesa.
+    """
+    columnas = ", ".join(COLUMNAS[tabla])
+    ultimo_id = 0
+    while True:
+        with pool.lectura() as conn:
+            filas = conn.execute(
+                f"SELECT {columnas} FROM {tabla} WHERE id > ? ORDER BY id LIMIT ?",
+                (ultimo_id, tamano_bloque),
+            ).fetchall()
+        if not filas:
+            return
+        yield filas
+        ultimo_id = filas[-1][0]
+
+
+def instantanea(pool, tabla):
+    """Copia en memoria de `tabla` (ID -> tupla), compartida por el proceso.
+
+    La primera llamada la carga completa; después el suscriptor de cambios la
+    actualiza por ID con lo que escriba cualquier proceso.
+    """
+    return obtener_suscriptor(pool).instantanea(tabla, COLUMNAS[tabla])
+
+
+def _en_bloques(ids):
+    ids = [int(i) for i in ids]
+    for i in range(0, len(ids), MAX_PARAMETROS):
+        yield ids[i:i + MAX_PARAMETROS]
+
+
+def _eliminar(pool, tabla, ids):
+    eliminadas = 0
+    ids = [int(i) for i in ids]
+    with pool.escritura() as conn:
+        for bloque in _en_bloques(ids):
+            marcadores = ", ".join("?" for _ in bloque)
+            eliminadas += conn.execute(
+                f"DELETE FROM {tabla} WHERE id IN ({marcadores})", bloque
+            ).rowcount
+        registrar(conn, tabla, BAJA, ids)
+    obtener_cache(pool).invalidar(tabla)
+    return eliminadas
+
+
+def _indexacion(conn, tabla, filas):
+    # Los triggers FTS5 (con sus prefijos) cuestan más que el INSERT mismo;
+    # en lotes grandes conviene indexar todo de una vez al final
+    if len(filas) >= MIN_FILAS_INDEXACION_DIFERIDA:
+        return indexacion_diferida(conn, [tabla])
+    return nullcontext()
+
+
+### Clientes
+
+@metricas.instrumentar()
+def cargar_clientes(pool, formato="tuplas"):
+    return _cargar(pool, "clientes", formato)
+
+
+@metricas.instrumentar()
+def agregar_cliente(pool, nombre, correo, segmento):
+    return agregar_clientes(pool, [(nombre, correo, segmento)])[0]
+
+
+@metricas.instrumentar()
+def agregar_clientes(pool, filas):
+    """Inserta (nombre, correo, segmento) por fila; devuelve los IDs nuevos."""
+    filas = list(filas)
+    with pool.escritura() as conn, _indexacion(conn, "clientes", filas):
+        conn.executemany(
+            "INSERT INTO clientes (nombre, correo_electronico, segmento_negocio) VALUES (?, ?, ?)",
+            filas,
+        )
+        ids = ultimos_ids(conn, "clientes", len(filas))
+        registrar(conn, "clientes", ALTA, ids)
+    obtener_cache(pool).invalidar("clientes")
+    return ids
+
+
+@metricas.instrumentar()
+def actualizar_cliente(pool, cliente_id, nombre, correo, segmento):
+    return actualizar_clientes(pool, [(cliente_id, nombre, correo, segmento)])
+
+
+@metricas.instrumentar()
+def actualizar_clientes(pool, filas):
+    """Actualiza (id, nombre, correo, segmento) por fila; devuelve cuántas cambió."""
+    filas = [
+        (nombre, correo, segmento, int(cliente_id)) for cliente_id, nombre, correo, segmento in filas
+    ]
+    with pool.escritura() as conn:
+        cambiadas = conn.executemany(
+            "UPDATE clientes SET nombre = ?, correo_electronico = ?, segmento_negocio = ? "
+            "WHERE id = ?",
+            filas,
+        ).rowcount
+        registrar(conn, "clientes", CAMBIO, [fila[3] for fila in filas])
+    obtener_cache(pool).invalidar("clientes")
+    return cambiadas
+
+
+@metricas.instrumentar()
+def eliminar_cliente(pool, cliente_id):
+    return eliminar_clientes(pool, [cliente_id])
+
+
+@metricas.instrumentar()
+def eliminar_clientes(pool, ids):
+    # sqlite3.IntegrityError si alguno tiene facturas; no se borra ninguno
+    return _eliminar(pool, "clientes", ids)
+
+
+### Productos
+
+@metricas.instrumentar()
+def cargar_productos(pool, formato="tuplas"):
+    return _cargar(pool, "productos", formato)
+
+
+@metricas.instrumentar()
+def agregar_producto(pool, nombre, categoria, monto):
+    return agregar_productos(pool, [(nombre, categoria, monto)])[0]
+
+
+@metricas.instrumentar()
+def agregar_productos(pool, filas):
+    """Inserta (nombre, categoría, monto en colones) por fila; devuelve los IDs nuevos."""
+    filas = [(nombre, categoria, a_centimos(monto)) for nombre, categoria, monto in filas]
+    with pool.escritura() as conn, _indexacion(conn, "productos", filas):
+        conn.executemany(
+            "INSERT INTO productos (nombre, categoria, precio_centimos) VALUES (?, ?, ?)", filas
+        )
+        ids = ultimos_ids(conn, "productos", len(filas))
+        registrar(conn, "productos", ALTA, ids)
+    obtener_cache(pool).invalidar("productos")
+    return ids
+
+
+@metricas.instrumentar()
+def eliminar_producto(pool, producto_id):
+    return eliminar_productos(pool, [producto_id])
+
+
+@metricas.instrumentar()
+def eliminar_productos(pool, ids):
+    # sqlite3.IntegrityError si alguno aparece en facturas; no se borra ninguno
+    return _eliminar(pool, "productos", ids)
+
+
+### Facturas (registrar_factura y registrar_facturas están en facturacion.py)
+
+@metricas.instrumentar()
+def agregar_factura(pool, cliente_id, total):
+    # Camino anterior de la pestaña Facturar: solo el encabezado, sin fecha
+    # ni resúmenes. Se conserva para scripts viejos y benchmarks
+    with pool.escritura() as conn:
+        factura_id = conn.execute(
+            "INSERT INTO facturas (cliente_id, total_centimos) VALUES (?, ?)",
+            (cliente_id, a_centimos(total)),
+        ).lastrowid
+        registrar(conn, "facturas", ALTA, [factura_id])
+    return factura_id
+
+
+@metricas.instrumentar()
+def agregar_factura_producto(pool, factura_id, producto_id, cantidad, monto):
+    # `monto` es el precio unitario en colones
+    with pool.escritura() as conn:
+        conn.execute(
+            "INSERT INTO factura_productos (factura_id, producto_id, cantidad, precio_centimos) "
+            "VALUES (?, ?, ?, ?)",
+            (factura_id, producto_id, cantidad, a_centimos(monto)),
+        )
+        registrar(conn, "facturas", CAMBIO, [factura_id])
+
+
+@metricas.instrumentar()
+def borrar_todo(pool, modo="recrear", progreso=None):
+    # Ver mantenimiento.vaciar: por defecto recrea las tablas en vez de DELETE
+    return vaciar(pool, modo, progreso=progreso)